@@ -0,0 +1,74 @@
+"""daily_rollups table and ledger_records composite covering indexes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+基础表结构仍由应用启动时的 create_all 创建；本迁移为已有数据库
+补建每日汇总表以及热点查询所需的复合/覆盖索引。
+ledger_records 尚不存在时跳过（create_all 会按模型创建）。
+汇总数据由应用启动时回填。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ("ix_ledger_records_user_date_created_id", "ledger_records",
+     ["user_id", "record_date", "created_at", "id"]),
+    ("ix_ledger_records_user_date_type_category_amount", "ledger_records",
+     ["user_id", "record_date", "type", "category_id", "amount"]),
+    ("ix_ledger_records_project_amount", "ledger_records",
+     ["project_id", "amount"]),
+    ("ix_daily_rollups_key", "daily_rollups",
+     ["user_id", "date", "type", "category_id", "project_id"]),
+]
+
+
+def _existing_tables() -> set:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = _existing_tables()
+    if "ledger_records" not in tables:
+        return
+
+    if "daily_rollups" not in tables:
+        op.create_table(
+            "daily_rollups",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("date", sa.Date(), nullable=False),
+            sa.Column("type", sa.String(length=10), nullable=False),
+            sa.Column("category_id", sa.Integer(), nullable=False),
+            sa.Column("project_id", sa.Integer(), nullable=True),
+            sa.Column("amount", sa.Numeric(14, 2), nullable=False),
+            sa.Column("record_count", sa.Integer(), nullable=False),
+        )
+        op.create_index("ix_daily_rollups_id", "daily_rollups", ["id"])
+        tables.add("daily_rollups")
+
+    for name, table, columns in INDEXES:
+        if table in tables:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    tables = _existing_tables()
+    for name, table, _ in reversed(INDEXES):
+        if table in tables:
+            op.drop_index(name, table_name=table, if_exists=True)
+    if "daily_rollups" in tables:
+        op.drop_table("daily_rollups")
@@ -0,0 +1,50 @@
+"""record_idempotency_keys table for batch record creation
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+批量记账的客户端幂等键表。表已存在（由 create_all 创建）时跳过。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_tables() -> set:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = _existing_tables()
+    if "users" not in tables or "record_idempotency_keys" in tables:
+        return
+
+    op.create_table(
+        "record_idempotency_keys",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("record_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_record_idempotency_keys_id", "record_idempotency_keys", ["id"])
+    op.create_index(
+        "ux_record_idempotency_keys_user_key", "record_idempotency_keys",
+        ["user_id", "key"], unique=True
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if "record_idempotency_keys" in _existing_tables():
+        op.drop_table("record_idempotency_keys")
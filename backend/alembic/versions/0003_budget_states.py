@@ -0,0 +1,52 @@
+"""budget_states table for precomputed budget alerts
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+预算状态表（当前周期已支出和预警等级）。表已存在（由 create_all 创建）时跳过；
+数据在应用启动时由后台任务补算。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_tables() -> set:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if "budget_states" in _existing_tables():
+        return
+
+    op.create_table(
+        "budget_states",
+        sa.Column("budget_id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("period_end", sa.Date(), nullable=False),
+        sa.Column("spent", sa.Numeric(14, 2), nullable=False),
+        sa.Column("usage_rate", sa.Float(), nullable=False),
+        sa.Column("alert_level", sa.String(length=20), nullable=False),
+        sa.Column("last_evaluated", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_budget_states_user_period", "budget_states",
+        ["user_id", "period_start", "period_end"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if "budget_states" in _existing_tables():
+        op.drop_table("budget_states")
@@ -0,0 +1,45 @@
+"""user_usage counters for the admin usage report
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+用户用量计数表。表已存在（由 create_all 创建）时跳过；
+数据在应用启动时根据已有记录回填。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_tables() -> set:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = _existing_tables()
+    if "users" not in tables or "user_usage" in tables:
+        return
+
+    op.create_table(
+        "user_usage",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("record_count", sa.Integer(), nullable=False),
+        sa.Column("storage_bytes", sa.Integer(), nullable=False),
+        sa.Column("last_active_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if "user_usage" in _existing_tables():
+        op.drop_table("user_usage")
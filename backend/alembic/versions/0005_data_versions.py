@@ -0,0 +1,43 @@
+"""data_versions for ETag / conditional GET
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+用户数据版本表。表已存在（由 create_all 创建）时跳过；
+版本从 0 开始，首次写操作时插入。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _existing_tables() -> set:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if "data_versions" in _existing_tables():
+        return
+
+    op.create_table(
+        "data_versions",
+        sa.Column("scope_id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if "data_versions" in _existing_tables():
+        op.drop_table("data_versions")
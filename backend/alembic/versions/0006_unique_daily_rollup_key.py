@@ -0,0 +1,68 @@
+"""unique daily_rollups key for atomic upserts
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+汇总行改为 INSERT ... ON CONFLICT DO UPDATE 原子累加，需要汇总键上的唯一索引。
+project_id 可为空（唯一索引中 NULL 互不相等），索引按 coalesce(project_id, 0) 建立。
+并发写入在旧版本中可能产生重复的汇总行：先合并到每组 id 最小的一行再建索引。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = "ix_daily_rollups_key"
+KEY = "user_id, date, type, category_id, coalesce(project_id, 0)"
+SAME_KEY = (
+    "d.user_id = daily_rollups.user_id AND d.date = daily_rollups.date AND d.type = daily_rollups.type"
+    " AND d.category_id = daily_rollups.category_id"
+    " AND coalesce(d.project_id, 0) = coalesce(daily_rollups.project_id, 0)"
+)
+
+
+def _has_rollups() -> bool:
+    return "daily_rollups" in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _has_rollups():
+        return
+
+    keep = f"SELECT MIN(id) FROM daily_rollups GROUP BY {KEY}"
+    op.execute(
+        "UPDATE daily_rollups SET "
+        f"amount = (SELECT SUM(d.amount) FROM daily_rollups d WHERE {SAME_KEY}), "
+        f"record_count = (SELECT SUM(d.record_count) FROM daily_rollups d WHERE {SAME_KEY}) "
+        f"WHERE id IN ({keep} HAVING COUNT(*) > 1)"
+    )
+    op.execute(f"DELETE FROM daily_rollups WHERE id NOT IN ({keep})")
+
+    op.drop_index(INDEX_NAME, table_name="daily_rollups", if_exists=True)
+    op.create_index(
+        INDEX_NAME, "daily_rollups",
+        ["user_id", "date", "type", "category_id", sa.text("coalesce(project_id, 0)")],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not _has_rollups():
+        return
+
+    op.drop_index(INDEX_NAME, table_name="daily_rollups", if_exists=True)
+    op.create_index(
+        INDEX_NAME, "daily_rollups",
+        ["user_id", "date", "type", "category_id", "project_id"],
+    )
@@ -0,0 +1,126 @@
+"""
+认证缓存
+
+- Token缓存：Token的SHA-256摘要 → 解析结果，过期时间不超过Token本身的exp
+- 用户缓存：用户ID → 用户字段快照（不含密码哈希）
+
+管理员禁用/启用/删除用户时调用 invalidate_user 立即失效；
+多进程部署时其它进程依赖短TTL兜底。
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.auth.token import TokenData
+
+
+# 缓存配置
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", "300"))  # 秒
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", "30"))  # 秒
+
+# 缓存的用户字段（password_hash 按需懒加载）
+USER_FIELDS = ("id", "username", "is_admin", "is_active", "invitation_code", "created_at", "updated_at")
+
+
+class AuthCache:
+    """线程安全的Token/用户快照缓存"""
+
+    def __init__(self, maxsize: int = AUTH_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._tokens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._users: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.token_hits = 0
+        self.token_misses = 0
+        self.user_hits = 0
+        self.user_misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _get(self, data: OrderedDict, key) -> Any:
+        entry = data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del data[key]
+            return None
+        data.move_to_end(key)
+        return value
+
+    def _set(self, data: OrderedDict, key, value, expires_at: float):
+        data[key] = (expires_at, value)
+        data.move_to_end(key)
+        while len(data) > self.maxsize:
+            data.popitem(last=False)
+
+    def get_token(self, token: str) -> Optional[TokenData]:
+        """读取Token解析结果"""
+        key = self._token_key(token)
+        with self._lock:
+            value = self._get(self._tokens, key)
+            if value is None:
+                self.token_misses += 1
+            else:
+                self.token_hits += 1
+            return value
+
+    def set_token(self, token: str, token_data: TokenData):
+        """缓存Token解析结果"""
+        expires_at = time.time() + AUTH_TOKEN_CACHE_TTL
+        if token_data.expires_at is not None:
+            expires_at = min(expires_at, token_data.expires_at)
+        with self._lock:
+            self._set(self._tokens, self._token_key(token), token_data, expires_at)
+
+    def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """读取用户快照"""
+        with self._lock:
+            value = self._get(self._users, user_id)
+            if value is None:
+                self.user_misses += 1
+            else:
+                self.user_hits += 1
+            return value
+
+    def set_user(self, user) -> Dict[str, Any]:
+        """缓存用户快照"""
+        snapshot = {field: getattr(user, field) for field in USER_FIELDS}
+        with self._lock:
+            self._set(self._users, user.id, snapshot, time.time() + AUTH_USER_CACHE_TTL)
+        return snapshot
+
+    def invalidate_user(self, user_id: int):
+        """用户状态变更后立即失效"""
+        with self._lock:
+            self._users.pop(user_id, None)
+            self.invalidations += 1
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中计数"""
+        with self._lock:
+            return {
+                "tokens": len(self._tokens),
+                "users": len(self._users),
+                "token_hits": self.token_hits,
+                "token_misses": self.token_misses,
+                "user_hits": self.user_hits,
+                "user_misses": self.user_misses,
+                "invalidations": self.invalidations,
+            }
+
+
+auth_cache = AuthCache()
@@ -4,16 +4,43 @@
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 from app.database import get_db
 from app.models import User
 from app.auth.token import decode_access_token, TokenData
+from app.auth.cache import auth_cache
 
 
 # HTTP Bearer Token安全方案
 security = HTTPBearer()
 
 
+def decode_token_cached(token: str) -> Optional[TokenData]:
+    """解析Token，命中缓存时跳过签名校验"""
+    token_data = auth_cache.get_token(token)
+    if token_data is None:
+        token_data = decode_access_token(token)
+        if token_data is not None:
+            auth_cache.set_token(token, token_data)
+    return token_data
+
+
+def load_user(db: Session, user_id: int) -> Optional[User]:
+    """按ID获取用户，命中缓存时由快照还原，不访问数据库"""
+    snapshot = auth_cache.get_user(user_id)
+    if snapshot is None:
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is not None:
+            auth_cache.set_user(user)
+        return user
+
+    # 还原为会话内的持久化对象，未缓存的字段按需懒加载
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -26,12 +53,12 @@ def get_current_user(
     )
     
     token = credentials.credentials
-    token_data = decode_access_token(token)
+    token_data = decode_token_cached(token)
     
     if token_data is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = load_user(db, token_data.user_id)
     
     if user is None:
         raise credentials_exception
@@ -66,12 +93,12 @@ def get_optional_user(
         return None
     
     token = credentials.credentials
-    token_data = decode_access_token(token)
+    token_data = decode_token_cached(token)
     
     if token_data is None:
         return None
     
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = load_user(db, token_data.user_id)
     
     if user is None or not user.is_active:
         return None
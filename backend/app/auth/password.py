@@ -1,19 +1,132 @@
 """
 密码加密工具
+
+bcrypt 计算在独立的有界线程池中执行，限制同时进行的哈希数量，
+排队超过上限时直接拒绝（PasswordPoolBusy）。调用方在事件循环中等待结果，
+排队中的登录不占用 AnyIO 的请求线程，登录洪峰不会饿死其它同步接口。
 """
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
 import bcrypt
 
 
-def hash_password(password: str) -> str:
-    """加密密码"""
+# 哈希线程池配置
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))  # bcrypt 成本因子
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+BCRYPT_QUEUE_LIMIT = int(os.getenv("BCRYPT_QUEUE_LIMIT", "32"))  # 排队等待的最大任务数
+
+
+class PasswordPoolBusy(Exception):
+    """密码哈希线程池排队已满"""
+
+
+class PasswordPool:
+    """有界的 bcrypt 线程池，带排队上限和运行指标"""
+
+    def __init__(self, workers: int = BCRYPT_WORKERS, queue_limit: int = BCRYPT_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_wait = 0.0
+
+    async def run(self, func: Callable, *args) -> Any:
+        """在线程池中执行并异步等待结果，排队已满时抛出 PasswordPoolBusy"""
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+    def submit(self, func: Callable, *args) -> Future:
+        """提交到线程池，排队已满时抛出 PasswordPoolBusy"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy()
+
+        queued_at = time.perf_counter()
+        with self._lock:
+            self.pending += 1
+            self.submitted += 1
+
+        def task():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    wait = started - queued_at
+                    self.pending -= 1
+                    self.completed += 1
+                    self.total_wait += wait
+                    self.total_run += finished - started
+                    self.max_wait = max(self.max_wait, wait)
+                self._slots.release()
+
+        return self._executor.submit(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """排队/完成/拒绝计数和平均耗时"""
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "rounds": BCRYPT_ROUNDS,
+                "pending": self.pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait / done * 1000, 2),
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "avg_run_ms": round(self.total_run / done * 1000, 2),
+            }
+
+    def shutdown(self):
+        """关闭线程池"""
+        self._executor.shutdown(wait=False)
+
+
+password_pool = PasswordPool()
+
+
+def _hash(password: str) -> str:
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     return hashed.decode('utf-8')
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
+def _verify(plain_password: str, hashed_password: str) -> bool:
     password_bytes = plain_password.encode('utf-8')
     hashed_bytes = hashed_password.encode('utf-8')
     return bcrypt.checkpw(password_bytes, hashed_bytes)
+
+
+async def hash_password(password: str) -> str:
+    """加密密码"""
+    return await password_pool.run(_hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """验证密码"""
+    return await password_pool.run(_verify, plain_password, hashed_password)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """哈希的成本因子与当前配置不一致时需要重新加密"""
+    try:
+        rounds = int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return True
+    return rounds != BCRYPT_ROUNDS
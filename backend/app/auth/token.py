@@ -2,7 +2,7 @@
 JWT Token工具
 """
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 import jwt
 from pydantic import BaseModel
@@ -12,6 +12,9 @@ from pydantic import BaseModel
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_EXPIRE_MINUTES", "1440"))  # 默认24小时
+# 事件流票据：浏览器 EventSource 无法设置请求头，用短期票据放在查询参数中认证
+STREAM_TICKET_EXPIRE_SECONDS = int(os.getenv("STREAM_TICKET_EXPIRE_SECONDS", "60"))
+STREAM_TICKET_AUDIENCE = "events"
 
 
 class TokenData(BaseModel):
@@ -19,6 +22,7 @@ class TokenData(BaseModel):
     user_id: int
     username: str
     is_admin: bool = False
+    expires_at: Optional[int] = None  # exp 时间戳
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -26,10 +30,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode = data.copy()
     
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
+    # 必须用带时区的时间：naive UTC 时间的 timestamp() 会按服务器本地时区换算
     to_encode.update({"exp": int(expire.timestamp())})
     
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
@@ -52,7 +57,34 @@ def decode_access_token(token: str) -> Optional[TokenData]:
         if user_id is None:
             return None
         
-        return TokenData(user_id=user_id, username=username, is_admin=is_admin)
+        return TokenData(
+            user_id=user_id,
+            username=username,
+            is_admin=is_admin,
+            expires_at=payload.get("exp")
+        )
     
     except jwt.PyJWTError:
         return None
+
+
+def create_stream_ticket(user_id: int) -> str:
+    """创建事件流票据（带 aud，不能当作访问Token使用）"""
+    expire = datetime.now(timezone.utc) + timedelta(seconds=STREAM_TICKET_EXPIRE_SECONDS)
+    payload = {"sub": user_id, "aud": STREAM_TICKET_AUDIENCE, "exp": int(expire.timestamp())}
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_stream_ticket(ticket: str) -> Optional[int]:
+    """解析事件流票据，返回用户ID"""
+    try:
+        payload = jwt.decode(
+            ticket,
+            SECRET_KEY,
+            algorithms=[ALGORITHM],
+            audience=STREAM_TICKET_AUDIENCE,
+            options={"verify_sub": False}
+        )
+    except jwt.PyJWTError:
+        return None
+    return payload.get("sub")
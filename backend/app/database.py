@@ -2,7 +2,7 @@
 数据库连接配置
 """
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -12,13 +12,60 @@ DATABASE_URL = os.getenv(
     f"sqlite:///{os.path.dirname(os.path.dirname(__file__))}/data/mobile_ledger.db"
 )
 
+# 数据库配置档：development（默认） / production
+DB_PROFILE = os.getenv("DB_PROFILE", "development").lower()
+
+# 是否打印SQL（默认关闭，调试时设置 SQL_ECHO=true）
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
+
+# 各配置档的SQLite PRAGMA和连接池参数
+DB_PROFILES = {
+    "development": {
+        "pragmas": {},
+        "pool": {},
+    },
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",  # 读写并发，写入不阻塞读取
+            "synchronous": "NORMAL",  # WAL模式下安全且显著减少fsync
+            "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536")),  # 负数表示KB
+            "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+            "temp_store": "MEMORY",
+            "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        },
+        "pool": {
+            "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+            "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "3600")),
+        },
+    },
+}
+
+if DB_PROFILE not in DB_PROFILES:
+    raise ValueError(f"未知的数据库配置档: {DB_PROFILE}（可选: {', '.join(DB_PROFILES)}）")
+
+is_sqlite = DATABASE_URL.startswith("sqlite")
+profile = DB_PROFILES[DB_PROFILE]
+
 # 创建数据库引擎
 engine = create_engine(
     DATABASE_URL,
-    echo=os.getenv("DEBUG", "true").lower() == "true",  # 开发模式显示SQL
-    connect_args={"check_same_thread": False},  # SQLite需要
+    echo=SQL_ECHO,
+    connect_args={"check_same_thread": False} if is_sqlite else {},  # SQLite需要
+    **profile["pool"],
 )
 
+
+if is_sqlite and profile["pragmas"]:
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        """新建连接时设置PRAGMA"""
+        cursor = dbapi_connection.cursor()
+        for key, value in profile["pragmas"].items():
+            cursor.execute(f"PRAGMA {key}={value}")
+        cursor.close()
+
 # 创建SessionLocal
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -2,51 +2,39 @@
 移动账本后端 - FastAPI入口
 """
 import os
-import time
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Callable
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+# 日志：队列 + 后台线程写出 JSON
+from app.log import setup_logging, log_stats
+setup_logging()
 
 # 数据库初始化
-from app.database import engine, Base
+from app.database import engine, Base, SessionLocal
+from app.middleware import TimingMiddleware, CompressionMiddleware, CacheControlMiddleware
+from app.responses import FastJSONResponse, FAST_JSON_RESPONSE
 
 # 路由导入
-from app.routers import auth, category, record, project, statistics, budget, invitation, admin
+from app.routers import auth, category, record, project, statistics, budget, invitation, admin, events
+from app.services import rollup, usage
+from app.services.budget_state import rollover_loop
+from app.services.events import event_broker
+from app.services.categories import category_cache
+from app.services.cache import stats_cache, conditional_get
+from app.auth.password import password_pool
+from app.auth.cache import auth_cache
+from app.services import metrics
 
+# SQL计时和连接池事件
+metrics.install_engine_hooks(engine)
 
-async def log_requests_middleware(request: Request, call_next: Callable):
-    """记录请求日志"""
-    start_time = time.time()
-    
-    try:
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        
-        # 添加处理时间头
-        response.headers["X-Process-Time"] = f"{process_time:.4f}"
-        
-        # 日志
-        print(
-            f"{datetime.now().isoformat()} | "
-            f"{request.method} {request.url.path} | "
-            f"{response.status_code} | "
-            f"{process_time:.4f}s"
-        )
-        
-        return response
-    except Exception as e:
-        process_time = time.time() - start_time
-        print(
-            f"{datetime.now().isoformat()} | "
-            f"{request.method} {request.url.path} | "
-            f"ERROR: {str(e)} | "
-            f"{process_time:.4f}s"
-        )
-        raise
+logger = logging.getLogger("app")
 
 
 async def global_exception_handler(request: Request, exc: Exception):
@@ -68,10 +56,29 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时：创建所有表
     Base.metadata.create_all(bind=engine)
-    print("✅ 数据库表创建完成")
+    # create_all不会为已存在的表补建新索引
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    logger.info("✅ 数据库表创建完成")
+    # 升级后首次启动：根据已有记录回填每日汇总和用量计数
+    db = SessionLocal()
+    try:
+        rollup.backfill_rollups(db)
+        usage.backfill_usage(db)
+    finally:
+        db.close()
+    # 预算状态：补算缺失的状态，之后每天零点切换周期
+    rollover_task = asyncio.create_task(rollover_loop())
+    # 多进程部署时定期写指标快照
+    metrics.flusher.start()
     yield
     # 关闭时：清理资源
-    print("👋 应用关闭")
+    rollover_task.cancel()
+    metrics.flusher.stop()
+    event_broker.close_all()
+    password_pool.shutdown()
+    logger.info("👋 应用关闭")
 
 
 # 创建FastAPI应用
@@ -80,12 +87,21 @@ app = FastAPI(
     description="个人记账系统后端服务",
     version="1.0.0",
     lifespan=lifespan,
+    # FAST_JSON_RESPONSE=true 时所有接口用 orjson（已安装时）编码
+    default_response_class=FastJSONResponse if FAST_JSON_RESPONSE else JSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
 )
 
-# 添加中间件
-app.middleware("http")(log_requests_middleware)
+# 未处理的异常返回统一格式的500（异常仍会继续抛出，由访问日志和服务器记录）
+app.add_exception_handler(Exception, global_exception_handler)
+
+# 缓存控制（条件 GET 的 ETag 头）
+app.add_middleware(CacheControlMiddleware)
+# 添加中间件（请求计时、SQL统计和访问日志）
+app.add_middleware(TimingMiddleware)
+# 响应压缩（在计时之外，X-Process-Time 不含压缩耗时）
+app.add_middleware(CompressionMiddleware)
 
 # CORS配置
 origins = [
@@ -105,13 +121,15 @@ app.add_middleware(
 
 # 注册路由
 app.include_router(auth.router, prefix="/api/v1")
-app.include_router(category.router, prefix="/api/v1")
-app.include_router(record.router, prefix="/api/v1")
-app.include_router(project.router, prefix="/api/v1")
-app.include_router(statistics.router, prefix="/api/v1")
-app.include_router(budget.router, prefix="/api/v1")
+# 用户数据相关的 GET 接口支持 ETag / If-None-Match（数据未变时返回 304）
+app.include_router(category.router, prefix="/api/v1", dependencies=[Depends(conditional_get)])
+app.include_router(record.router, prefix="/api/v1", dependencies=[Depends(conditional_get)])
+app.include_router(project.router, prefix="/api/v1", dependencies=[Depends(conditional_get)])
+app.include_router(statistics.router, prefix="/api/v1", dependencies=[Depends(conditional_get)])
+app.include_router(budget.router, prefix="/api/v1", dependencies=[Depends(conditional_get)])
 app.include_router(invitation.router, prefix="/api/v1")
 app.include_router(admin.router, prefix="/api/v1")
+app.include_router(events.router, prefix="/api/v1")
 
 
 # 健康检查接口
@@ -151,9 +169,44 @@ async def detailed_health_check():
         }
         health_status["status"] = "degraded"
     
+    # 统计结果缓存命中情况
+    health_status["services"]["stats_cache"] = stats_cache.stats()
+    # 密码哈希线程池
+    health_status["services"]["password_pool"] = password_pool.stats()
+    # 认证缓存
+    health_status["services"]["auth_cache"] = auth_cache.stats()
+    # 系统分类缓存
+    health_status["services"]["category_cache"] = category_cache.stats()
+    # 事件推送连接
+    health_status["services"]["events"] = event_broker.stats()
+    # 日志队列
+    health_status["services"]["logging"] = log_stats()
+    
     return health_status
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """Prometheus 指标（文本格式）
+
+    指标包含路由、SQL和连接池等内部信息：未配置 METRICS_TOKEN 时不开放，
+    配置后需带 Authorization: Bearer <METRICS_TOKEN>。
+    """
+    if metrics.METRICS_TOKEN is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not metrics.scrape_authorized(request.headers.get("Authorization")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无效的指标令牌",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    pool_size = engine.pool.size() if hasattr(engine.pool, "size") else None
+    return PlainTextResponse(
+        metrics.render(metrics.collect_snapshots(), pool_size),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @app.get("/")
 async def root():
     """根路径"""
@@ -1,109 +1,264 @@
 """
 中间件集合
+
+均为纯 ASGI 中间件：直接包装 send 修改响应头，不像 BaseHTTPMiddleware 那样
+为每个请求额外创建任务和内存流，流式响应也按原样逐块转发。
 """
+import os
 import time
+import zlib
 import logging
-from typing import Callable
-from fastapi import Request, HTTPException
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from typing import Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services import metrics
+
+try:
+    import brotli
+except ImportError:  # requirements.txt 已固定版本；未安装时只使用 gzip
+    brotli = None
+
+
+logger = logging.getLogger("app.access")
 
+# 小于该字节数的完整响应不压缩（压缩收益抵不上开销）
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# gzip 压缩级别：实测（scripts/bench_compression.py）级别 6 比 5 只小 1%~6%，耗时多 20%~40%
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+# brotli 质量：动态响应的常用取值，更高质量耗时成倍增加，只适合预压缩的静态资源
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+# 压缩的响应类型（事件流需要逐条立即送达，不压缩）
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/plain",
+    "text/html",
+)
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
 
+class TimingMiddleware:
+    """请求计时、SQL统计、请求指标和访问日志"""
 
-class TimingMiddleware(BaseHTTPMiddleware):
-    """请求计时中间件"""
-    
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next: Callable):
-        start_time = time.time()
-        
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request_scope = metrics.RequestScope()
+        token = metrics.current_scope.set(request_scope)
+        metrics.registry.request_started()
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # 开发/测试环境：超出查询预算时告警或失败（响应尚未开始，可返回500）
+                metrics.check_query_budget(request_scope, method, metrics.route_template(scope))
+
+                # 添加处理时间和SQL统计头
+                headers = MutableHeaders(scope=message)
+                headers["X-Process-Time"] = f"{time.perf_counter() - started:.4f}"
+                headers["X-DB-Queries"] = str(request_scope.queries)
+                headers["X-DB-Time"] = f"{request_scope.seconds:.4f}"
+            await send(message)
+
+        error = None
         try:
-            response = await call_next(request)
-            process_time = time.time() - start_time
-            
-            # 添加响应头
-            response.headers["X-Process-Time"] = str(process_time)
-            
-            # 日志记录
-            logger.info(
-                f"{request.method} {request.url.path} - "
-                f"{response.status_code} - {process_time:.4f}s"
-            )
-            
-            return response
+            await self.app(scope, receive, send_wrapper)
         except Exception as exc:
-            process_time = time.time() - start_time
-            logger.error(
-                f"{request.method} {request.url.path} - "
-                f"ERROR: {exc} - {process_time:.4f}s"
-            )
+            error = exc
             raise
+        finally:
+            # 流式响应在全部发送完后才记录，SQL统计包含生成响应体期间的查询
+            duration = time.perf_counter() - started
+            route = metrics.route_template(scope)
+            metrics.registry.request_finished(method, route, status_code, duration, request_scope)
+            metrics.current_scope.reset(token)
 
+            fields = {
+                "method": method,
+                "path": scope["path"],
+                "route": route,
+                "status": status_code,
+                "duration": round(duration, 4),
+                "db_queries": request_scope.queries,
+                "db_time": round(request_scope.seconds, 4),
+            }
+            if request_scope.slowest_statement:
+                fields["db_slowest"] = round(request_scope.slowest, 4)
+                fields["db_slowest_sql"] = " ".join(request_scope.slowest_statement.split())[:200]
+            if error is None:
+                logger.info("request", extra={"fields": fields})
+            else:
+                fields["error"] = str(error)
+                logger.error("request failed", extra={"fields": fields})
+
+
+class CacheControlMiddleware:
+    """缓存控制中间件
+
+    带 ETag 的响应（conditional_get 计算，记在 request.state 上）允许客户端缓存但每次须校验；
+    其余 GET 响应（统计接口除外）禁止缓存。
+    """
 
-class ErrorHandlerMiddleware(BaseHTTPMiddleware):
-    """全局错误处理中间件"""
-    
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next: Callable):
-        try:
-            response = await call_next(request)
-            return response
-        except HTTPException as exc:
-            return JSONResponse(
-                status_code=exc.status_code,
-                content={
-                    "success": False,
-                    "error": {
-                        "code": exc.status_code,
-                        "message": exc.detail
-                    }
-                }
-            )
-        except ValueError as exc:
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "success": False,
-                    "error": {
-                        "code": 400,
-                        "message": str(exc) or "无效的请求参数"
-                    }
-                }
-            )
-        except Exception as exc:
-            logger.exception(f"未处理的异常: {exc}")
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "success": False,
-                    "error": {
-                        "code": 500,
-                        "message": "服务器内部错误，请稍后重试"
-                    }
-                }
-            )
-
-
-class CacheControlMiddleware(BaseHTTPMiddleware):
-    """缓存控制中间件"""
-    
     def __init__(self, app: ASGIApp):
-        super().__init__(app)
-    
-    async def dispatch(self, request: Request, call_next: Callable):
-        response = await call_next(request)
-        
-        # 对GET请求添加缓存头
-        if request.method == "GET" and not request.url.path.startswith("/api/v1/statistics"):
-            response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-        
-        return response
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                etag = scope.get("state", {}).get("etag")
+                if etag and message["status"] in (200, 304):
+                    headers["ETag"] = etag
+                    headers["Cache-Control"] = "private, no-cache"
+                elif not scope["path"].startswith("/api/v1/statistics"):
+                    headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class _GzipEncoder:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """压缩一块并刷新，客户端可立即解出已收到的部分"""
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+ENCODERS = {"gzip": _GzipEncoder}
+if brotli is not None:
+    ENCODERS["br"] = _BrotliEncoder
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """按 Accept-Encoding 选择编码，同时接受时优先 br"""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    for encoding in ("br", "gzip"):
+        if encoding in ENCODERS and (encoding in accepted or "*" in accepted):
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """响应压缩（br / gzip，同时接受时优先 br）
+
+    完整响应小于 minimum_size 时不压缩；流式响应（如导出）逐块压缩并刷新，
+    不等待全部生成。每个路由压缩前后的字节数和耗时计入 /metrics。
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for key, value in scope["headers"]:
+            if key == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        encoder = None
+        passthrough = False
+        bytes_in = bytes_out = 0
+        seconds = 0.0
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, encoder, passthrough, bytes_in, bytes_out, seconds
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # 等第一块响应体确定是否压缩
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(scope=start_message)
+                content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+                if (
+                    "content-encoding" in headers
+                    or content_type not in COMPRESSIBLE_TYPES
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                encoder = ENCODERS[encoding]()
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                started = time.perf_counter()
+                compressed = encoder.compress(body) if more_body else encoder.finish(body)
+                if more_body:
+                    # 流式响应长度未知
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(compressed))
+                await send(start_message)
+            else:
+                started = time.perf_counter()
+                compressed = encoder.compress(body) if more_body else encoder.finish(body)
+
+            seconds += time.perf_counter() - started
+            bytes_in += len(body)
+            bytes_out += len(compressed)
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            if not more_body:
+                metrics.registry.compression_observed(
+                    metrics.route_template(scope), encoding, bytes_in, bytes_out, seconds
+                )
+
+        await self.app(scope, receive, send_wrapper)
+        if start_message is not None and encoder is None and not passthrough:
+            # 只有响应头、没有响应体
+            await send(start_message)
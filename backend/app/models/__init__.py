@@ -8,6 +8,11 @@ from app.models.project import Project
 from app.models.system_config import SystemConfig
 from app.models.invitation_code import InvitationCode
 from app.models.budget import Budget
+from app.models.budget_state import BudgetState
+from app.models.daily_rollup import DailyRollup
+from app.models.idempotency_key import RecordIdempotencyKey
+from app.models.user_usage import UserUsage
+from app.models.data_version import DataVersion
 
 __all__ = [
     "User",
@@ -17,4 +22,9 @@ __all__ = [
     "SystemConfig",
     "InvitationCode",
     "Budget",
+    "BudgetState",
+    "DailyRollup",
+    "RecordIdempotencyKey",
+    "UserUsage",
+    "DataVersion",
 ]
@@ -0,0 +1,28 @@
+"""
+预算状态模型
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Numeric, Index
+from app.database import Base
+
+
+class BudgetState(Base):
+    """预算状态表（当前周期的已支出和预警等级，记账写入时增量维护）"""
+    __tablename__ = "budget_states"
+
+    budget_id = Column(Integer, primary_key=True)  # 每个启用的预算一行
+    user_id = Column(Integer, nullable=False)
+    period_start = Column(Date, nullable=False)
+    period_end = Column(Date, nullable=False)
+    spent = Column(Numeric(14, 2), nullable=False, default=0)
+    usage_rate = Column(Float, nullable=False, default=0)  # 百分比
+    alert_level = Column(String(20), nullable=False, default="normal")  # normal/warning/critical
+    last_evaluated = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # 记账写入时按 用户+日期 查找受影响的预算
+        Index("ix_budget_states_user_period", "user_id", "period_start", "period_end"),
+    )
+
+    def __repr__(self):
+        return f"<BudgetState(budget_id={self.budget_id}, spent={self.spent}, alert_level='{self.alert_level}')>"
@@ -0,0 +1,35 @@
+"""
+每日汇总模型
+"""
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Numeric, Index, func, literal_column
+from app.database import Base
+
+
+class DailyRollup(Base):
+    """每日汇总表（按 用户/日期/类型/分类/项目 聚合的记账金额）"""
+    __tablename__ = "daily_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    date = Column(Date, nullable=False)
+    type = Column(String(10), nullable=False)  # income/expense
+    category_id = Column(Integer, nullable=False)
+    project_id = Column(Integer, nullable=True)
+    amount = Column(Numeric(14, 2), nullable=False, default=0)
+    record_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DailyRollup(user_id={self.user_id}, date={self.date}, type='{self.type}', amount={self.amount})>"
+
+
+# 汇总键：每个键只有一行。project_id 可为空，而唯一索引中 NULL 互不相等，
+# 因此按 coalesce(project_id, 0) 建索引；INSERT ... ON CONFLICT 的冲突目标与之一致
+ROLLUP_KEY_ELEMENTS = [
+    DailyRollup.user_id,
+    DailyRollup.date,
+    DailyRollup.type,
+    DailyRollup.category_id,
+    func.coalesce(DailyRollup.project_id, literal_column("0")),
+]
+
+Index("ix_daily_rollups_key", *ROLLUP_KEY_ELEMENTS, unique=True)
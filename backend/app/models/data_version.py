@@ -0,0 +1,21 @@
+"""
+数据版本模型
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime
+from app.database import Base
+
+
+class DataVersion(Base):
+    """数据版本表：每个用户一行（scope_id 为用户ID），scope_id=0 为系统级数据（如系统分类）
+
+    写操作提交后递增，用于生成 GET 响应的 ETag；持久化保证重启和多进程下单调递增。
+    """
+    __tablename__ = "data_versions"
+
+    scope_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<DataVersion(scope_id={self.scope_id}, version={self.version})>"
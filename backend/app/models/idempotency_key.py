@@ -0,0 +1,24 @@
+"""
+幂等键模型
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from app.database import Base
+
+
+class RecordIdempotencyKey(Base):
+    """记账幂等键表（客户端离线生成的唯一标识 → 已创建的记录）"""
+    __tablename__ = "record_idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    key = Column(String(64), nullable=False)
+    record_id = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ux_record_idempotency_keys_user_key", "user_id", "key", unique=True),
+    )
+
+    def __repr__(self):
+        return f"<RecordIdempotencyKey(user_id={self.user_id}, key='{self.key}', record_id={self.record_id})>"
@@ -3,7 +3,7 @@
 """
 from datetime import datetime, date
 from decimal import Decimal
-from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Date, ForeignKey, Numeric, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -28,5 +28,17 @@ class LedgerRecord(Base):
     category = relationship("Category", backref="ledger_records")
     project = relationship("Project", backref="ledger_records")
 
+    __table_args__ = (
+        # 记录列表的排序键，支持游标分页
+        Index("ix_ledger_records_user_date_created_id", "user_id", "record_date", "created_at", "id"),
+        # 覆盖索引：按 用户+日期范围+类型 过滤后按分类汇总金额（预算、分类统计、汇总重建）
+        Index(
+            "ix_ledger_records_user_date_type_category_amount",
+            "user_id", "record_date", "type", "category_id", "amount",
+        ),
+        # 覆盖索引：项目累计支出
+        Index("ix_ledger_records_project_amount", "project_id", "amount"),
+    )
+
     def __repr__(self):
         return f"<LedgerRecord(id={self.id}, amount={self.amount}, type='{self.type}')>"
@@ -0,0 +1,19 @@
+"""
+用户用量计数模型
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from app.database import Base
+
+
+class UserUsage(Base):
+    """用户用量计数表（记录数、估算存储、最后活跃时间），随记账写入增量维护"""
+    __tablename__ = "user_usage"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    record_count = Column(Integer, nullable=False, default=0)
+    storage_bytes = Column(Integer, nullable=False, default=0)  # 记账记录占用的估算字节数
+    last_active_at = Column(DateTime, nullable=True)  # 最后一次记账写入时间
+
+    def __repr__(self):
+        return f"<UserUsage(user_id={self.user_id}, record_count={self.record_count})>"
@@ -0,0 +1,79 @@
+"""
+JSON 响应
+
+FastJSONResponse 用 orjson 编码（requirements.txt 已固定版本；未安装时退回标准库 json，
+输出格式与 Starlette 的 JSONResponse 相同）；两者都直接支持 Decimal（按浮点数输出，与响应模型中
+的 float 字段一致）、date 和 datetime。
+
+热点接口用 json_response 装饰，直接返回按响应模型字段构建的 dict，只编码一次，
+跳过 FastAPI 对响应模型的校验和二次序列化（response_model 仍保留用于接口文档）。
+设置 FAST_JSON_RESPONSE=true 时 FastJSONResponse 同时作为应用的默认响应类，
+其它接口仍经响应模型校验，只替换最后的编码。
+"""
+import os
+import json
+import inspect
+from datetime import date, datetime
+from decimal import Decimal
+from functools import wraps
+from typing import Any, Callable
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+
+FAST_JSON_RESPONSE = os.getenv("FAST_JSON_RESPONSE", "false").lower() == "true"
+
+
+def _default(value: Any) -> Any:
+    """json 无法直接编码的类型"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """编码为 UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+        default=_default,
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """orjson（可选）编码的 JSON 响应"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(func: Callable) -> Callable:
+    """路由函数返回的 dict 直接编码为 FastJSONResponse，不再经过响应模型"""
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            return FastJSONResponse(await func(*args, **kwargs))
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return FastJSONResponse(func(*args, **kwargs))
+
+    return wrapper
+
+
+def json_backend() -> str:
+    return "orjson" if orjson is not None else "json"
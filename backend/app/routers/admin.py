@@ -8,16 +8,20 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.database import get_db
-from app.models import User, LedgerRecord
+from app.models import User, LedgerRecord, DailyRollup, RecordIdempotencyKey, Budget, BudgetState, UserUsage
 from app.auth.dependencies import get_current_admin
-from app.schemas.auth import UserListResponse
+from app.auth.cache import auth_cache
+from app.services.cache import bump_data_version, stats_cache
+from app.services.categories import category_cache
+from app.services.events import event_broker
+from app.schemas.auth import UserListResponse, UsageReportResponse, UserUsageItem
 
 
 router = APIRouter(prefix="/admin/users", tags=["用户管理"])
 
 
 @router.get("", response_model=UserListResponse)
-async def get_users(
+def get_users(
     is_active: Optional[bool] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
@@ -35,17 +39,17 @@ async def get_users(
     
     total = query.count()
     
-    users = query.order_by(User.created_at.desc()).offset(
+    # 记录数取自用量计数表，随用户一次 JOIN 取回
+    rows = query.outerjoin(
+        UserUsage, UserUsage.user_id == User.id
+    ).add_columns(
+        func.coalesce(UserUsage.record_count, 0).label("record_count")
+    ).order_by(User.created_at.desc()).offset(
         (page - 1) * page_size
     ).limit(page_size).all()
     
     result = []
-    for user in users:
-        # 获取用户记账记录数
-        record_count = db.query(func.count(LedgerRecord.id)).filter(
-            LedgerRecord.user_id == user.id
-        ).scalar()
-        
+    for user, record_count in rows:
         result.append({
             'id': user.id,
             'username': user.username,
@@ -58,8 +62,62 @@ async def get_users(
     return {"total": total, "users": result}
 
 
+USAGE_SORT_COLUMNS = {
+    "records": UserUsage.record_count,
+    "storage": UserUsage.storage_bytes,
+    "last_active": UserUsage.last_active_at,
+}
+
+
+@router.get("/usage", response_model=UsageReportResponse)
+def get_usage_report(
+    sort: str = Query("records", pattern="^(records|storage|last_active)$"),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_admin),
+    db: Session = Depends(get_db)
+):
+    """用量报表：各用户记录数、估算存储、最后活跃时间（读取用量计数表）"""
+    totals = db.query(
+        func.count(User.id).label("users"),
+        func.coalesce(func.sum(UserUsage.record_count), 0).label("records"),
+        func.coalesce(func.sum(UserUsage.storage_bytes), 0).label("storage"),
+    ).outerjoin(UserUsage, UserUsage.user_id == User.id).one()
+    
+    sort_column = USAGE_SORT_COLUMNS[sort]
+    rows = db.query(
+        User.id,
+        User.username,
+        User.is_active,
+        func.coalesce(UserUsage.record_count, 0).label("record_count"),
+        func.coalesce(UserUsage.storage_bytes, 0).label("storage_bytes"),
+        UserUsage.last_active_at,
+    ).outerjoin(
+        UserUsage, UserUsage.user_id == User.id
+    ).order_by(
+        sort_column.is_(None), sort_column.desc(), User.id
+    ).offset((page - 1) * page_size).limit(page_size).all()
+    
+    return UsageReportResponse(
+        total_users=totals.users,
+        total_records=totals.records,
+        total_storage_bytes=totals.storage,
+        users=[
+            UserUsageItem(
+                user_id=r.id,
+                username=r.username,
+                is_active=r.is_active,
+                record_count=r.record_count,
+                storage_bytes=r.storage_bytes,
+                last_active_at=r.last_active_at.isoformat() if r.last_active_at else None,
+            )
+            for r in rows
+        ]
+    )
+
+
 @router.post("/{user_id}/disable")
-async def disable_user(
+def disable_user(
     user_id: int,
     current_user: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -81,12 +139,13 @@ async def disable_user(
     
     user.is_active = False
     db.commit()
+    auth_cache.invalidate_user(user_id)
     
     return {"message": "用户已禁用"}
 
 
 @router.post("/{user_id}/enable")
-async def enable_user(
+def enable_user(
     user_id: int,
     current_user: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -102,12 +161,13 @@ async def enable_user(
     
     user.is_active = True
     db.commit()
+    auth_cache.invalidate_user(user_id)
     
     return {"message": "用户已启用"}
 
 
 @router.delete("/{user_id}")
-async def delete_user(
+def delete_user(
     user_id: int,
     current_user: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -129,9 +189,22 @@ async def delete_user(
     
     # 删除用户的记账记录
     db.query(LedgerRecord).filter(LedgerRecord.user_id == user_id).delete()
+    db.query(DailyRollup).filter(DailyRollup.user_id == user_id).delete()
+    db.query(RecordIdempotencyKey).filter(RecordIdempotencyKey.user_id == user_id).delete()
+    # 预算一并删除：否则零点切换周期时会为已删除的用户重建预算状态
+    db.query(Budget).filter(Budget.user_id == user_id).delete()
+    db.query(BudgetState).filter(BudgetState.user_id == user_id).delete()
+    db.query(UserUsage).filter(UserUsage.user_id == user_id).delete()
     
     # 删除用户
     db.delete(user)
     db.commit()
+    auth_cache.invalidate_user(user_id)
+    # SQLite 会复用最大的用户ID：递增（而不是删除）数据版本，
+    # 新用户不会命中被删用户的统计缓存和 ETag
+    bump_data_version(user_id)
+    stats_cache.invalidate_user(user_id)
+    category_cache.invalidate(user_id)
+    event_broker.close_user(user_id)
     
     return {"message": "用户已删除"}
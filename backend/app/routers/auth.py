@@ -2,13 +2,15 @@
 认证路由
 """
 from datetime import timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.database import get_db
 from app.models import User, InvitationCode, SystemConfig
-from app.auth.password import hash_password, verify_password
+from app.auth.password import hash_password, verify_password, needs_rehash, PasswordPoolBusy
 from app.auth.token import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
 from app.auth.dependencies import get_current_user
 from app.schemas.auth import (
@@ -22,9 +24,17 @@ from app.schemas.auth import (
 router = APIRouter(prefix="/auth", tags=["认证"])
 
 
-@router.post("/register", response_model=RegisterResponse)
-async def register(request: RegisterRequest, db: Session = Depends(get_db)):
-    """用户注册"""
+def password_busy_error() -> HTTPException:
+    """密码哈希线程池排队已满"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="请求过多，请稍后重试",
+        headers={"Retry-After": "1"}
+    )
+
+
+def check_registration(db: Session, request: RegisterRequest) -> Optional[InvitationCode]:
+    """校验邀请码和用户名，返回待标记的邀请码（默认邀请码时为 None）"""
     # 1. 验证邀请码
     invitation = db.query(InvitationCode).filter(
         InvitationCode.code == request.invitation_code,
@@ -51,9 +61,18 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
             detail="用户名已存在"
         )
     
-    # 3. 创建用户
-    hashed_password = hash_password(request.password)
-    
+    # 等待 bcrypt 期间不占用数据库连接，查出的对象保持已加载状态
+    db.close()
+    return invitation
+
+
+def create_user(
+    db: Session,
+    request: RegisterRequest,
+    hashed_password: str,
+    invitation: Optional[InvitationCode]
+) -> User:
+    """创建用户并标记邀请码已使用"""
     # 检查是否是第一个用户（第一个用户为管理员）
     user_count = db.query(func.count(User.id)).scalar()
     is_admin = (user_count == 0)
@@ -67,13 +86,33 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
     db.add(user)
     db.flush()  # 获取用户ID
     
-    # 4. 标记邀请码已使用
     if invitation:
+        db.add(invitation)
         invitation.is_used = True
         invitation.used_by = user.id
         invitation.used_at = func.now()
     
     db.commit()
+    db.refresh(user)  # 提交后属性已过期，在线程中重新加载，避免在事件循环中查询
+    return user
+
+
+@router.post("/register", response_model=RegisterResponse)
+async def register(request: RegisterRequest, db: Session = Depends(get_db)):
+    """用户注册
+
+    数据库操作在线程池中执行，只有 bcrypt 哈希在事件循环中等待（不占用请求线程）。
+    """
+    invitation = await run_in_threadpool(check_registration, db, request)
+    
+    # 3. 加密密码
+    try:
+        hashed_password = await hash_password(request.password)
+    except PasswordPoolBusy:
+        raise password_busy_error()
+    
+    # 4. 创建用户，标记邀请码已使用
+    user = await run_in_threadpool(create_user, db, request, hashed_password, invitation)
     
     # 5. 生成Token（注册后直接返回token）
     token_data = {
@@ -93,11 +132,9 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
     )
 
 
-@router.post("/login", response_model=LoginResponse)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
-    """用户登录"""
-    # 1. 查找用户
-    user = db.query(User).filter(User.username == request.username).first()
+def find_login_user(db: Session, username: str) -> User:
+    """查找登录用户，查询后释放数据库连接"""
+    user = db.query(User).filter(User.username == username).first()
     
     if not user:
         raise HTTPException(
@@ -105,12 +142,37 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
             detail="用户名或密码错误"
         )
     
+    # 等待 bcrypt 期间不占用数据库连接，查出的对象保持已加载状态
+    db.close()
+    return user
+
+
+def save_password_hash(db: Session, user: User, password_hash: str):
+    """保存重新加密的密码"""
+    db.add(user)
+    user.password_hash = password_hash
+    db.commit()
+    db.refresh(user)
+
+
+@router.post("/login", response_model=LoginResponse)
+async def login(request: LoginRequest, db: Session = Depends(get_db)):
+    """用户登录
+
+    数据库操作在线程池中执行，只有 bcrypt 校验在事件循环中等待（不占用请求线程）。
+    """
+    # 1. 查找用户
+    user = await run_in_threadpool(find_login_user, db, request.username)
+    
     # 2. 验证密码
-    if not verify_password(request.password, user.password_hash):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="用户名或密码错误"
-        )
+    try:
+        if not await verify_password(request.password, user.password_hash):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="用户名或密码错误"
+            )
+    except PasswordPoolBusy:
+        raise password_busy_error()
     
     # 3. 检查用户状态
     if not user.is_active:
@@ -119,7 +181,15 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
             detail="账户已被禁用"
         )
     
-    # 4. 生成Token
+    # 4. 成本因子变更后用新配置重新加密（失败不影响本次登录）
+    if needs_rehash(user.password_hash):
+        try:
+            password_hash = await hash_password(request.password)
+            await run_in_threadpool(save_password_hash, db, user, password_hash)
+        except PasswordPoolBusy:
+            pass
+    
+    # 5. 生成Token
     token_data = {
         "sub": user.id,
         "username": user.username,
@@ -5,11 +5,14 @@ from typing import Optional, List
 from datetime import date, datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from app.database import get_db
-from app.models import User, Category, LedgerRecord, Project, SystemConfig
+from app.models import User, Category, Project, SystemConfig, BudgetState
 from app.auth.dependencies import get_current_user
+from app.services.cache import cached_response, bump_data_version
+from app.services.budget_eval import get_period_range, evaluate_budgets
+from app.services.budget_state import refresh_states, is_stale
+from app.responses import json_response
 from app.schemas.budget import (
     BudgetCreate,
     BudgetUpdate,
@@ -34,94 +37,19 @@ except:
 router = APIRouter(prefix="/budgets", tags=["预算管理"])
 
 
-def get_period_range(period: str, budget) -> tuple:
-    """获取预算周期范围"""
-    today = date.today()
-    
-    if period == "monthly":
-        start = date(today.year, today.month, 1)
-        if today.month == 12:
-            end = date(today.year + 1, 1, 1) - timedelta(days=1)
-        else:
-            end = date(today.year, today.month + 1, 1) - timedelta(days=1)
-    elif period == "yearly":
-        start = date(today.year, 1, 1)
-        end = date(today.year, 12, 31)
-    elif budget.start_date and budget.end_date:
-        start = budget.start_date
-        end = budget.end_date
-    else:
-        start = date(today.year, today.month, 1)
-        end = date(today.year, today.month, 31)
-    
-    return start, end
-
-
 def calculate_budget_status(db: Session, budget, start: date, end: date) -> Optional[BudgetStatus]:
-    """计算预算状态"""
-    # 计算已支出
-    query = db.query(func.sum(LedgerRecord.amount)).filter(
-        LedgerRecord.user_id == budget.user_id,
-        LedgerRecord.record_date >= start,
-        LedgerRecord.record_date <= end,
-        LedgerRecord.type == "expense"
-    )
-    
-    if budget.category_id:
-        query = query.filter(LedgerRecord.category_id == budget.category_id)
-    
-    spent = float(query.scalar() or 0)
-    remaining = float(budget.amount) - spent
-    usage_rate = (spent / float(budget.amount) * 100) if float(budget.amount) > 0 else 0
-    
-    # 计算剩余天数
-    today = date.today()
-    total_days = (end - start).days + 1
-    days_passed = (today - start).days
-    days_remaining = max(0, (end - today).days + 1)
-    
-    # 预测本月剩余支出
-    if days_passed > 0:
-        daily_avg = spent / days_passed
-        projected = daily_avg * total_days
-    else:
-        projected = spent
-    
-    # 预警等级
-    alert_level = "normal"
-    if usage_rate >= budget.alert_threshold:
-        alert_level = "warning"
-    if spent >= budget.amount:
-        alert_level = "critical"
-    
-    # 获取分类信息
-    category = None
-    if budget.category_id:
-        category = db.query(Category).filter(Category.id == budget.category_id).first()
-    
-    return BudgetStatus(
-        budget_id=budget.id,
-        budget_name=budget.name,
-        category_id=budget.category_id,
-        category_name=category.name if category else None,
-        category_icon=category.icon if category else None,
-        planned=budget.amount,
-        spent=spent,
-        remaining=remaining,
-        usage_rate=round(usage_rate, 2),
-        alert_level=alert_level,
-        days_remaining=days_remaining,
-        projected_spending=round(projected, 2) if days_passed > 0 else None
-    )
+    """计算单个预算状态"""
+    return evaluate_budgets(db, [(budget, start, end)])[0]
 
 
 @router.get("", response_model=BudgetListResponse)
-async def get_budgets(
+@json_response
+def get_budgets(
     include_inactive: bool = Query(False),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """获取预算列表"""
+    """获取预算列表（直接构建 BudgetListResponse 结构的 dict）"""
     query = db.query(BudgetModel).filter(BudgetModel.user_id == current_user.id)
     
     if not include_inactive:
@@ -132,42 +60,43 @@ async def get_budgets(
     total_planned = 0
     total_spent = 0
     
+    statuses = evaluate_budgets(db, [
+        (budget, *get_period_range(budget.period, budget)) for budget in budgets
+    ])
+    
     result = []
-    for budget in budgets:
-        start, end = get_period_range(budget.period, budget)
-        status = calculate_budget_status(db, budget, start, end)
-        
+    for budget, status in zip(budgets, statuses):
         if status:
             total_planned += budget.amount
             total_spent += status.spent
         
-        result.append(BudgetResponse(
-            id=budget.id,
-            user_id=budget.user_id,
-            category_id=budget.category_id,
-            name=budget.name,
-            amount=budget.amount,
-            period=budget.period,
-            start_date=budget.start_date,
-            end_date=budget.end_date,
-            alert_threshold=budget.alert_threshold,
-            is_active=budget.is_active,
-            status=status,
-            created_at=budget.created_at.isoformat() if budget.created_at else None,
-            updated_at=budget.updated_at.isoformat() if budget.updated_at else None
-        ))
-    
-    return BudgetListResponse(
-        total=len(result),
-        budgets=result,
-        total_planned=total_planned,
-        total_spent=total_spent,
-        total_remaining=total_planned - total_spent
-    )
+        result.append({
+            "id": budget.id,
+            "user_id": budget.user_id,
+            "category_id": budget.category_id,
+            "name": budget.name,
+            "amount": float(budget.amount),
+            "period": budget.period,
+            "start_date": budget.start_date,
+            "end_date": budget.end_date,
+            "alert_threshold": float(budget.alert_threshold),
+            "is_active": budget.is_active,
+            "status": status.model_dump() if status else None,
+            "created_at": budget.created_at.isoformat() if budget.created_at else None,
+            "updated_at": budget.updated_at.isoformat() if budget.updated_at else None,
+        })
+    
+    return {
+        "total": len(result),
+        "budgets": result,
+        "total_planned": float(total_planned),
+        "total_spent": float(total_spent),
+        "total_remaining": float(total_planned - total_spent),
+    }
 
 
 @router.post("", response_model=BudgetResponse)
-async def create_budget(
+def create_budget(
     budget: BudgetCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -190,14 +119,55 @@ async def create_budget(
         **budget.model_dump()
     )
     db.add(db_budget)
+    refresh_states(db, current_user.id)
     db.commit()
     db.refresh(db_budget)
+    bump_data_version(current_user.id)
+    
+    return get_budget_detail(db_budget.id, current_user, db)
+
+
+@router.get("/alerts")
+def get_budget_alerts(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取预算预警（读取预先计算的预算状态，各预算按各自的当前周期）"""
+    def load():
+        return db.query(BudgetModel, BudgetState, Category.name).outerjoin(
+            BudgetState, BudgetState.budget_id == BudgetModel.id
+        ).outerjoin(
+            Category, Category.id == BudgetModel.category_id
+        ).filter(
+            BudgetModel.user_id == current_user.id,
+            BudgetModel.is_active == True
+        ).all()
+
+    rows = load()
+    # 状态缺失或周期已切换而后台任务尚未处理时当场补算
+    if any(is_stale(budget, state) for budget, state, _ in rows):
+        refresh_states(db, current_user.id)
+        db.commit()
+        rows = load()
+    
+    alerts = []
+    for budget, state, category_name in rows:
+        if state.alert_level != "normal":
+            alerts.append(BudgetAlert(
+                budget_id=budget.id,
+                budget_name=budget.name,
+                category_name=category_name,
+                current_spent=float(state.spent),
+                budget_amount=budget.amount,
+                usage_rate=round(state.usage_rate, 2),
+                alert_type="threshold" if state.alert_level == "warning" else "exceeded"
+            ))
     
-    return await get_budget_detail(db_budget.id, current_user, db)
+    return {"alerts": alerts, "count": len(alerts)}
 
 
 @router.get("/{budget_id}", response_model=BudgetResponse)
-async def get_budget_detail(
+def get_budget_detail(
     budget_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -235,7 +205,7 @@ async def get_budget_detail(
 
 
 @router.put("/{budget_id}", response_model=BudgetResponse)
-async def update_budget(
+def update_budget(
     budget_id: int,
     budget_update: BudgetUpdate,
     current_user: User = Depends(get_current_user),
@@ -256,14 +226,16 @@ async def update_budget(
     for key, value in budget_update.model_dump(exclude_unset=True).items():
         setattr(db_budget, key, value)
     
+    refresh_states(db, current_user.id)
     db.commit()
     db.refresh(db_budget)
+    bump_data_version(current_user.id)
     
-    return await get_budget_detail(db_budget.id, current_user, db)
+    return get_budget_detail(db_budget.id, current_user, db)
 
 
 @router.delete("/{budget_id}")
-async def delete_budget(
+def delete_budget(
     budget_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -281,13 +253,16 @@ async def delete_budget(
         )
     
     db.delete(db_budget)
+    refresh_states(db, current_user.id)
     db.commit()
+    bump_data_version(current_user.id)
     
     return {"message": "删除成功"}
 
 
 @router.get("/summary/current", response_model=BudgetSummary)
-async def get_budget_summary(
+@cached_response("budgets.summary_current")
+def get_budget_summary(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -311,8 +286,8 @@ async def get_budget_summary(
     alerts = []
     category_statuses = []
     
-    for budget in budgets:
-        status = calculate_budget_status(db, budget, start, end)
+    statuses = evaluate_budgets(db, [(budget, start, end) for budget in budgets])
+    for budget, status in zip(budgets, statuses):
         if status:
             total_spent += status.spent
             category_statuses.append(status)
@@ -339,38 +314,3 @@ async def get_budget_summary(
         alerts=alerts,
         category_budgets=category_statuses
     )
-
-
-@router.get("/alerts")
-async def get_budget_alerts(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """获取预算预警"""
-    today = date.today()
-    start = date(today.year, today.month, 1)
-    if today.month == 12:
-        end = date(today.year + 1, 1, 1) - timedelta(days=1)
-    else:
-        end = date(today.year, today.month + 1, 1) - timedelta(days=1)
-    
-    budgets = db.query(BudgetModel).filter(
-        BudgetModel.user_id == current_user.id,
-        BudgetModel.is_active == True
-    ).all()
-    
-    alerts = []
-    for budget in budgets:
-        status = calculate_budget_status(db, budget, start, end)
-        if status and status.alert_level != "normal":
-            alerts.append(BudgetAlert(
-                budget_id=budget.id,
-                budget_name=budget.name,
-                category_name=status.category_name,
-                current_spent=status.spent,
-                budget_amount=status.planned,
-                usage_rate=status.usage_rate,
-                alert_type="threshold" if status.alert_level == "warning" else "exceeded"
-            ))
-    
-    return {"alerts": alerts, "count": len(alerts)}
@@ -9,6 +9,8 @@ from sqlalchemy import or_
 from app.database import get_db
 from app.models import User, Category
 from app.auth.dependencies import get_current_user
+from app.services.cache import bump_data_version
+from app.services.categories import category_cache, build_tree
 from app.schemas.category import (
     CategoryCreate,
     CategoryUpdate,
@@ -21,7 +23,7 @@ router = APIRouter(prefix="/categories", tags=["分类"])
 
 
 @router.get("", response_model=List[CategoryResponse])
-async def get_categories(
+def get_categories(
     type: Optional[str] = None,
     include_private: bool = True,
     current_user: User = Depends(get_current_user),
@@ -47,60 +49,18 @@ async def get_categories(
 
 
 @router.get("/tree", response_model=List[CategoryTreeResponse])
-async def get_category_tree(
+def get_category_tree(
     type: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """获取分类树形结构"""
-    # 获取一级分类
-    base_query = db.query(Category).filter(Category.parent_id.is_(None))
-    
-    if type:
-        base_query = base_query.filter(Category.type == type)
-    
-    # 添加用户私有的一级分类
-    system_cats = base_query.filter(Category.user_id.is_(None))
-    private_cats = base_query.filter(Category.user_id == current_user.id)
-    parents = system_cats.union(private_cats).order_by(Category.sort_order).all()
-    
-    result = []
-    for parent in parents:
-        children = db.query(Category).filter(
-            Category.parent_id == parent.id,
-            or_(Category.user_id.is_(None), Category.user_id == current_user.id)
-        ).order_by(Category.sort_order).all()
-        
-        # 转换children中的datetime为字符串
-        children_data = []
-        for child in children:
-            children_data.append({
-                'id': child.id,
-                'user_id': child.user_id,
-                'name': child.name,
-                'parent_id': child.parent_id,
-                'icon': child.icon,
-                'type': child.type,
-                'is_system': child.is_system,
-                'sort_order': child.sort_order,
-                'created_at': child.created_at.isoformat() if child.created_at else None,
-                'updated_at': child.updated_at.isoformat() if child.updated_at else None,
-            })
-        
-        result.append(CategoryTreeResponse(
-            id=parent.id,
-            name=parent.name,
-            icon=parent.icon,
-            type=parent.type,
-            is_system=parent.is_system,
-            children=children_data
-        ))
-    
-    return result
+    """获取分类树形结构（系统分类走缓存，一次查询）"""
+    categories = category_cache.visible(db, current_user.id)
+    return build_tree(categories, type)
 
 
 @router.post("", response_model=CategoryResponse)
-async def create_category(
+def create_category(
     category: CategoryCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -129,11 +89,14 @@ async def create_category(
     db.add(db_category)
     db.commit()
     db.refresh(db_category)
+    category_cache.invalidate(db_category.user_id)
+    # 系统分类（user_id为空）对所有用户可见，递增全局版本
+    bump_data_version(db_category.user_id)
     return db_category
 
 
 @router.put("/{category_id}", response_model=CategoryResponse)
-async def update_category(
+def update_category(
     category_id: int,
     category_update: CategoryUpdate,
     current_user: User = Depends(get_current_user),
@@ -164,11 +127,13 @@ async def update_category(
     
     db.commit()
     db.refresh(db_category)
+    category_cache.invalidate(db_category.user_id)
+    bump_data_version(db_category.user_id)
     return db_category
 
 
 @router.delete("/{category_id}")
-async def delete_category(
+def delete_category(
     category_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -191,5 +156,7 @@ async def delete_category(
     # 删除当前分类
     db.delete(db_category)
     db.commit()
+    category_cache.invalidate(current_user.id)
+    bump_data_version(current_user.id)
     
     return {"message": "删除成功"}
@@ -0,0 +1,114 @@
+"""
+事件推送路由（Server-Sent Events）
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+
+from app.database import SessionLocal
+from app.models import User
+from app.auth.dependencies import get_current_user, load_user
+from app.auth.token import create_stream_ticket, decode_stream_ticket, STREAM_TICKET_EXPIRE_SECONDS
+from app.services.events import (
+    event_broker,
+    format_event,
+    TooManyConnections,
+    EVENTS_HEARTBEAT_SECONDS,
+    EVENTS_RETRY_MS,
+)
+
+
+router = APIRouter(prefix="/events", tags=["事件推送"])
+
+# 事件流可以用票据代替 Authorization 头
+optional_security = HTTPBearer(auto_error=False)
+
+
+@router.post("/ticket")
+def create_ticket(current_user: User = Depends(get_current_user)):
+    """获取事件流票据（浏览器 EventSource 无法设置请求头，以 ?ticket= 传入）"""
+    return {
+        "ticket": create_stream_ticket(current_user.id),
+        "expires_in": STREAM_TICKET_EXPIRE_SECONDS
+    }
+
+
+def get_stream_user_id(
+    ticket: Optional[str] = Query(None, description="事件流票据（POST /events/ticket 获取）"),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> int:
+    """认证事件流用户（Authorization 头或票据）
+
+    不使用 get_db：请求级会话会一直保持到长连接结束，这里认证完即关闭。
+    """
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="无法验证凭据",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    db = SessionLocal()
+    try:
+        if credentials is not None:
+            return get_current_user(credentials, db).id
+        if ticket is None:
+            raise credentials_exception
+        user_id = decode_stream_ticket(ticket)
+        user = load_user(db, user_id) if user_id is not None else None
+        if user is None:
+            raise credentials_exception
+        if not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="用户已被禁用"
+            )
+        return user.id
+    finally:
+        db.close()
+
+
+@router.get("")
+async def stream_events(user_id: int = Depends(get_stream_user_id)):
+    """订阅当前用户的事件流
+
+    事件类型：record.created / record.updated / record.deleted（data.ids 为记录ID，
+    导入时为 null）、budget.alert（预警等级变化）、stats.invalidated（统计数据需刷新）、
+    resync（连接积压过多已丢弃事件，需全量刷新）。
+    """
+    try:
+        event_broker.check_capacity(user_id)
+    except TooManyConnections:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="事件流连接数过多"
+        )
+
+    async def stream():
+        # 在开始发送响应体时才订阅：客户端提前断开或响应头发送失败时不会遗留订阅，
+        # 订阅一旦建立，生成器结束（包括被取消）时必定取消订阅
+        try:
+            subscription = event_broker.subscribe(user_id)
+        except TooManyConnections:
+            # 检查之后其它连接抢先占满了名额：直接结束，客户端按 retry 间隔重连
+            yield f"retry: {EVENTS_RETRY_MS}\n\n".encode("utf-8")
+            return
+        try:
+            yield f"retry: {EVENTS_RETRY_MS}\n\n".encode("utf-8") + format_event("ready", {"user_id": user_id})
+            while True:
+                chunk = await subscription.next_chunk(EVENTS_HEARTBEAT_SECONDS)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            event_broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # 关闭 nginx 等反向代理的响应缓冲
+            "X-Accel-Buffering": "no",
+        },
+    )
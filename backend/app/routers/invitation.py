@@ -4,7 +4,7 @@
 from typing import Optional
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, aliased
 from sqlalchemy import func
 
 from app.database import get_db
@@ -21,7 +21,7 @@ router = APIRouter(prefix="/invitations", tags=["邀请码管理"])
 
 
 @router.get("", response_model=InvitationCodeListResponse)
-async def get_invitation_codes(
+def get_invitation_codes(
     is_used: Optional[bool] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
@@ -36,31 +36,31 @@ async def get_invitation_codes(
     
     total = query.count()
     
-    codes = query.order_by(InvitationCode.created_at.desc()).offset(
+    # 创建者和使用者用户名一次 JOIN 取回
+    creator = aliased(User)
+    used_by_user = aliased(User)
+    rows = query.outerjoin(
+        creator, creator.id == InvitationCode.created_by
+    ).outerjoin(
+        used_by_user, used_by_user.id == InvitationCode.used_by
+    ).add_columns(
+        creator.username.label("creator_name"),
+        used_by_user.username.label("used_by_name"),
+    ).order_by(InvitationCode.created_at.desc()).offset(
         (page - 1) * page_size
     ).limit(page_size).all()
     
     result = []
-    for code in codes:
-        # 获取创建者信息
-        creator = db.query(User).filter(User.id == code.created_by).first()
-        creator_name = creator.username if creator else '系统'
-        
-        # 获取使用者信息
-        user = None
-        if code.used_by:
-            user = db.query(User).filter(User.id == code.used_by).first()
-        used_by_name = user.username if user else None
-        
+    for code, creator_name, used_by_name in rows:
         result.append({
             'id': code.id,
             'code': code.code,
             'is_used': code.is_used,
             'used_by': code.used_by,
-            'used_by_name': used_by_name,
+            'used_by_name': used_by_name if code.used_by else None,
             'used_at': code.used_at.isoformat() if code.used_at else None,
             'created_by': code.created_by,
-            'created_by_name': creator_name,
+            'created_by_name': creator_name or '系统',
             'expires_at': code.expires_at.isoformat() if code.expires_at else None,
             'created_at': code.created_at.isoformat() if code.created_at else None,
         })
@@ -69,7 +69,7 @@ async def get_invitation_codes(
 
 
 @router.post("", response_model=InvitationCodeResponse)
-async def create_invitation_code(
+def create_invitation_code(
     request: InvitationCodeCreate,
     current_user: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -113,7 +113,7 @@ async def create_invitation_code(
 
 
 @router.delete("/{code_id}")
-async def delete_invitation_code(
+def delete_invitation_code(
     code_id: int,
     current_user: User = Depends(get_current_admin),
     db: Session = Depends(get_db)
@@ -5,17 +5,20 @@ from typing import Optional, List
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from app.database import get_db
 from app.models import User, Project, LedgerRecord
 from app.auth.dependencies import get_current_user
+from app.services import rollup
+from app.services.cache import bump_data_version
+from app.services.project_stats import project_totals, build_project_stats, project_breakdown
 from app.schemas.project import (
     ProjectCreate,
     ProjectUpdate,
     ProjectResponse,
     ProjectStats,
     ProjectListResponse,
+    ProjectBreakdownResponse,
 )
 
 
@@ -24,27 +27,12 @@ router = APIRouter(prefix="/projects", tags=["项目"])
 
 def calculate_project_stats(db: Session, project: Project) -> ProjectStats:
     """计算项目统计"""
-    total_spent = db.query(func.sum(LedgerRecord.amount)).filter(
-        LedgerRecord.project_id == project.id
-    ).scalar() or 0
-    
-    budget_usage_rate = 0
-    if project.budget and project.budget > 0:
-        budget_usage_rate = round((total_spent / project.budget) * 100, 2)
-    
-    per_person_cost = 0
-    if project.member_count and project.member_count > 0:
-        per_person_cost = round(total_spent / project.member_count, 2)
-    
-    return ProjectStats(
-        total_spent=float(total_spent),
-        budget_usage_rate=budget_usage_rate,
-        per_person_cost=per_person_cost
-    )
+    totals = project_totals(db, project.user_id, [project.id])
+    return build_project_stats(project, totals.get(project.id))
 
 
 @router.get("")
-async def get_projects(
+def get_projects(
     status: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
@@ -63,9 +51,12 @@ async def get_projects(
         (page - 1) * page_size
     ).limit(page_size).all()
     
+    # 本页所有项目的合计一次分组查询取回
+    totals = project_totals(db, current_user.id, (p.id for p in projects))
+    
     result = []
     for project in projects:
-        stats = calculate_project_stats(db, project)
+        stats = build_project_stats(project, totals.get(project.id))
         
         # 转换datetime为字符串
         p_dict = {
@@ -88,7 +79,7 @@ async def get_projects(
 
 
 @router.get("/{project_id}")
-async def get_project(
+def get_project(
     project_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -123,8 +114,29 @@ async def get_project(
     }
 
 
+@router.get("/{project_id}/stats", response_model=ProjectBreakdownResponse)
+def get_project_stats(
+    project_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取项目统计明细（按分类、按月份）"""
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == current_user.id
+    ).first()
+    
+    if not project:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="项目不存在"
+        )
+    
+    return project_breakdown(db, project)
+
+
 @router.post("")
-async def create_project(
+def create_project(
     project: ProjectCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -145,6 +157,7 @@ async def create_project(
     db.add(db_project)
     db.commit()
     db.refresh(db_project)
+    bump_data_version(current_user.id)
     
     stats = ProjectStats()
     
@@ -165,7 +178,7 @@ async def create_project(
 
 
 @router.put("/{project_id}", response_model=ProjectResponse)
-async def update_project(
+def update_project(
     project_id: int,
     project_update: ProjectUpdate,
     current_user: User = Depends(get_current_user),
@@ -197,6 +210,7 @@ async def update_project(
     
     db.commit()
     db.refresh(db_project)
+    bump_data_version(current_user.id)
     
     stats = calculate_project_stats(db, db_project)
     
@@ -217,7 +231,7 @@ async def update_project(
 
 
 @router.delete("/{project_id}")
-async def delete_project(
+def delete_project(
     project_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -238,8 +252,10 @@ async def delete_project(
     db.query(LedgerRecord).filter(
         LedgerRecord.project_id == project_id
     ).update({"project_id": None})
+    rollup.rebuild_rollups(db, current_user.id)
     
     db.delete(db_project)
     db.commit()
+    bump_data_version(current_user.id)
     
     return {"message": "删除成功"}
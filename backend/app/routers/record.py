@@ -1,28 +1,120 @@
 """
 记账记录路由
 """
+import io
+import json
+import base64
+import binascii
 from typing import Optional, List
 from datetime import date, datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import func, or_, and_
+from sqlalchemy.exc import IntegrityError
 
 from app.database import get_db
 from app.models import User, Category, LedgerRecord, Project
 from app.auth.dependencies import get_current_user
+from app.services import rollup, record_batch
+from app.services.export import stream_export, MEDIA_TYPES
+from app.services.importer import import_csv, ImportFormatError
+from app.services.cache import bump_data_version
+from app.services.events import event_broker
+from app.responses import json_response
 from app.schemas.record import (
     RecordCreate,
     RecordUpdate,
     RecordResponse,
     RecordListResponse,
+    RecordBatchCreate,
+    RecordBatchUpdate,
+    RecordBatchDelete,
+    RecordBatchResponse,
+    ImportResponse,
 )
 
 
 router = APIRouter(prefix="/records", tags=["记账"])
 
+# 列表接口查询的列
+RECORD_LIST_COLUMNS = (
+    LedgerRecord.id,
+    LedgerRecord.user_id,
+    LedgerRecord.category_id,
+    LedgerRecord.amount,
+    LedgerRecord.type,
+    LedgerRecord.remark,
+    LedgerRecord.project_id,
+    LedgerRecord.record_date,
+    LedgerRecord.created_at,
+    LedgerRecord.updated_at,
+)
+
+
+def publish_record_event(user_id: int, name: str, ids: List[int]):
+    """推送记录变更事件（事件流客户端据此只刷新变化的记录）"""
+    event_broker.publish(user_id, name, {"ids": ids, "count": len(ids)})
+
+
+def publish_batch_event(user_id: int, name: str, result: RecordBatchResponse, status_name: str):
+    """推送批量操作中成功的记录"""
+    ids = [r.id for r in result.results if r.status == status_name]
+    if ids:
+        publish_record_event(user_id, name, ids)
+
+
+def encode_cursor(record: LedgerRecord) -> str:
+    """将记录的排序键 (record_date, created_at, id) 编码为不透明游标"""
+    payload = [
+        record.record_date.isoformat(),
+        record.created_at.isoformat() if record.created_at else None,
+        record.id,
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """解析游标，格式错误时返回400"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        record_date, created_at, record_id = json.loads(raw)
+        return (
+            date.fromisoformat(record_date),
+            datetime.fromisoformat(created_at) if created_at else None,
+            int(record_id),
+        )
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+
+def after_cursor(record_date: date, created_at: Optional[datetime], record_id: int):
+    """按 (record_date, created_at, id) 倒序时，位于游标之后的记录条件"""
+    if created_at is None:
+        # created_at为空的记录排在同一天的最后
+        same_day = and_(
+            LedgerRecord.created_at.is_(None),
+            LedgerRecord.id < record_id
+        )
+    else:
+        same_day = or_(
+            LedgerRecord.created_at < created_at,
+            LedgerRecord.created_at.is_(None),
+            and_(LedgerRecord.created_at == created_at, LedgerRecord.id < record_id)
+        )
+    return or_(
+        LedgerRecord.record_date < record_date,
+        and_(LedgerRecord.record_date == record_date, same_day)
+    )
 
-@router.get("")
-async def get_records(
+
+@router.get("", response_model=RecordListResponse)
+@json_response
+def get_records(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     record_type: Optional[str] = Query(None, alias="type"),
@@ -30,11 +122,18 @@ async def get_records(
     project_id: Optional[int] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = True,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """获取记账列表"""
-    query = db.query(LedgerRecord).filter(LedgerRecord.user_id == current_user.id)
+    """获取记账列表
+
+    支持两种分页方式：page/page_size 偏移分页（兼容旧客户端），
+    以及传入上一页返回的 next_cursor 进行游标分页；include_total=false 时跳过总数统计。
+    只查询列（不构建ORM对象），直接返回 RecordListResponse 结构的 dict。
+    """
+    query = db.query(*RECORD_LIST_COLUMNS).filter(LedgerRecord.user_id == current_user.id)
     
     if start_date:
         query = query.filter(LedgerRecord.record_date >= start_date)
@@ -48,40 +147,53 @@ async def get_records(
         query = query.filter(LedgerRecord.project_id == project_id)
     
     # 统计总数
-    total = query.count()
+    total = query.count() if include_total else None
     
-    # 分页查询
-    records = query.order_by(
+    # 分页查询（多取一条用于判断是否还有下一页）
+    query = query.order_by(
         LedgerRecord.record_date.desc(),
-        LedgerRecord.created_at.desc()
-    ).offset((page - 1) * page_size).limit(page_size).all()
+        LedgerRecord.created_at.desc(),
+        LedgerRecord.id.desc()
+    )
+    if cursor:
+        query = query.filter(after_cursor(*decode_cursor(cursor)))
+    else:
+        query = query.offset((page - 1) * page_size)
+    records = query.limit(page_size + 1).all()
+    
+    next_cursor = None
+    if len(records) > page_size:
+        records = records[:page_size]
+        next_cursor = encode_cursor(records[-1])
     
     # 转换records为字典列表
-    records_data = []
-    for r in records:
-        records_data.append({
+    records_data = [
+        {
             'id': r.id,
             'user_id': r.user_id,
             'category_id': r.category_id,
-            'amount': r.amount,
+            'amount': float(r.amount),
             'type': r.type,
             'remark': r.remark,
             'project_id': r.project_id,
             'record_date': str(r.record_date),
             'created_at': r.created_at.isoformat() if r.created_at else None,
             'updated_at': r.updated_at.isoformat() if r.updated_at else None,
-        })
+        }
+        for r in records
+    ]
     
-    return RecordListResponse(
-        total=total,
-        page=page,
-        page_size=page_size,
-        records=records_data
-    )
+    return {
+        'total': total,
+        'page': page,
+        'page_size': page_size,
+        'records': records_data,
+        'next_cursor': next_cursor,
+    }
 
 
 @router.get("/summary")
-async def get_records_summary(
+def get_records_summary(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     current_user: User = Depends(get_current_user),
@@ -121,8 +233,78 @@ async def get_records_summary(
     }
 
 
+@router.get("/export")
+def export_records(
+    export_format: str = Query("csv", alias="format", pattern="^(csv|jsonl)$"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    record_type: Optional[str] = Query(None, alias="type"),
+    category_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """导出记账（CSV 或 JSON Lines，流式输出）"""
+    content = stream_export(
+        current_user.id,
+        export_format,
+        start_date=start_date,
+        end_date=end_date,
+        record_type=record_type,
+        category_id=category_id,
+        project_id=project_id,
+    )
+    filename = f"ledger_{date.today().strftime('%Y%m%d')}.{export_format}"
+    return StreamingResponse(
+        content,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/import", response_model=ImportResponse)
+def import_records(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """导入记账（CSV，UTF-8 或 GBK 编码）
+
+    支持本系统导出的格式和常见的中文账单表头；与已有记录内容相同的行会被跳过。
+    """
+    encoding = "utf-8-sig"
+    head = file.file.read(4096)
+    file.file.seek(0)
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # 截断在多字节字符中间时不算编码错误
+        if e.start < len(head) - 3:
+            encoding = "gb18030"
+
+    stream = io.TextIOWrapper(file.file, encoding=encoding, newline="")
+    try:
+        result = import_csv(db, current_user.id, stream)
+    except ImportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="文件编码无法识别，请使用UTF-8或GBK编码"
+        )
+    finally:
+        stream.detach()
+    if result.imported:
+        bump_data_version(current_user.id)
+        # 导入不逐条返回ID，ids 为 null 表示需要整体刷新
+        event_broker.publish(current_user.id, "record.created", {"ids": None, "count": result.imported})
+    return result
+
+
 @router.post("", response_model=RecordResponse)
-async def create_record(
+def create_record(
     record: RecordCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -157,8 +339,12 @@ async def create_record(
         **record.model_dump()
     )
     db.add(db_record)
+    db.flush()
+    rollup.add_record(db, db_record)
     db.commit()
     db.refresh(db_record)
+    bump_data_version(current_user.id)
+    publish_record_event(current_user.id, "record.created", [db_record.id])
     
     # 转换datetime为字符串
     return {
@@ -175,8 +361,70 @@ async def create_record(
     }
 
 
+# 批量接口需声明在 /{record_id} 之前，避免 "batch" 被当作记录ID匹配
+@router.post("/batch", response_model=RecordBatchResponse)
+def create_records_batch(
+    batch: RecordBatchCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """批量创建记账
+
+    单个事务内插入所有合法记录并逐条返回结果；
+    携带 client_id 的记录重复提交时返回 duplicate 和已创建的记录ID。
+    """
+    for _ in range(2):
+        try:
+            result = record_batch.create_records(db, current_user.id, batch.records)
+            db.commit()
+            break
+        except IntegrityError:
+            # 并发重试同一 client_id 时由唯一索引兜底：回滚后重新执行，
+            # 另一请求已创建的记录按 duplicate 返回其记录ID
+            db.rollback()
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="重复提交，请稍后重试"
+        )
+    if result.succeeded:
+        bump_data_version(current_user.id)
+        publish_batch_event(current_user.id, "record.created", result, "created")
+    return result
+
+
+@router.put("/batch", response_model=RecordBatchResponse)
+def update_records_batch(
+    batch: RecordBatchUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """批量更新记账"""
+    result = record_batch.update_records(db, current_user.id, batch.records)
+    db.commit()
+    if result.succeeded:
+        bump_data_version(current_user.id)
+        publish_batch_event(current_user.id, "record.updated", result, "updated")
+    return result
+
+
+@router.post("/batch/delete", response_model=RecordBatchResponse)
+def delete_records_batch(
+    batch: RecordBatchDelete,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """批量删除记账"""
+    result = record_batch.delete_records(db, current_user.id, batch.ids)
+    db.commit()
+    if result.succeeded:
+        bump_data_version(current_user.id)
+        publish_batch_event(current_user.id, "record.deleted", result, "deleted")
+    return result
+
+
 @router.put("/{record_id}", response_model=dict)
-async def update_record(
+def update_record(
     record_id: int,
     record_update: RecordUpdate,
     current_user: User = Depends(get_current_user),
@@ -206,10 +454,16 @@ async def update_record(
                 detail="分类不存在"
             )
     
+    old_snapshot = rollup.snapshot_record(db_record)
     for key, value in record_update.model_dump(exclude_unset=True).items():
         setattr(db_record, key, value)
     
+    # 同步每日汇总：先扣除旧值再累加新值
+    rollup.remove_record(db, old_snapshot)
+    rollup.add_record(db, db_record)
     db.commit()
+    bump_data_version(current_user.id)
+    publish_record_event(current_user.id, "record.updated", [record_id])
     db.refresh(db_record)
     
     # 转换datetime为字符串
@@ -228,7 +482,7 @@ async def update_record(
 
 
 @router.delete("/{record_id}")
-async def delete_record(
+def delete_record(
     record_id: int,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -245,6 +499,9 @@ async def delete_record(
             detail="记录不存在"
         )
     
+    rollup.remove_record(db, rollup.snapshot_record(db_record))
     db.delete(db_record)
     db.commit()
+    bump_data_version(current_user.id)
+    publish_record_event(current_user.id, "record.deleted", [record_id])
     return {"message": "删除成功"}
@@ -8,11 +8,15 @@ from sqlalchemy.orm import Session
 from sqlalchemy import func
 
 from app.database import get_db
-from app.models import User, Category, LedgerRecord, Project
+from app.models import User, LedgerRecord, Project, DailyRollup
 from app.auth.dependencies import get_current_user
+from app.services.rollup_query import rollup_query
+from app.services.dashboard import build_dashboard
+from app.services.cache import cached_response
+from app.services.categories import get_user_categories
+from app.responses import json_response
 from app.schemas.statistics import (
     DateRangeStats,
-    DailyStats,
     DailyStatsResponse,
     MonthlyStats,
     MonthlyStatsResponse,
@@ -43,8 +47,35 @@ def get_date_range(year: int, month: Optional[int] = None) -> tuple:
     return start_date, end_date
 
 
+def sum_by_type(db: Session, user_id: int, start_date: date, end_date: date) -> Dict[str, float]:
+    """从每日汇总表按类型合计收支和记录数"""
+    totals = {"income": 0, "expense": 0, "count": 0}
+    for r in rollup_query(
+        db, user_id, DailyRollup.type, start_date=start_date, end_date=end_date
+    ).all():
+        totals[r.type] = r.total
+        totals["count"] += r.count
+    return totals
+
+
+def group_by_month(rows) -> Dict[tuple, dict]:
+    """将按日汇总行合并为按 (年, 月) 的收支和记录数"""
+    monthly_data = {}
+    for r in rows:
+        key = (r.date.year, r.date.month)
+        if key not in monthly_data:
+            monthly_data[key] = {"income": 0, "expense": 0, "count": 0}
+        monthly_data[key]["count"] += r.count
+        if r.type == "income":
+            monthly_data[key]["income"] += r.total
+        else:
+            monthly_data[key]["expense"] += r.total
+    return monthly_data
+
+
 @router.get("/overview")
-async def get_overview(
+@cached_response("statistics.overview")
+def get_overview(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -53,21 +84,14 @@ async def get_overview(
     first_day = date(today.year, today.month, 1)
     
     # 今日统计
-    today_records = db.query(LedgerRecord).filter(
-        LedgerRecord.user_id == current_user.id,
-        LedgerRecord.record_date == today
-    ).all()
-    today_income = sum(r.amount for r in today_records if r.type == "income")
-    today_expense = sum(r.amount for r in today_records if r.type == "expense")
+    today_totals = sum_by_type(db, current_user.id, today, today)
+    today_income = today_totals["income"]
+    today_expense = today_totals["expense"]
     
     # 本月统计
-    month_records = db.query(LedgerRecord).filter(
-        LedgerRecord.user_id == current_user.id,
-        LedgerRecord.record_date >= first_day,
-        LedgerRecord.record_date <= today
-    ).all()
-    month_income = sum(r.amount for r in month_records if r.type == "income")
-    month_expense = sum(r.amount for r in month_records if r.type == "expense")
+    month_totals = sum_by_type(db, current_user.id, first_day, today)
+    month_income = month_totals["income"]
+    month_expense = month_totals["expense"]
     
     # 活跃项目数
     active_projects = db.query(Project).filter(
@@ -77,10 +101,9 @@ async def get_overview(
     
     # 最近记录数（最近7天）
     week_ago = today - timedelta(days=7)
-    recent_count = db.query(LedgerRecord).filter(
-        LedgerRecord.user_id == current_user.id,
-        LedgerRecord.record_date >= week_ago
-    ).count()
+    recent_count = rollup_query(
+        db, current_user.id, start_date=week_ago
+    ).first().count or 0
     
     return OverviewResponse(
         today_income=today_income,
@@ -95,64 +118,63 @@ async def get_overview(
 
 
 @router.get("/daily", response_model=DailyStatsResponse)
-async def get_daily_stats(
+@json_response
+@cached_response("statistics.daily")
+def get_daily_stats(
     year: int = Query(..., ge=2020, le=2100),
     month: Optional[int] = Query(None, ge=1, le=12),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """获取每日统计"""
+    """获取每日统计（直接构建 DailyStatsResponse 结构的 dict）"""
     if month:
         start_date, end_date = get_date_range(year, month)
     else:
         start_date, end_date = get_date_range(year)
     
-    # 获取该范围内所有记录
-    records = db.query(LedgerRecord).filter(
-        LedgerRecord.user_id == current_user.id,
-        LedgerRecord.record_date >= start_date,
-        LedgerRecord.record_date <= end_date
+    # 从每日汇总读取该范围内的收支
+    rows = rollup_query(
+        db, current_user.id, DailyRollup.date, DailyRollup.type,
+        start_date=start_date, end_date=end_date
     ).all()
     
     # 按日期分组
     daily_data = {}
-    for r in records:
-        date_str = str(r.record_date)
+    for r in rows:
+        date_str = str(r.date)
         if date_str not in daily_data:
             daily_data[date_str] = {"income": 0, "expense": 0}
         if r.type == "income":
-            daily_data[date_str]["income"] += r.amount
+            daily_data[date_str]["income"] += r.total
         else:
-            daily_data[date_str]["expense"] += r.amount
+            daily_data[date_str]["expense"] += r.total
     
     # 填充所有日期
     stats = []
     current = start_date
     while current <= end_date:
         date_str = str(current)
-        income = daily_data.get(date_str, {}).get("income", 0)
-        expense = daily_data.get(date_str, {}).get("expense", 0)
-        stats.append(DailyStats(
-            date=date_str,
-            income=income,
-            expense=expense,
-            balance=income - expense
-        ))
+        day = daily_data.get(date_str)
+        income, expense = (day["income"], day["expense"]) if day else (0, 0)
+        stats.append({
+            "date": date_str,
+            "income": float(income),
+            "expense": float(expense),
+            "balance": float(income - expense),
+        })
         current += timedelta(days=1)
     
-    total_income = sum(s.income for s in stats)
-    total_expense = sum(s.expense for s in stats)
-    
-    return DailyStatsResponse(
-        stats=stats,
-        total_income=total_income,
-        total_expense=total_expense,
-        total_days=len(stats)
-    )
+    return {
+        "stats": stats,
+        "total_income": sum(s["income"] for s in stats),
+        "total_expense": sum(s["expense"] for s in stats),
+        "total_days": len(stats),
+    }
 
 
 @router.get("/monthly", response_model=MonthlyStatsResponse)
-async def get_monthly_stats(
+@cached_response("statistics.monthly")
+def get_monthly_stats(
     year: int = Query(..., ge=2020, le=2100),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -161,24 +183,14 @@ async def get_monthly_stats(
     start_date = date(year, 1, 1)
     end_date = date(year, 12, 31)
     
-    # 获取该年度所有记录
-    records = db.query(LedgerRecord).filter(
-        LedgerRecord.user_id == current_user.id,
-        LedgerRecord.record_date >= start_date,
-        LedgerRecord.record_date <= end_date
+    # 从每日汇总读取该年度收支
+    rows = rollup_query(
+        db, current_user.id, DailyRollup.date, DailyRollup.type,
+        start_date=start_date, end_date=end_date
     ).all()
     
     # 按年月分组
-    monthly_data = {}
-    for r in records:
-        key = (r.record_date.year, r.record_date.month)
-        if key not in monthly_data:
-            monthly_data[key] = {"income": 0, "expense": 0, "count": 0}
-        monthly_data[key]["count"] += 1
-        if r.type == "income":
-            monthly_data[key]["income"] += r.amount
-        else:
-            monthly_data[key]["expense"] += r.amount
+    monthly_data = group_by_month(rows)
     
     # 填充所有月份
     stats = []
@@ -208,7 +220,8 @@ async def get_monthly_stats(
 
 
 @router.get("/category", response_model=CategoryStatsResponse)
-async def get_category_stats(
+@cached_response("statistics.category")
+def get_category_stats(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     record_type: Optional[str] = None,
@@ -216,23 +229,13 @@ async def get_category_stats(
     db: Session = Depends(get_db)
 ):
     """获取分类统计"""
-    query = db.query(
-        LedgerRecord.category_id,
-        func.sum(LedgerRecord.amount).label("total"),
-        func.count(LedgerRecord.id).label("count")
-    ).filter(LedgerRecord.user_id == current_user.id)
-    
-    if start_date:
-        query = query.filter(LedgerRecord.record_date >= start_date)
-    if end_date:
-        query = query.filter(LedgerRecord.record_date <= end_date)
-    if record_type:
-        query = query.filter(LedgerRecord.type == record_type)
-    
-    results = query.group_by(LedgerRecord.category_id).all()
+    results = rollup_query(
+        db, current_user.id, DailyRollup.category_id,
+        start_date=start_date, end_date=end_date, record_type=record_type
+    ).all()
     
-    # 获取分类信息
-    categories = {c.id: c for c in db.query(Category).all()}
+    # 获取分类信息（用户可见分类，带缓存）
+    categories = get_user_categories(db, current_user.id)
     
     # 计算总金额
     total_amount = sum(r.total for r in results) or 1
@@ -267,7 +270,8 @@ async def get_category_stats(
 
 
 @router.get("/trend", response_model=TrendResponse)
-async def get_trend(
+@cached_response("statistics.trend")
+def get_trend(
     days: int = Query(30, ge=1, le=365),
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
@@ -281,28 +285,15 @@ async def get_trend(
     if not start_date:
         start_date = end_date - timedelta(days=days - 1)
     
-    query = db.query(
-        LedgerRecord.record_date,
-        LedgerRecord.type,
-        func.sum(LedgerRecord.amount).label("total")
-    ).filter(LedgerRecord.user_id == current_user.id)
-    
-    if start_date:
-        query = query.filter(LedgerRecord.record_date >= start_date)
-    if end_date:
-        query = query.filter(LedgerRecord.record_date <= end_date)
-    if record_type:
-        query = query.filter(LedgerRecord.type == record_type)
-    
-    results = query.group_by(
-        LedgerRecord.record_date,
-        LedgerRecord.type
-    ).order_by(LedgerRecord.record_date).all()
+    results = rollup_query(
+        db, current_user.id, DailyRollup.date, DailyRollup.type,
+        start_date=start_date, end_date=end_date, record_type=record_type
+    ).order_by(DailyRollup.date).all()
     
     # 整理数据
     daily_data = {}
     for r in results:
-        date_str = str(r.record_date)
+        date_str = str(r.date)
         if date_str not in daily_data:
             daily_data[date_str] = {"income": 0, "expense": 0}
         if r.type == "income":
@@ -355,108 +346,20 @@ async def get_trend(
 
 
 @router.get("/dashboard", response_model=DashboardResponse)
-async def get_dashboard(
+@cached_response("statistics.dashboard")
+def get_dashboard(
     days: int = Query(7, ge=1, le=30),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """获取仪表盘数据"""
-    today = date.today()
-    start_date = today - timedelta(days=days - 1)
-    
-    # 概览
-    overview = await get_overview(current_user, db)
-    
-    # 最近记录
-    recent_records = db.query(LedgerRecord).filter(
-        LedgerRecord.user_id == current_user.id,
-        LedgerRecord.record_date >= start_date
-    ).order_by(
-        LedgerRecord.record_date.desc(),
-        LedgerRecord.created_at.desc()
-    ).limit(10).all()
-    
-    recent_data = []
-    categories = {c.id: c for c in db.query(Category).all()}
-    for r in recent_records:
-        cat = categories.get(r.category_id)
-        recent_data.append({
-            'id': r.id,
-            'amount': r.amount,
-            'type': r.type,
-            'category_name': cat.name if cat else '未知',
-            'category_icon': cat.icon if cat else None,
-            'remark': r.remark,
-            'record_date': str(r.record_date)
-        })
-    
-    # TOP收入分类
-    income_stats = await get_category_stats(
-        start_date=start_date,
-        end_date=today,
-        record_type="income",
-        current_user=current_user,
-        db=db
-    )
-    top_income = [
-        TopCategory(
-            category_id=c.category_id,
-            category_name=c.category_name,
-            icon=c.category_icon,
-            amount=c.total_amount,
-            percentage=c.percentage
-        )
-        for c in income_stats.categories[:5]
-    ]
-    
-    # TOP支出分类
-    expense_stats = await get_category_stats(
-        start_date=start_date,
-        end_date=today,
-        record_type="expense",
-        current_user=current_user,
-        db=db
-    )
-    top_expense = [
-        TopCategory(
-            category_id=c.category_id,
-            category_name=c.category_name,
-            icon=c.category_icon,
-            amount=c.total_amount,
-            percentage=c.percentage
-        )
-        for c in expense_stats.categories[:5]
-    ]
-    
-    # 每日趋势
-    daily_stats = await get_daily_stats(
-        year=today.year,
-        month=today.month,
-        current_user=current_user,
-        db=db
-    )
-    daily_trend = [
-        TrendDataPoint(date=s.date, value=s.balance)
-        for s in daily_stats.stats[-days:]
-    ]
-    
-    # 月度趋势（最近6个月）
-    monthly_trend = await get_monthly_trends(db, current_user)
-    
-    return DashboardResponse(
-        overview=overview,
-        recent_records=recent_data,
-        top_income_categories=top_income,
-        top_expense_categories=top_expense,
-        daily_trend=daily_trend,
-        monthly_trend=monthly_trend
-    )
+    return build_dashboard(db, current_user, days)
 
 
-async def get_monthly_trends(db: Session, current_user: User) -> List[MonthlyStats]:
+def get_monthly_trends(db: Session, current_user: User) -> List[MonthlyStats]:
     """获取最近6个月的趋势"""
     today = date.today()
-    trends = []
+    months = []
     
     for i in range(5, -1, -1):
         month = today.month - i
@@ -466,17 +369,22 @@ async def get_monthly_trends(db: Session, current_user: User) -> List[MonthlySta
             month += 12
             year -= 1
         
-        _, end_date = get_date_range(year, month)
-        start_date = date(year, month, 1)
-        
-        records = db.query(LedgerRecord).filter(
-            LedgerRecord.user_id == current_user.id,
-            LedgerRecord.record_date >= start_date,
-            LedgerRecord.record_date <= end_date
-        ).all()
-        
-        income = sum(r.amount for r in records if r.type == "income")
-        expense = sum(r.amount for r in records if r.type == "expense")
+        months.append((year, month))
+    
+    # 一次读取6个月的每日汇总，再按月合并
+    start_date = date(months[0][0], months[0][1], 1)
+    _, end_date = get_date_range(today.year, today.month)
+    rows = rollup_query(
+        db, current_user.id, DailyRollup.date, DailyRollup.type,
+        start_date=start_date, end_date=end_date
+    ).all()
+    monthly_data = group_by_month(rows)
+    
+    trends = []
+    for year, month in months:
+        data = monthly_data.get((year, month), {})
+        income = data.get("income", 0)
+        expense = data.get("expense", 0)
         
         trends.append(MonthlyStats(
             year=year,
@@ -484,14 +392,15 @@ async def get_monthly_trends(db: Session, current_user: User) -> List[MonthlySta
             income=income,
             expense=expense,
             balance=income - expense,
-            record_count=len(records)
+            record_count=data.get("count", 0)
         ))
     
     return trends
 
 
 @router.get("/yearly")
-async def get_yearly_stats(
+@cached_response("statistics.yearly")
+def get_yearly_stats(
     year: int = Query(..., ge=2020, le=2100),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -501,20 +410,15 @@ async def get_yearly_stats(
     end_date = date(year, 12, 31)
     
     # 年度总览
-    records = db.query(LedgerRecord).filter(
-        LedgerRecord.user_id == current_user.id,
-        LedgerRecord.record_date >= start_date,
-        LedgerRecord.record_date <= end_date
-    ).all()
-    
-    total_income = sum(r.amount for r in records if r.type == "income")
-    total_expense = sum(r.amount for r in records if r.type == "expense")
+    totals = sum_by_type(db, current_user.id, start_date, end_date)
+    total_income = totals["income"]
+    total_expense = totals["expense"]
     
     # 月度分布
-    monthly_stats = await get_monthly_stats(year, current_user, db)
+    monthly_stats = get_monthly_stats(year, current_user, db)
     
     # 分类分布
-    category_stats = await get_category_stats(
+    category_stats = get_category_stats(
         start_date=start_date,
         end_date=end_date,
         current_user=current_user,
@@ -526,14 +430,9 @@ async def get_yearly_stats(
     prev_start = date(prev_year, 1, 1)
     prev_end = date(prev_year, 12, 31)
     
-    prev_records = db.query(LedgerRecord).filter(
-        LedgerRecord.user_id == current_user.id,
-        LedgerRecord.record_date >= prev_start,
-        LedgerRecord.record_date <= prev_end
-    ).all()
-    
-    prev_income = sum(r.amount for r in prev_records if r.type == "income")
-    prev_expense = sum(r.amount for r in prev_records if r.type == "expense")
+    prev_totals = sum_by_type(db, current_user.id, prev_start, prev_end)
+    prev_income = prev_totals["income"]
+    prev_expense = prev_totals["expense"]
     
     income_change = ((total_income - prev_income) / prev_income * 100) if prev_income > 0 else None
     expense_change = ((total_expense - prev_expense) / prev_expense * 100) if prev_expense > 0 else None
@@ -543,7 +442,7 @@ async def get_yearly_stats(
         "total_income": total_income,
         "total_expense": total_expense,
         "balance": total_income - total_expense,
-        "record_count": len(records),
+        "record_count": totals["count"],
         "monthly_stats": monthly_stats.model_dump(),
         "category_stats": category_stats.model_dump(),
         "year_over_year": {
@@ -557,7 +456,8 @@ async def get_yearly_stats(
 
 
 @router.get("/compare/months")
-async def compare_months(
+@cached_response("statistics.compare_months")
+def compare_months(
     month1: int = Query(..., ge=1, le=12),
     year1: int = Query(..., ge=2020, le=2100),
     month2: int = Query(..., ge=1, le=12),
@@ -568,23 +468,20 @@ async def compare_months(
     """对比两个月的收支"""
     def get_month_data(year: int, month: int):
         start_date, end_date = get_date_range(year, month)
-        records = db.query(LedgerRecord).filter(
-            LedgerRecord.user_id == current_user.id,
-            LedgerRecord.record_date >= start_date,
-            LedgerRecord.record_date <= end_date
+        rows = rollup_query(
+            db, current_user.id, DailyRollup.type, DailyRollup.category_id,
+            start_date=start_date, end_date=end_date
         ).all()
         
-        income = sum(r.amount for r in records if r.type == "income")
-        expense = sum(r.amount for r in records if r.type == "expense")
+        income = sum(r.total for r in rows if r.type == "income")
+        expense = sum(r.total for r in rows if r.type == "expense")
         
         # 按分类统计
         cat_data = {}
-        for r in records:
+        for r in rows:
             if r.type not in cat_data:
                 cat_data[r.type] = {}
-            if r.category_id not in cat_data[r.type]:
-                cat_data[r.type][r.category_id] = 0
-            cat_data[r.type][r.category_id] += r.amount
+            cat_data[r.type][r.category_id] = r.total
         
         return {
             "year": year,
@@ -592,7 +489,7 @@ async def compare_months(
             "income": income,
             "expense": expense,
             "balance": income - expense,
-            "record_count": len(records),
+            "record_count": sum(r.count for r in rows),
             "category_breakdown": cat_data
         }
     
@@ -613,7 +510,8 @@ async def compare_months(
 
 
 @router.get("/compare/categories")
-async def compare_categories(
+@cached_response("statistics.compare_categories")
+def compare_categories(
     start_date1: Optional[date] = None,
     end_date1: Optional[date] = None,
     start_date2: Optional[date] = None,
@@ -632,21 +530,15 @@ async def compare_categories(
     if not start_date2:
         start_date2 = end_date2 - timedelta(days=30)
     
+    categories = get_user_categories(db, current_user.id)
+    
     def get_category_data(start: date, end: date):
-        records = db.query(LedgerRecord).filter(
-            LedgerRecord.user_id == current_user.id,
-            LedgerRecord.record_date >= start,
-            LedgerRecord.record_date <= end,
-            LedgerRecord.type == "expense"
+        rows = rollup_query(
+            db, current_user.id, DailyRollup.category_id,
+            start_date=start, end_date=end, record_type="expense"
         ).all()
         
-        cat_totals = {}
-        for r in records:
-            if r.category_id not in cat_totals:
-                cat_totals[r.category_id] = 0
-            cat_totals[r.category_id] += r.amount
-        
-        categories = {c.id: c for c in db.query(Category).all()}
+        cat_totals = {r.category_id: r.total for r in rows}
         
         result = []
         for cat_id, total in cat_totals.items():
@@ -2,7 +2,7 @@
 认证请求/响应模型
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 
 
 # ============ Request Models ============
@@ -62,7 +62,30 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class AdminUserResponse(UserResponse):
+    """管理端用户信息（附记账记录数）"""
+    record_count: int = 0
+
+
 class UserListResponse(BaseModel):
     """用户列表响应"""
     total: int
-    users: List[UserResponse]
+    users: List[AdminUserResponse]
+
+
+class UserUsageItem(BaseModel):
+    """用户用量"""
+    user_id: int
+    username: str
+    is_active: bool
+    record_count: int
+    storage_bytes: int
+    last_active_at: Optional[str] = None
+
+
+class UsageReportResponse(BaseModel):
+    """用量报表"""
+    total_users: int
+    total_records: int
+    total_storage_bytes: int
+    users: List[UserUsageItem]
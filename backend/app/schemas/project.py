@@ -60,3 +60,29 @@ class ProjectListResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class ProjectCategoryBreakdown(BaseModel):
+    """项目分类明细"""
+    category_id: int
+    category_name: Optional[str] = None
+    icon: Optional[str] = None
+    type: str
+    amount: float
+    count: int
+
+
+class ProjectMonthBreakdown(BaseModel):
+    """项目月度明细"""
+    month: str  # YYYY-MM
+    income: float = 0
+    expense: float = 0
+    count: int = 0
+
+
+class ProjectBreakdownResponse(BaseModel):
+    """项目统计明细"""
+    project_id: int
+    stats: ProjectStats
+    by_category: List[ProjectCategoryBreakdown]
+    by_month: List[ProjectMonthBreakdown]
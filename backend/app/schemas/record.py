@@ -25,6 +25,68 @@ class RecordUpdate(BaseModel):
     record_date: Optional[date] = None
 
 
+# 单次批量操作的最大条数
+BATCH_MAX_ITEMS = 500
+
+
+class RecordBatchCreateItem(RecordCreate):
+    """批量创建中的单条记录"""
+    client_id: Optional[str] = Field(None, min_length=1, max_length=64)  # 客户端幂等键
+
+
+class RecordBatchCreate(BaseModel):
+    """批量创建记账请求"""
+    records: List[RecordBatchCreateItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class RecordBatchUpdateItem(RecordUpdate):
+    """批量更新中的单条记录"""
+    id: int
+
+
+class RecordBatchUpdate(BaseModel):
+    """批量更新记账请求"""
+    records: List[RecordBatchUpdateItem] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class RecordBatchDelete(BaseModel):
+    """批量删除记账请求"""
+    ids: List[int] = Field(..., min_length=1, max_length=BATCH_MAX_ITEMS)
+
+
+class BatchItemResult(BaseModel):
+    """批量操作的单条结果"""
+    index: int
+    status: str  # created/duplicate/updated/deleted/not_found/invalid
+    id: Optional[int] = None
+    client_id: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class RecordBatchResponse(BaseModel):
+    """批量操作响应"""
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+
+class ImportRowError(BaseModel):
+    """导入失败的行"""
+    line: int
+    detail: str
+
+
+class ImportResponse(BaseModel):
+    """导入结果"""
+    total_rows: int
+    imported: int
+    duplicates: int  # 与已有记录重复而跳过的行数
+    failed: int
+    errors: List[ImportRowError]  # 最多返回前100条
+    seconds: float
+    rows_per_second: float
+
+
 class RecordResponse(BaseModel):
     """记账响应"""
     id: int
@@ -44,10 +106,11 @@ class RecordResponse(BaseModel):
 
 class RecordListResponse(BaseModel):
     """记账列表响应"""
-    total: int
+    total: Optional[int] = None  # include_total=false 时不统计
     page: int
     page_size: int
     records: List[RecordResponse]
+    next_cursor: Optional[str] = None  # 游标分页的下一页游标，None表示没有更多
 
     class Config:
         from_attributes = True
@@ -0,0 +1,132 @@
+"""
+预算评估服务
+
+批量计算多个预算的执行情况：相同周期窗口的预算共用一次按分类分组的
+支出汇总查询（读每日汇总表），分类信息一次 IN 查询取回。
+"""
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import Budget, Category, DailyRollup
+from app.services.rollup_query import rollup_query
+from app.services.dashboard import month_end
+from app.schemas.budget import BudgetStatus
+
+
+def get_period_range(period: str, budget) -> tuple:
+    """获取预算周期范围"""
+    today = date.today()
+
+    if period == "monthly":
+        start = date(today.year, today.month, 1)
+        if today.month == 12:
+            end = date(today.year + 1, 1, 1) - timedelta(days=1)
+        else:
+            end = date(today.year, today.month + 1, 1) - timedelta(days=1)
+    elif period == "yearly":
+        start = date(today.year, 1, 1)
+        end = date(today.year, 12, 31)
+    elif budget.start_date and budget.end_date:
+        start = budget.start_date
+        end = budget.end_date
+    else:
+        # 自定义周期未设置起止日期时按本月计算
+        start = date(today.year, today.month, 1)
+        end = month_end(today.year, today.month)
+
+    return start, end
+
+
+def usage_and_level(budget: Budget, spent: float) -> tuple:
+    """使用率（百分比）和预警等级 normal/warning/critical"""
+    usage_rate = (spent / float(budget.amount) * 100) if float(budget.amount) > 0 else 0
+    alert_level = "normal"
+    if usage_rate >= budget.alert_threshold:
+        alert_level = "warning"
+    if spent >= budget.amount:
+        alert_level = "critical"
+    return usage_rate, alert_level
+
+
+def build_status(budget: Budget, spent: float, start: date, end: date, category: Optional[Category]) -> BudgetStatus:
+    """根据已支出金额计算预算状态"""
+    remaining = float(budget.amount) - spent
+    usage_rate, alert_level = usage_and_level(budget, spent)
+
+    # 计算剩余天数
+    today = date.today()
+    total_days = (end - start).days + 1
+    days_passed = (today - start).days
+    days_remaining = max(0, (end - today).days + 1)
+
+    # 预测本月剩余支出
+    if days_passed > 0:
+        daily_avg = spent / days_passed
+        projected = daily_avg * total_days
+    else:
+        projected = spent
+
+    return BudgetStatus(
+        budget_id=budget.id,
+        budget_name=budget.name,
+        category_id=budget.category_id,
+        category_name=category.name if category else None,
+        category_icon=category.icon if category else None,
+        planned=budget.amount,
+        spent=spent,
+        remaining=remaining,
+        usage_rate=round(usage_rate, 2),
+        alert_level=alert_level,
+        days_remaining=days_remaining,
+        projected_spending=round(projected, 2) if days_passed > 0 else None
+    )
+
+
+def spent_by_category(db: Session, user_id: int, start: date, end: date) -> Dict[int, object]:
+    """周期内各分类的支出合计"""
+    rows = rollup_query(
+        db, user_id, DailyRollup.category_id,
+        start_date=start, end_date=end, record_type="expense"
+    ).all()
+    return {r.category_id: r.total for r in rows}
+
+
+def spent_amounts(db: Session, items: List[Tuple[Budget, date, date]]) -> List[Decimal]:
+    """批量计算各预算在其周期内的支出，items 为 (预算, 周期开始, 周期结束)
+
+    查询次数 = 不同 (用户, 周期) 的数量，与预算数量无关。
+    """
+    windows = {}
+    for budget, start, end in items:
+        key = (budget.user_id, start, end)
+        if key not in windows:
+            windows[key] = spent_by_category(db, *key)
+
+    amounts = []
+    for budget, start, end in items:
+        totals = windows[(budget.user_id, start, end)]
+        if budget.category_id:
+            amounts.append(totals.get(budget.category_id) or Decimal(0))
+        else:
+            amounts.append(sum(totals.values(), Decimal(0)))
+    return amounts
+
+
+def evaluate_budgets(db: Session, items: List[Tuple[Budget, date, date]]) -> List[BudgetStatus]:
+    """批量计算预算状态，结果顺序与 items 一致（分类信息一次 IN 查询取回）"""
+    amounts = spent_amounts(db, items)
+
+    category_ids = {budget.category_id for budget, _, _ in items if budget.category_id}
+    categories = {}
+    if category_ids:
+        categories = {
+            c.id: c for c in db.query(Category).filter(Category.id.in_(category_ids)).all()
+        }
+
+    return [
+        build_status(budget, float(spent), start, end, categories.get(budget.category_id))
+        for (budget, start, end), spent in zip(items, amounts)
+    ]
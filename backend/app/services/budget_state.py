@@ -0,0 +1,173 @@
+"""
+预算状态服务
+
+budget_states 保存每个启用预算在当前周期的已支出和预警等级：
+- 记账写入支出时，与每日汇总在同一事务内原子累加（见 rollup.apply_delta）
+- 预算增删改、汇总重建时按用户重新计算
+- 后台任务在每天零点后为周期已结束的预算切换到新周期
+预警接口因此只需一次带索引的读取。预警等级变化在事务提交后推送 budget.alert 事件。
+"""
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Budget, BudgetState, User
+from app.services.budget_eval import get_period_range, spent_amounts, usage_and_level
+from app.services.events import publish_after_commit, pending_event, discard_pending
+
+
+logger = logging.getLogger("app.budget_state")
+
+
+def _set_spent(db: Session, state: BudgetState, budget: Budget, spent: Decimal):
+    """更新已支出和预警等级"""
+    state.spent = spent
+    _set_level(db, state, budget, spent)
+
+
+def _set_level(db: Session, state: BudgetState, budget: Budget, spent: Decimal):
+    """按已支出重新计算使用率和预警等级，等级变化时在提交后推送 budget.alert 事件
+
+    同一事务内多次变化（如修改记录时先扣除再累加）合并为一条，
+    最终等级与事务开始时相同则不推送。
+    """
+    key = ("budget.alert", budget.id)
+    pending = pending_event(db, key)
+    previous = pending["previous_level"] if pending else (state.alert_level or "normal")
+
+    state.usage_rate, state.alert_level = usage_and_level(budget, float(spent))
+    state.last_evaluated = datetime.utcnow()
+
+    if state.alert_level != previous:
+        publish_after_commit(db, budget.user_id, "budget.alert", {
+            "budget_id": budget.id,
+            "alert_level": state.alert_level,
+            "previous_level": previous,
+            "usage_rate": round(state.usage_rate, 2),
+            "spent": float(spent),
+        }, key=key)
+    elif pending:
+        discard_pending(db, key)
+
+
+def refresh_states(db: Session, user_id: Optional[int] = None):
+    """按当前周期重新计算启用预算的状态（全部用户或指定用户），删除已停用/已删除预算的状态
+
+    调用方负责提交事务。
+    """
+    # 会话未开启 autoflush，先写出未提交的预算/汇总变更
+    db.flush()
+    budget_query = db.query(Budget).filter(Budget.is_active == True)
+    state_query = db.query(BudgetState)
+    if user_id is not None:
+        budget_query = budget_query.filter(Budget.user_id == user_id)
+        state_query = state_query.filter(BudgetState.user_id == user_id)
+
+    budgets = budget_query.all()
+    items = [(budget, *get_period_range(budget.period, budget)) for budget in budgets]
+    amounts = spent_amounts(db, items)
+    states = {s.budget_id: s for s in state_query.all()}
+
+    for (budget, start, end), spent in zip(items, amounts):
+        state = states.pop(budget.id, None)
+        if state is None:
+            state = BudgetState(budget_id=budget.id)
+            db.add(state)
+        state.user_id = budget.user_id
+        state.period_start = start
+        state.period_end = end
+        _set_spent(db, state, budget, Decimal(str(spent)))
+
+    for state in states.values():
+        db.delete(state)
+    db.flush()
+
+
+def apply_expense(db: Session, user_id: int, day: date, category_id: int, delta: Decimal):
+    """某天某分类的支出变化累加到周期覆盖该天的预算（分类预算和总预算）
+
+    已支出以 UPDATE ... SET spent = spent + :delta 原子累加（并发写入不会丢失增量），
+    再按 RETURNING 返回的新值重新计算预警等级。
+    """
+    affected = db.query(BudgetState.budget_id).join(
+        Budget, Budget.id == BudgetState.budget_id
+    ).filter(
+        BudgetState.user_id == user_id,
+        BudgetState.period_start <= day,
+        BudgetState.period_end >= day,
+        or_(Budget.category_id.is_(None), Budget.category_id == category_id)
+    )
+    spent = dict(db.execute(
+        update(BudgetState)
+        .where(BudgetState.budget_id.in_(affected.scalar_subquery()))
+        .values(spent=BudgetState.spent + delta)
+        .returning(BudgetState.budget_id, BudgetState.spent)
+        .execution_options(synchronize_session=False)
+    ).all())
+    if not spent:
+        return
+
+    rows = db.query(BudgetState, Budget).join(
+        Budget, Budget.id == BudgetState.budget_id
+    ).filter(BudgetState.budget_id.in_(spent)).populate_existing().all()
+    for state, budget in rows:
+        _set_level(db, state, budget, spent[budget.id])
+
+
+def is_stale(budget: Budget, state: Optional[BudgetState]) -> bool:
+    """状态缺失，或预算当前周期与状态记录的周期不一致（周期已切换）"""
+    if state is None:
+        return True
+    return (state.period_start, state.period_end) != get_period_range(budget.period, budget)
+
+
+def stale_user_ids(db: Session) -> set:
+    """有预算状态需要重新计算的用户（跳过用户已被删除的遗留预算）"""
+    today = date.today()
+    rows = db.query(Budget, BudgetState).join(
+        User, User.id == Budget.user_id
+    ).outerjoin(
+        BudgetState, BudgetState.budget_id == Budget.id
+    ).filter(
+        Budget.is_active == True,
+        or_(BudgetState.budget_id.is_(None), BudgetState.period_end < today)
+    ).all()
+    return {budget.user_id for budget, state in rows if is_stale(budget, state)}
+
+
+def rollover_expired() -> int:
+    """为状态缺失或周期已过期的用户重新计算预算状态，返回处理的用户数"""
+    db = SessionLocal()
+    try:
+        user_ids = stale_user_ids(db)
+        for user_id in user_ids:
+            refresh_states(db, user_id)
+            db.commit()
+        return len(user_ids)
+    finally:
+        db.close()
+
+
+def _seconds_until_tomorrow() -> float:
+    now = datetime.now()
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    # 稍微延后，确保 date.today() 已经切换
+    return (tomorrow - now).total_seconds() + 1
+
+
+async def rollover_loop():
+    """后台任务：启动时补算一次，之后每天零点切换周期"""
+    while True:
+        try:
+            count = await asyncio.to_thread(rollover_expired)
+            if count:
+                logger.info(f"🔄 已刷新 {count} 个用户的预算状态")
+        except Exception as e:
+            logger.warning(f"⚠️ 预算状态刷新失败: {e}")
+        await asyncio.sleep(_seconds_until_tomorrow())
@@ -0,0 +1,266 @@
+"""
+统计结果缓存
+
+进程内 LRU + TTL 缓存，键为 (用户, 接口, 参数)。每个用户有一个数据版本号，
+记账/分类/项目/预算的写操作会递增版本号，缓存项在读取时校验版本，
+版本不一致即视为失效，无需逐个清理。
+
+版本号持久化在 data_versions 表中（重启后、其它进程或命令行导入写入后仍然有效），
+每个请求只读取一次，缓存校验和 ETag（conditional_get）使用同一个值：
+客户端带 If-None-Match 且数据未变时在执行接口查询前直接返回 304。
+"""
+import os
+import time
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, get_db
+from app.models import User, DataVersion
+from app.auth.dependencies import get_current_user
+from app.services.events import event_broker
+
+
+# 缓存配置
+STATS_CACHE_SIZE = int(os.getenv("STATS_CACHE_SIZE", "1024"))
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "300"))  # 秒
+
+# 系统级数据（如系统分类）变更时递增，对所有用户生效
+GLOBAL_SCOPE = None
+
+# data_versions 表中系统级版本的 scope_id
+GLOBAL_SCOPE_ID = 0
+
+
+def _scope_id(user_id: Optional[int]) -> int:
+    return GLOBAL_SCOPE_ID if user_id is None else user_id
+
+
+def _increment_version(db: Session, scope_id: int) -> int:
+    """原子递增持久化的版本号，不存在时插入，返回新版本"""
+    values = {DataVersion.version: DataVersion.version + 1, DataVersion.updated_at: datetime.utcnow()}
+    query = db.query(DataVersion).filter(DataVersion.scope_id == scope_id)
+    if not query.update(values, synchronize_session=False):
+        try:
+            with db.begin_nested():
+                db.execute(insert(DataVersion).values(scope_id=scope_id, version=1, updated_at=datetime.utcnow()))
+        except IntegrityError:
+            # 并发请求已插入
+            query.update(values, synchronize_session=False)
+    return db.query(DataVersion.version).filter(DataVersion.scope_id == scope_id).scalar()
+
+
+def bump_data_version(user_id: Optional[int] = GLOBAL_SCOPE) -> int:
+    """递增用户数据版本号（user_id 为 None 时递增全局版本），并通知客户端统计数据已失效
+
+    在写操作提交之后调用：版本号在独立事务中递增，保证新版本对应的一定是已提交的数据。
+    """
+    db = SessionLocal()
+    try:
+        version = _increment_version(db, _scope_id(user_id))
+        db.commit()
+    finally:
+        db.close()
+    event_broker.publish(user_id, "stats.invalidated", {"version": version})
+    return version
+
+
+def load_data_version(db: Session, user_id: int) -> tuple:
+    """从 data_versions 表读取（全局版本, 用户版本），一次主键查询"""
+    versions = dict(
+        db.query(DataVersion.scope_id, DataVersion.version).filter(
+            DataVersion.scope_id.in_((GLOBAL_SCOPE_ID, user_id))
+        ).all()
+    )
+    return versions.get(GLOBAL_SCOPE_ID, 0), versions.get(user_id, 0)
+
+
+def get_data_version(db: Session, user_id: int) -> tuple:
+    """本次请求的数据版本（全局版本, 用户版本）
+
+    记在请求级会话的 info 上：conditional_get 和 cached_response 共用同一个请求会话，
+    ETag 与缓存校验使用同一次读取的版本，不会一个是新版本、另一个是旧版本。
+    """
+    cached = db.info.get("data_version")
+    if cached is None or cached[0] != user_id:
+        cached = (user_id, load_data_version(db, user_id))
+        db.info["data_version"] = cached
+    return cached[1]
+
+
+def make_etag(path: str, params, user_id: int, version: tuple) -> str:
+    """由 (路径, 参数, 用户, 数据版本, 当天日期) 生成弱 ETag
+
+    含日期是因为"今日/本月"类统计和预算剩余天数跨天会变化。
+    """
+    raw = repr((path, sorted(params), user_id, version, date.today().isoformat()))
+    return 'W/"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较）"""
+    if not if_none_match:
+        return False
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def conditional_get(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """条件 GET（作为路由级依赖使用）
+
+    GET 请求在执行接口之前计算 ETag：If-None-Match 命中时直接返回 304，
+    否则把 ETag 记在 request.state 上，由 CacheControlMiddleware 写入响应头。
+    """
+    if request.method != "GET":
+        return
+    etag = make_etag(
+        request.url.path,
+        request.query_params.multi_items(),
+        current_user.id,
+        get_data_version(db, current_user.id),
+    )
+    request.state.etag = etag
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+class ResultCache:
+    """线程安全的 LRU + TTL 缓存"""
+
+    def __init__(self, maxsize: int = STATS_CACHE_SIZE, ttl: int = STATS_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: tuple, version: tuple) -> Any:
+        """读取缓存，未命中、过期或版本不一致时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, entry_version, value = entry
+            if expires_at < now or entry_version != version:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: tuple, version: tuple, value: Any):
+        """写入缓存，超出容量时淘汰最久未使用的项"""
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def invalidate_user(self, user_id: int):
+        """删除某个用户的全部缓存项（键的第一项为用户ID）"""
+        with self._lock:
+            for key in [k for k in self._data if k[0] == user_id]:
+                del self._data[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """命中/未命中/淘汰计数"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+            }
+
+
+stats_cache = ResultCache()
+
+
+def cached_response(name: str, cache: ResultCache = stats_cache) -> Callable:
+    """缓存接口返回值的装饰器
+
+    被装饰的路由函数需要有 current_user 和 db 参数；db 等依赖不参与缓存键。
+    键中包含当天日期，跨天后"今日/本月"类结果自然失效。
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        def make_key(args, kwargs) -> tuple:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = bound.arguments
+            user = params["current_user"]
+            key = (
+                user.id,
+                name,
+                date.today(),
+                tuple(
+                    (k, v) for k, v in params.items()
+                    if k not in ("current_user", "db")
+                ),
+            )
+            return key, get_data_version(params["db"], user.id)
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                key, version = make_key(args, kwargs)
+                value = cache.get(key, version)
+                if value is None:
+                    value = await func(*args, **kwargs)
+                    cache.set(key, version, value)
+                return value
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key, version = make_key(args, kwargs)
+            value = cache.get(key, version)
+            if value is None:
+                value = func(*args, **kwargs)
+                cache.set(key, version, value)
+            return value
+
+        return wrapper
+
+    return decorator
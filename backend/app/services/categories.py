@@ -0,0 +1,167 @@
+"""
+分类服务
+
+系统分类（user_id 为空）几乎不变，整体缓存在进程内；用户可见的分类为
+系统分类 + 用户私有分类，按用户缓存为 ID → 分类 映射，
+统计接口据此取分类名称，不再全表加载所有用户的分类。
+缓存按持久化的数据版本（data_versions 表，见 app.services.cache）校验：
+分类的增删改会递增全局或用户版本，其它进程、命令行写入后同样立即失效，
+与统计缓存、ETag 使用同一个版本。
+"""
+import os
+import time
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models import Category
+from app.schemas.category import CategoryResponse, CategoryTreeResponse
+from app.services.cache import get_data_version
+
+
+# 缓存有效期（秒）和缓存的用户数
+CATEGORY_CACHE_TTL = int(os.getenv("CATEGORY_CACHE_TTL", "600"))
+CATEGORY_CACHE_USERS = int(os.getenv("CATEGORY_CACHE_USERS", "1024"))
+
+CATEGORY_COLUMNS = tuple(Category.__table__.columns)
+
+
+def _sort_key(category) -> tuple:
+    return category.sort_order or 0, category.id
+
+
+class CategoryCache:
+    """分类快照缓存（快照为只读的行对象，不绑定会话）
+
+    - 系统分类：所有用户共用一份，记录生成时的全局版本
+    - 用户视图：用户ID → {分类ID: 分类}（系统 + 私有），记录生成时的 (全局版本, 用户版本)，LRU 淘汰
+    读取时与本次请求的数据版本不一致即视为失效。
+    """
+
+    def __init__(self, ttl: int = CATEGORY_CACHE_TTL, maxsize: int = CATEGORY_CACHE_USERS):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # (全局版本, 过期时间, 系统分类)
+        self._system: Optional[Tuple[int, float, Tuple[Any, ...]]] = None
+        self._users: "OrderedDict[int, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.system_hits = 0
+        self.system_misses = 0
+        self.invalidations = 0
+
+    def _load(self, db: Session, user_id: int, system_version: int) -> List[Any]:
+        """系统分类命中缓存时只查询私有分类，否则一次查询两者"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._system
+            if entry is not None and entry[0] == system_version and entry[1] >= now:
+                system = entry[2]
+                self.system_hits += 1
+            else:
+                system = None
+                self.system_misses += 1
+
+        if system is not None:
+            private = db.query(*CATEGORY_COLUMNS).filter(Category.user_id == user_id).all()
+            return list(system) + private
+
+        rows = db.query(*CATEGORY_COLUMNS).filter(
+            or_(Category.user_id.is_(None), Category.user_id == user_id)
+        ).all()
+        system = tuple(r for r in rows if r.user_id is None)
+        with self._lock:
+            # 不用旧版本覆盖其它请求已写入的新版本
+            if self._system is None or self._system[0] <= system_version:
+                self._system = (system_version, now + self.ttl, system)
+        return list(system) + [r for r in rows if r.user_id is not None]
+
+    def lookup(self, db: Session, user_id: int) -> Dict[int, Any]:
+        """用户可见分类的 ID → 分类 映射，命中时只读取数据版本（每个请求一次）"""
+        version = get_data_version(db, user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[0] == version and entry[1] >= now:
+                self._users.move_to_end(user_id)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        # 版本在数据提交之后才递增：按此版本加载到的数据不会比版本旧
+        mapping = {r.id: r for r in self._load(db, user_id, version[0])}
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry[0] <= version:
+                self._users[user_id] = (version, now + self.ttl, mapping)
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.maxsize:
+                    self._users.popitem(last=False)
+        return mapping
+
+    def visible(self, db: Session, user_id: int) -> List[Any]:
+        """用户可见的分类（系统 + 私有）"""
+        return list(self.lookup(db, user_id).values())
+
+    def invalidate(self, user_id: Optional[int] = None):
+        """丢弃本进程中的缓存项（释放内存）：user_id 为空表示系统分类，否则只丢弃该用户
+
+        正确性不依赖此调用，写操作之后递增数据版本即可使所有进程的缓存失效。
+        """
+        with self._lock:
+            if user_id is None:
+                self._system = None
+            else:
+                self._users.pop(user_id, None)
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "system_categories": len(self._system[2]) if self._system is not None else None,
+                "users": len(self._users),
+                "hits": self.hits,
+                "misses": self.misses,
+                "system_hits": self.system_hits,
+                "system_misses": self.system_misses,
+                "invalidations": self.invalidations,
+            }
+
+
+category_cache = CategoryCache()
+
+
+def get_user_categories(db: Session, user_id: int) -> Dict[int, Any]:
+    """用户可见分类（系统 + 私有）的 ID → 分类 映射，供统计等接口按ID取名称/图标"""
+    return category_cache.lookup(db, user_id)
+
+
+def build_tree(categories: List[Any], record_type: Optional[str] = None) -> List[CategoryTreeResponse]:
+    """由分类列表一次遍历构建两级树，一级分类和子分类均按 sort_order 排序"""
+    parents = []
+    children = defaultdict(list)
+    for category in categories:
+        if category.parent_id is None:
+            if not record_type or category.type == record_type:
+                parents.append(category)
+        else:
+            children[category.parent_id].append(category)
+
+    return [
+        CategoryTreeResponse(
+            id=parent.id,
+            name=parent.name,
+            icon=parent.icon,
+            type=parent.type,
+            is_system=parent.is_system,
+            children=[
+                CategoryResponse.model_validate(child._asdict())
+                for child in sorted(children.get(parent.id, ()), key=_sort_key)
+            ]
+        )
+        for parent in sorted(parents, key=_sort_key)
+    ]
@@ -0,0 +1,197 @@
+"""
+仪表盘聚合服务
+
+先规划仪表盘需要的全部日期窗口（今日、本月、最近7天、TOP分类区间、
+本月每日趋势、最近6个月），取并集后对每日汇总表做一次
+按 日期/类型/分类 分组的查询，再在内存中推导出各个板块。
+"""
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models import User, Category, LedgerRecord, Project, DailyRollup
+from app.services.rollup_query import rollup_query
+from app.services.categories import get_user_categories
+from app.schemas.statistics import (
+    MonthlyStats,
+    TrendDataPoint,
+    OverviewResponse,
+    DashboardResponse,
+    TopCategory,
+)
+
+
+def month_end(year: int, month: int) -> date:
+    """某月最后一天"""
+    if month == 12:
+        return date(year + 1, 1, 1) - timedelta(days=1)
+    return date(year, month + 1, 1) - timedelta(days=1)
+
+
+def plan_windows(today: date, days: int) -> Dict[str, tuple]:
+    """规划仪表盘各板块的日期窗口，(start, end)，end 为 None 表示不设上限"""
+    first_day = date(today.year, today.month, 1)
+    last_day = month_end(today.year, today.month)
+
+    # 最近6个月（含本月）
+    year, month = today.year, today.month - 5
+    if month <= 0:
+        month += 12
+        year -= 1
+
+    return {
+        "today": (today, today),
+        "month": (first_day, today),
+        "recent": (today - timedelta(days=7), None),
+        "top": (today - timedelta(days=days - 1), today),
+        # 每日趋势取本月每日统计的最后 days 天
+        "daily": (max(first_day, last_day - timedelta(days=days - 1)), last_day),
+        "monthly": (date(year, month, 1), last_day),
+    }
+
+
+def _in_window(day: date, window: tuple) -> bool:
+    start, end = window
+    return day >= start and (end is None or day <= end)
+
+
+def _top_categories(totals: Dict[int, dict], categories: Dict[int, Category]) -> List[TopCategory]:
+    """按金额取前5个分类，百分比算法与分类统计接口一致"""
+    total_amount = sum(t["total"] for t in totals.values()) or 1
+
+    items = []
+    for category_id in sorted(totals):
+        cat = categories.get(category_id)
+        if cat:
+            total = totals[category_id]["total"]
+            percentage = (total / total_amount * 100) if total_amount > 0 else 0
+            items.append(TopCategory(
+                category_id=category_id,
+                category_name=cat.name,
+                icon=cat.icon,
+                amount=float(total),
+                percentage=round(percentage, 2)
+            ))
+
+    items.sort(key=lambda x: x.amount, reverse=True)
+    return items[:5]
+
+
+def build_dashboard(db: Session, current_user: User, days: int, today: Optional[date] = None) -> DashboardResponse:
+    """单次分组扫描生成仪表盘数据"""
+    today = today or date.today()
+    windows = plan_windows(today, days)
+
+    # 所有窗口的并集
+    scan_start = min(w[0] for w in windows.values())
+    rows = rollup_query(
+        db, current_user.id, DailyRollup.date, DailyRollup.type, DailyRollup.category_id,
+        start_date=scan_start
+    ).all()
+
+    overview = {"today": {"income": 0, "expense": 0}, "month": {"income": 0, "expense": 0}}
+    recent_count = 0
+    top_totals = {"income": {}, "expense": {}}
+    daily_data = {}
+    monthly_data = {}
+
+    for r in rows:
+        for key in ("today", "month"):
+            if _in_window(r.date, windows[key]):
+                overview[key][r.type] += r.total
+        if _in_window(r.date, windows["recent"]):
+            recent_count += r.count
+        if _in_window(r.date, windows["top"]):
+            totals = top_totals[r.type].setdefault(r.category_id, {"total": 0, "count": 0})
+            totals["total"] += r.total
+            totals["count"] += r.count
+        if _in_window(r.date, windows["daily"]):
+            day = daily_data.setdefault(r.date, {"income": 0, "expense": 0})
+            day["income" if r.type == "income" else "expense"] += r.total
+        if _in_window(r.date, windows["monthly"]):
+            bucket = monthly_data.setdefault(
+                (r.date.year, r.date.month), {"income": 0, "expense": 0, "count": 0}
+            )
+            bucket["count"] += r.count
+            bucket["income" if r.type == "income" else "expense"] += r.total
+
+    # 最近记录
+    recent_records = db.query(LedgerRecord).filter(
+        LedgerRecord.user_id == current_user.id,
+        LedgerRecord.record_date >= windows["top"][0]
+    ).order_by(
+        LedgerRecord.record_date.desc(),
+        LedgerRecord.created_at.desc()
+    ).limit(10).all()
+
+    # 用户可见分类（带缓存）
+    categories = get_user_categories(db, current_user.id)
+
+    recent_data = []
+    for r in recent_records:
+        cat = categories.get(r.category_id)
+        recent_data.append({
+            'id': r.id,
+            'amount': r.amount,
+            'type': r.type,
+            'category_name': cat.name if cat else '未知',
+            'category_icon': cat.icon if cat else None,
+            'remark': r.remark,
+            'record_date': str(r.record_date)
+        })
+
+    active_projects = db.query(Project).filter(
+        Project.user_id == current_user.id,
+        Project.status == "active"
+    ).count()
+
+    today_data, month_data = overview["today"], overview["month"]
+    overview_response = OverviewResponse(
+        today_income=today_data["income"],
+        today_expense=today_data["expense"],
+        today_balance=today_data["income"] - today_data["expense"],
+        month_income=month_data["income"],
+        month_expense=month_data["expense"],
+        month_balance=month_data["income"] - month_data["expense"],
+        active_projects=active_projects,
+        recent_records_count=recent_count
+    )
+
+    daily_trend = []
+    current, end = windows["daily"]
+    while current <= end:
+        day = daily_data.get(current, {"income": 0, "expense": 0})
+        daily_trend.append(TrendDataPoint(
+            date=str(current),
+            value=day["income"] - day["expense"]
+        ))
+        current += timedelta(days=1)
+
+    monthly_trend = []
+    year, month = windows["monthly"][0].year, windows["monthly"][0].month
+    for _ in range(6):
+        data = monthly_data.get((year, month), {})
+        income = data.get("income", 0)
+        expense = data.get("expense", 0)
+        monthly_trend.append(MonthlyStats(
+            year=year,
+            month=month,
+            income=income,
+            expense=expense,
+            balance=income - expense,
+            record_count=data.get("count", 0)
+        ))
+        month += 1
+        if month > 12:
+            month = 1
+            year += 1
+
+    return DashboardResponse(
+        overview=overview_response,
+        recent_records=recent_data,
+        top_income_categories=_top_categories(top_totals["income"], categories),
+        top_expense_categories=_top_categories(top_totals["expense"], categories),
+        daily_trend=daily_trend,
+        monthly_trend=monthly_trend
+    )
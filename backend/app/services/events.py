@@ -0,0 +1,224 @@
+"""
+事件推送服务
+
+进程内按用户的发布/订阅，GET /events 的每个连接持有一个订阅：
+- 写操作提交后发布事件；发布方多在线程池中（同步路由），
+  消息通过 call_soon_threadsafe 投递到订阅所在的事件循环
+- 每个订阅的待发送队列有字节上限。客户端读取过慢（发送被阻塞）时积压超过上限，
+  丢弃全部积压消息，只保留一条 resync 事件，提示客户端全量刷新
+- 在事务中产生的事件（如预算预警等级变化）通过 publish_after_commit 暂存在会话上，
+  提交后才发布，回滚则丢弃
+"""
+import os
+import json
+import asyncio
+import threading
+from typing import Dict, Hashable, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+# 每个连接待发送队列的字节上限
+EVENTS_QUEUE_MAX_BYTES = int(os.getenv("EVENTS_QUEUE_MAX_BYTES", str(64 * 1024)))
+# 每个用户的最大连接数
+EVENTS_MAX_CONNECTIONS_PER_USER = int(os.getenv("EVENTS_MAX_CONNECTIONS_PER_USER", "5"))
+# 无事件时发送心跳注释的间隔（秒），避免代理断开空闲连接
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+# 客户端断线后的重连间隔（毫秒）
+EVENTS_RETRY_MS = 3000
+
+PENDING_EVENTS_KEY = "pending_events"
+
+
+def format_event(name: str, data: dict) -> bytes:
+    """编码为一条 SSE 消息"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+    return f"event: {name}\ndata: {payload}\n\n".encode("utf-8")
+
+
+RESYNC_MESSAGE = format_event("resync", {"reason": "queue_overflow"})
+HEARTBEAT_MESSAGE = b": ping\n\n"
+
+
+class TooManyConnections(Exception):
+    """用户的事件流连接数已达上限"""
+
+
+class Subscription:
+    """单个连接的订阅，队列只在所属事件循环的线程中读写"""
+
+    def __init__(self, user_id: int, loop: asyncio.AbstractEventLoop, max_bytes: int = EVENTS_QUEUE_MAX_BYTES):
+        self.user_id = user_id
+        self.loop = loop
+        self.max_bytes = max_bytes
+        self.closed = False
+        self._queue = []
+        self._bytes = 0
+        self._ready = asyncio.Event()
+        self.delivered = 0
+        self.dropped = 0
+        self.overflows = 0
+
+    def offer(self, message: bytes):
+        """加入待发送队列，超出字节上限时以 resync 替换全部积压"""
+        if self.closed:
+            return
+        if self._bytes + len(message) > self.max_bytes:
+            self.dropped += len(self._queue) + 1
+            self.overflows += 1
+            self._queue = [RESYNC_MESSAGE]
+            self._bytes = len(RESYNC_MESSAGE)
+        else:
+            self._queue.append(message)
+            self._bytes += len(message)
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def next_chunk(self, timeout: float) -> Optional[bytes]:
+        """取出全部积压消息合并为一块；超时返回心跳，订阅已关闭返回 None"""
+        if not self._queue and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return HEARTBEAT_MESSAGE
+        self._ready.clear()
+        if self.closed:
+            return None
+        chunk = b"".join(self._queue)
+        self.delivered += len(self._queue)
+        self._queue = []
+        self._bytes = 0
+        return chunk
+
+
+class EventBroker:
+    """按用户分发事件"""
+
+    def __init__(self, max_connections_per_user: int = EVENTS_MAX_CONNECTIONS_PER_USER):
+        self.max_connections_per_user = max_connections_per_user
+        self._subscriptions: Dict[int, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+        self.published = 0
+        self.rejected = 0
+        # 已关闭连接的累计值
+        self._closed_dropped = 0
+        self._closed_overflows = 0
+
+    def check_capacity(self, user_id: int):
+        """连接数已达上限时抛出 TooManyConnections（接受连接前检查，不占用名额）"""
+        with self._lock:
+            if len(self._subscriptions.get(user_id, ())) >= self.max_connections_per_user:
+                self.rejected += 1
+                raise TooManyConnections()
+
+    def subscribe(self, user_id: int) -> Subscription:
+        """在事件循环中调用，连接数达到上限时抛出 TooManyConnections"""
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self._lock:
+            subscriptions = self._subscriptions.setdefault(user_id, set())
+            if len(subscriptions) >= self.max_connections_per_user:
+                self.rejected += 1
+                raise TooManyConnections()
+            subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+                self._closed_dropped += subscription.dropped
+                self._closed_overflows += subscription.overflows
+
+    def publish(self, user_id: Optional[int], name: str, data: dict):
+        """向用户的所有连接发布事件（user_id 为 None 时发给所有用户），可在任意线程调用"""
+        with self._lock:
+            if user_id is None:
+                targets = [s for subs in self._subscriptions.values() for s in subs]
+            else:
+                targets = list(self._subscriptions.get(user_id, ()))
+            self.published += 1
+        if not targets:
+            return
+
+        message = format_event(name, data)
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, message)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    def close_user(self, user_id: int):
+        """关闭某个用户的所有连接（用户被删除时）"""
+        with self._lock:
+            targets = list(self._subscriptions.get(user_id, ()))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.close)
+            except RuntimeError:
+                pass
+
+    def close_all(self):
+        """关闭所有连接（应用关闭时）"""
+        with self._lock:
+            targets = [s for subs in self._subscriptions.values() for s in subs]
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.close)
+            except RuntimeError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            subscriptions = [s for subs in self._subscriptions.values() for s in subs]
+            return {
+                "users": len(self._subscriptions),
+                "connections": len(subscriptions),
+                "published": self.published,
+                "rejected": self.rejected,
+                "dropped": self._closed_dropped + sum(s.dropped for s in subscriptions),
+                "overflows": self._closed_overflows + sum(s.overflows for s in subscriptions),
+                "queue_max_bytes": EVENTS_QUEUE_MAX_BYTES,
+            }
+
+
+# 全局事件分发器
+event_broker = EventBroker()
+
+
+def publish_after_commit(db: Session, user_id: Optional[int], name: str, data: dict, key: Hashable = None):
+    """事务提交后再发布事件，回滚时丢弃
+
+    指定 key 时同一事务内相同 key 的事件只保留最后一条。
+    """
+    pending = db.info.setdefault(PENDING_EVENTS_KEY, {})
+    pending[key if key is not None else object()] = (user_id, name, data)
+
+
+def pending_event(db: Session, key: Hashable) -> Optional[dict]:
+    """当前事务中以 key 暂存、尚未发布的事件数据"""
+    entry = db.info.get(PENDING_EVENTS_KEY, {}).get(key)
+    return entry[2] if entry else None
+
+
+def discard_pending(db: Session, key: Hashable):
+    db.info.get(PENDING_EVENTS_KEY, {}).pop(key, None)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending(session: Session):
+    for user_id, name, data in session.info.pop(PENDING_EVENTS_KEY, {}).values():
+        event_broker.publish(user_id, name, data)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop(PENDING_EVENTS_KEY, None)
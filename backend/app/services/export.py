@@ -0,0 +1,145 @@
+"""
+记账导出服务
+
+分类、上级分类和项目名称在 SQL 中一次 JOIN 取回，结果通过 yield_per 分批读取，
+逐批编码为 CSV / JSON Lines 后交给 StreamingResponse，内存占用与账本大小无关。
+"""
+import io
+import csv
+import json
+from datetime import date
+from typing import Iterator, Optional
+
+from sqlalchemy.orm import Session, aliased
+
+from app.database import SessionLocal
+from app.models import Category, LedgerRecord, Project
+
+
+# 每批从数据库读取的行数
+EXPORT_CHUNK_SIZE = 1000
+
+# 导出列（导入时按相同列名解析）
+EXPORT_COLUMNS = [
+    "id", "record_date", "type", "amount", "category", "parent_category",
+    "project", "remark", "created_at",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson; charset=utf-8",
+}
+
+
+def export_query(
+    db: Session,
+    user_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    record_type: Optional[str] = None,
+    category_id: Optional[int] = None,
+    project_id: Optional[int] = None,
+):
+    """导出查询：记录按日期、ID 升序，附带分类/项目名称"""
+    parent = aliased(Category)
+    query = db.query(
+        LedgerRecord.id,
+        LedgerRecord.record_date,
+        LedgerRecord.type,
+        LedgerRecord.amount,
+        Category.name.label("category"),
+        parent.name.label("parent_category"),
+        Project.name.label("project"),
+        LedgerRecord.remark,
+        LedgerRecord.created_at,
+    ).outerjoin(
+        Category, Category.id == LedgerRecord.category_id
+    ).outerjoin(
+        parent, parent.id == Category.parent_id
+    ).outerjoin(
+        Project, Project.id == LedgerRecord.project_id
+    ).filter(LedgerRecord.user_id == user_id)
+
+    if start_date:
+        query = query.filter(LedgerRecord.record_date >= start_date)
+    if end_date:
+        query = query.filter(LedgerRecord.record_date <= end_date)
+    if record_type:
+        query = query.filter(LedgerRecord.type == record_type)
+    if category_id:
+        query = query.filter(LedgerRecord.category_id == category_id)
+    if project_id is not None:
+        query = query.filter(LedgerRecord.project_id == project_id)
+
+    return query.order_by(LedgerRecord.record_date, LedgerRecord.id)
+
+
+def _row_values(row) -> list:
+    return [
+        row.id,
+        row.record_date.isoformat(),
+        row.type,
+        str(row.amount),
+        row.category or "",
+        row.parent_category or "",
+        row.project or "",
+        row.remark or "",
+        row.created_at.isoformat() if row.created_at else "",
+    ]
+
+
+def _encode_csv(rows) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    # BOM 便于 Excel 正确识别 UTF-8 中文
+    writer.writerow(EXPORT_COLUMNS)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+
+    batch = 0
+    for row in rows:
+        if batch == 0:
+            buffer.seek(0)
+            buffer.truncate()
+        writer.writerow(_row_values(row))
+        batch += 1
+        if batch >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode("utf-8")
+            batch = 0
+    if batch:
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _encode_jsonl(rows) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({
+            "id": row.id,
+            "record_date": row.record_date.isoformat(),
+            "type": row.type,
+            "amount": float(row.amount),
+            "category": row.category,
+            "parent_category": row.parent_category,
+            "project": row.project,
+            "remark": row.remark,
+            "created_at": row.created_at.isoformat() if row.created_at else None,
+        }, ensure_ascii=False))
+        if len(lines) >= EXPORT_CHUNK_SIZE:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def stream_export(user_id: int, export_format: str = "csv", **filters) -> Iterator[bytes]:
+    """生成导出内容
+
+    使用独立会话：响应体在路由返回之后才开始迭代，不能依赖请求级的 db 会话。
+    """
+    db = SessionLocal()
+    try:
+        rows = export_query(db, user_id, **filters).yield_per(EXPORT_CHUNK_SIZE)
+        encoder = _encode_jsonl if export_format == "jsonl" else _encode_csv
+        yield from encoder(rows)
+    finally:
+        db.close()
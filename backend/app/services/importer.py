@@ -0,0 +1,263 @@
+"""
+记账导入服务
+
+流式解析 CSV（兼容本系统导出格式和常见的中文账单表头），
+分类/项目名称通过一次查询构建的内存映射解析为ID，
+与已有记录按内容哈希去重，合法记录分块批量插入并逐块提交，
+全部结束后重建一次该用户的每日汇总。
+"""
+import csv
+import time
+import hashlib
+from collections import Counter
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Optional, TextIO
+
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import Session, aliased
+
+from app.models import Category, LedgerRecord, Project
+from app.services import rollup
+from app.schemas.record import ImportRowError, ImportResponse
+
+
+# 每个事务插入的行数
+IMPORT_CHUNK_SIZE = 1000
+
+# 响应中最多返回的错误明细数
+MAX_REPORTED_ERRORS = 100
+
+# 字段 → 可识别的表头
+COLUMN_ALIASES = {
+    "record_date": ["record_date", "date", "日期", "交易日期", "记账日期", "时间", "交易时间"],
+    "type": ["type", "类型", "收支类型", "收/支", "收支"],
+    "amount": ["amount", "金额", "交易金额", "金额(元)"],
+    "category": ["category", "分类", "类别", "二级分类"],
+    "parent_category": ["parent_category", "一级分类", "父分类"],
+    "project": ["project", "项目"],
+    "remark": ["remark", "备注", "摘要", "说明"],
+}
+REQUIRED_COLUMNS = ("record_date", "amount", "category")
+
+TYPE_VALUES = {
+    "income": "income", "收入": "income", "收": "income",
+    "expense": "expense", "支出": "expense", "支": "expense",
+}
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%Y%m%d", "%Y.%m.%d")
+
+MAX_AMOUNT = Decimal("99999999.99")  # Numeric(10, 2)
+
+
+class ImportFormatError(ValueError):
+    """导入文件格式错误（无法识别表头等）"""
+
+
+def map_columns(fieldnames: Optional[Iterable[str]]) -> Dict[str, str]:
+    """将文件表头映射为字段名"""
+    if not fieldnames:
+        raise ImportFormatError("文件为空或缺少表头")
+    normalized = {name.strip().lower(): name for name in fieldnames if name}
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized[alias]
+                break
+    missing = [field for field in REQUIRED_COLUMNS if field not in columns]
+    if missing:
+        raise ImportFormatError(f"缺少必需列: {', '.join(missing)}")
+    return columns
+
+
+def build_category_map(db: Session, user_id: int) -> Dict[tuple, int]:
+    """用户可用分类的名称映射：(类型, 名称) 和 (类型, 上级名称, 名称) → 分类ID
+
+    同名时用户自建分类优先于系统分类。
+    """
+    parent = aliased(Category)
+    rows = db.query(
+        Category.id, Category.name, Category.type, Category.user_id, parent.name.label("parent_name")
+    ).outerjoin(
+        parent, parent.id == Category.parent_id
+    ).filter(
+        or_(Category.user_id.is_(None), Category.user_id == user_id)
+    ).order_by(Category.user_id.is_(None).desc(), Category.id.desc()).all()
+
+    mapping = {}
+    # 系统分类在前，用户分类在后覆盖；同组内ID小的最后写入
+    for r in rows:
+        mapping[(r.type, r.name)] = r.id
+        if r.parent_name:
+            mapping[(r.type, r.parent_name, r.name)] = r.id
+    return mapping
+
+
+def build_project_map(db: Session, user_id: int) -> Dict[str, int]:
+    """用户项目名称 → 项目ID"""
+    rows = db.query(Project.id, Project.name).filter(
+        Project.user_id == user_id
+    ).order_by(Project.id.desc()).all()
+    return {r.name: r.id for r in rows}
+
+
+def record_fingerprint(record_date: date, record_type: str, amount, category_id: int, remark: Optional[str]) -> bytes:
+    """记录内容哈希，用于与已有记录去重"""
+    raw = "|".join([
+        record_date.isoformat(),
+        record_type,
+        str(Decimal(str(amount)).quantize(Decimal("0.01"))),
+        str(category_id),
+        remark or "",
+    ])
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+
+def existing_fingerprints(db: Session, user_id: int) -> Counter:
+    """已有记录的内容哈希计数（同内容记录可能有多条）"""
+    rows = db.query(
+        LedgerRecord.record_date,
+        LedgerRecord.type,
+        LedgerRecord.amount,
+        LedgerRecord.category_id,
+        LedgerRecord.remark,
+    ).filter(LedgerRecord.user_id == user_id).yield_per(IMPORT_CHUNK_SIZE)
+    return Counter(
+        record_fingerprint(r.record_date, r.type, r.amount, r.category_id, r.remark) for r in rows
+    )
+
+
+def parse_date(value: str) -> date:
+    value = value.strip()
+    # 带时间的只取日期部分
+    value = value.split(" ")[0].split("T")[0]
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"日期格式无效: {value}")
+
+
+def parse_amount(value: str) -> Decimal:
+    cleaned = value.strip().replace(",", "").replace("¥", "").replace("￥", "").replace(" ", "")
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"金额无效: {value}")
+
+
+def parse_row(row: dict, columns: Dict[str, str], categories: Dict[tuple, int], projects: Dict[str, int]) -> dict:
+    """解析一行为插入数据，不合法时抛出 ValueError"""
+    def get(field: str) -> str:
+        column = columns.get(field)
+        return (row.get(column) or "").strip() if column else ""
+
+    record_date = parse_date(get("record_date"))
+    amount = parse_amount(get("amount"))
+
+    # 未提供类型时按金额正负判断（银行流水常见格式）
+    raw_type = get("type")
+    if raw_type:
+        record_type = TYPE_VALUES.get(raw_type.lower())
+        if record_type is None:
+            raise ValueError(f"类型无效: {raw_type}")
+    else:
+        record_type = "expense" if amount < 0 else "income"
+    amount = abs(amount).quantize(Decimal("0.01"))
+    if amount <= 0 or amount > MAX_AMOUNT:
+        raise ValueError(f"金额超出范围: {amount}")
+
+    name = get("category")
+    parent_name = get("parent_category")
+    category_id = None
+    if parent_name:
+        category_id = categories.get((record_type, parent_name, name))
+    if category_id is None:
+        category_id = categories.get((record_type, name))
+    if category_id is None:
+        raise ValueError(f"分类不存在: {name}")
+
+    project_id = None
+    project_name = get("project")
+    if project_name:
+        project_id = projects.get(project_name)
+        if project_id is None:
+            raise ValueError(f"项目不存在: {project_name}")
+
+    return {
+        "category_id": category_id,
+        "amount": amount,
+        "type": record_type,
+        "remark": get("remark")[:500] or None,
+        "project_id": project_id,
+        "record_date": record_date,
+    }
+
+
+def import_csv(db: Session, user_id: int, stream: TextIO, chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportResponse:
+    """从文本流导入记录
+
+    每 chunk_size 条提交一次；结束（或中途失败）后重建一次该用户的每日汇总。
+    """
+    started = time.perf_counter()
+    reader = csv.DictReader(stream)
+    columns = map_columns(reader.fieldnames)
+    categories = build_category_map(db, user_id)
+    projects = build_project_map(db, user_id)
+    seen = existing_fingerprints(db, user_id)
+
+    total = imported = duplicates = failed = 0
+    errors = []
+    chunk = []
+
+    def flush():
+        nonlocal imported
+        if chunk:
+            db.execute(insert(LedgerRecord), chunk)
+            db.commit()
+            imported += len(chunk)
+            chunk.clear()
+
+    try:
+        for row in reader:
+            total += 1
+            try:
+                values = parse_row(row, columns, categories, projects)
+            except ValueError as e:
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    # line 为文件中的行号，表头为第1行
+                    errors.append(ImportRowError(line=reader.line_num, detail=str(e)))
+                continue
+
+            fingerprint = record_fingerprint(
+                values["record_date"], values["type"], values["amount"],
+                values["category_id"], values["remark"]
+            )
+            if seen[fingerprint] > 0:
+                seen[fingerprint] -= 1
+                duplicates += 1
+                continue
+
+            chunk.append({"user_id": user_id, **values})
+            if len(chunk) >= chunk_size:
+                flush()
+        flush()
+    finally:
+        db.rollback()
+        if imported:
+            rollup.rebuild_rollups(db, user_id)
+            db.commit()
+
+    elapsed = time.perf_counter() - started
+    return ImportResponse(
+        total_rows=total,
+        imported=imported,
+        duplicates=duplicates,
+        failed=failed,
+        errors=errors,
+        seconds=round(elapsed, 3),
+        rows_per_second=round(total / elapsed, 1) if elapsed > 0 else 0,
+    )
@@ -0,0 +1,532 @@
+"""
+运行指标（Prometheus 文本格式）
+
+- 按路由模板预聚合：请求数、延迟直方图、进行中请求数、每个路由的SQL次数和耗时
+- 连接池借出/归还、统计/认证/分类缓存命中情况
+- 每个路由压缩前后的响应字节数和压缩耗时
+所有数据都是进程内的计数器和固定桶直方图，请求路径上只做加法。
+每个请求的SQL条数、耗时和最慢语句另行返回在响应头（X-DB-Queries / X-DB-Time）和日志中，
+开发/测试时可按 QUERY_BUDGET / QUERY_REPEAT_LIMIT 检查查询预算和 N+1 查询。
+
+多 worker 部署时设置 METRICS_DIR：各进程定期（以及被抓取时）把自己的快照写入
+该目录，/metrics 合并所有进程的快照后输出；已退出进程的计数保留，仪表值（进行中请求、
+借出连接）只统计存活进程。
+
+/metrics 默认关闭（404）：设置 METRICS_TOKEN 后开启，抓取时需带 Authorization: Bearer <METRICS_TOKEN>。
+"""
+import os
+import re
+import hmac
+import json
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+# 抓取 /metrics 所需的 Bearer 令牌，未设置时不开放 /metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+logger = logging.getLogger("app.metrics")
+
+# 直方图桶上限（秒）
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+# 未匹配到路由的请求统一记为一个标签，避免路径作为标签导致基数膨胀
+UNMATCHED_ROUTE = "unmatched"
+# 请求之外（启动回填、后台任务）执行的SQL
+BACKGROUND_ROUTE = "background"
+
+# 查询预算检查（开发/测试用）：off 不检查，warn 打印警告，raise 抛出 QueryBudgetExceeded
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "off").lower()
+# 单个请求允许的SQL条数（0 表示不限制）
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "0"))
+# 同一语句形态在单个请求中允许重复的次数（0 表示不限制），超过视为 N+1 查询
+QUERY_REPEAT_LIMIT = int(os.getenv("QUERY_REPEAT_LIMIT", "0"))
+
+# IN 列表展开后的占位符个数不同，归为同一形态
+_IN_PLACEHOLDERS = re.compile(r"\(\?(?:,\s*\?)+\)")
+
+
+def scrape_authorized(authorization: Optional[str]) -> bool:
+    """Authorization 请求头是否带有正确的 METRICS_TOKEN（常数时间比较）"""
+    scheme, _, token = (authorization or "").partition(" ")
+    if METRICS_TOKEN is None or scheme.lower() != "bearer":
+        return False
+    return hmac.compare_digest(token.strip().encode("utf-8"), METRICS_TOKEN.encode("utf-8"))
+
+
+class Histogram:
+    """固定桶直方图：counts[i] 为落在第 i 个桶（非累计）的次数，最后一个为 +Inf"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def dump(self) -> list:
+        return [self.counts, self.sum, self.count]
+
+    def merge(self, data: list):
+        counts, total, count = data
+        for i, c in enumerate(counts):
+            self.counts[i] += c
+        self.sum += total
+        self.count += count
+
+
+class QueryBudgetExceeded(Exception):
+    """请求的SQL条数或重复语句超过预算（QUERY_BUDGET_MODE=raise）"""
+
+
+def statement_shape(statement: str) -> str:
+    """语句形态：参数已是占位符，只需合并 IN 列表"""
+    return _IN_PLACEHOLDERS.sub("(?)", " ".join(statement.split()))
+
+
+class RequestScope:
+    """一次请求执行的SQL，经 contextvar 传到线程池中执行的路由函数
+
+    路由模板在路由匹配后才知道，请求结束时再按路由记入直方图。
+    """
+
+    __slots__ = ("durations", "statements", "slowest", "slowest_statement")
+
+    def __init__(self):
+        self.durations: List[float] = []
+        self.statements: Dict[str, int] = {}  # 语句 → 执行次数
+        self.slowest = 0.0
+        self.slowest_statement: Optional[str] = None
+
+    def add(self, statement: str, seconds: float):
+        self.durations.append(seconds)
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        if seconds >= self.slowest:
+            self.slowest = seconds
+            self.slowest_statement = statement
+
+    @property
+    def queries(self) -> int:
+        return len(self.durations)
+
+    @property
+    def seconds(self) -> float:
+        return sum(self.durations)
+
+    def repeated_shapes(self, limit: int) -> List[Tuple[str, int]]:
+        """执行次数超过 limit 的语句形态，按次数降序"""
+        shapes: Dict[str, int] = {}
+        for statement, count in self.statements.items():
+            shape = statement_shape(statement)
+            shapes[shape] = shapes.get(shape, 0) + count
+        return sorted(
+            ((shape, count) for shape, count in shapes.items() if count > limit),
+            key=lambda item: -item[1]
+        )
+
+    def budget_violations(self, budget: int = QUERY_BUDGET, repeat_limit: int = QUERY_REPEAT_LIMIT) -> List[str]:
+        """超出查询预算的说明，未超出时为空"""
+        violations = []
+        if budget and self.queries > budget:
+            violations.append(f"执行了 {self.queries} 条SQL，超过预算 {budget}")
+        if repeat_limit:
+            for shape, count in self.repeated_shapes(repeat_limit):
+                violations.append(f"同一语句执行了 {count} 次（疑似N+1）: {shape[:200]}")
+        return violations
+
+
+current_scope: contextvars.ContextVar[Optional[RequestScope]] = contextvars.ContextVar(
+    "metrics_request_scope", default=None
+)
+
+
+class MetricsRegistry:
+    """进程内指标"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[tuple, int] = {}  # (method, route, status) → 次数
+        self.latency: Dict[tuple, Histogram] = {}  # (method, route) → 直方图
+        self.db_queries: Dict[str, int] = {}  # route → SQL 次数
+        self.db_latency: Dict[str, Histogram] = {}  # route → 单条SQL耗时直方图
+        self.in_flight = 0
+        self.pool_checkouts = 0
+        self.pool_checkins = 0
+        self.pool_connects = 0
+        # (route, encoding) → [响应数, 压缩前字节, 压缩后字节, 压缩耗时]
+        self.compression: Dict[tuple, list] = {}
+
+    # 请求
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float, scope: Optional[RequestScope]):
+        with self._lock:
+            self.in_flight -= 1
+            key = (method, route, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.latency.get((method, route))
+            if histogram is None:
+                histogram = self.latency[(method, route)] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(seconds)
+            if scope is not None and scope.durations:
+                self._observe_queries(route, scope.durations)
+
+    def _observe_queries(self, route: str, durations: Iterable[float]):
+        histogram = self.db_latency.get(route)
+        if histogram is None:
+            histogram = self.db_latency[route] = Histogram(DB_BUCKETS)
+        for seconds in durations:
+            histogram.observe(seconds)
+        self.db_queries[route] = self.db_queries.get(route, 0) + len(durations)
+
+    # SQL
+    def query_executed(self, statement: str, seconds: float):
+        scope = current_scope.get()
+        if scope is not None:
+            scope.add(statement, seconds)
+            return
+        with self._lock:
+            self._observe_queries(BACKGROUND_ROUTE, (seconds,))
+
+    # 连接池
+    def pool_event(self, name: str):
+        with self._lock:
+            if name == "checkout":
+                self.pool_checkouts += 1
+            elif name == "checkin":
+                self.pool_checkins += 1
+            else:
+                self.pool_connects += 1
+
+    # 响应压缩
+    def compression_observed(self, route: str, encoding: str, bytes_in: int, bytes_out: int, seconds: float):
+        with self._lock:
+            entry = self.compression.get((route, encoding))
+            if entry is None:
+                entry = self.compression[(route, encoding)] = [0, 0, 0, 0.0]
+            entry[0] += 1
+            entry[1] += bytes_in
+            entry[2] += bytes_out
+            entry[3] += seconds
+
+    def snapshot(self) -> dict:
+        """可序列化的快照（用于多进程合并）"""
+        from app.services.cache import stats_cache
+        from app.auth.cache import auth_cache
+        from app.services.categories import category_cache
+
+        with self._lock:
+            data = {
+                "pid": os.getpid(),
+                "requests": [[*k, v] for k, v in self.requests.items()],
+                "latency": [[*k, h.dump()] for k, h in self.latency.items()],
+                "db_queries": [[k, v] for k, v in self.db_queries.items()],
+                "db_latency": [[k, h.dump()] for k, h in self.db_latency.items()],
+                "in_flight": self.in_flight,
+                "pool": [self.pool_checkouts, self.pool_checkins, self.pool_connects],
+                "compression": [[*k, *v] for k, v in self.compression.items()],
+            }
+        auth = auth_cache.stats()
+        categories = category_cache.stats()
+        stats = stats_cache.stats()
+        data["caches"] = [
+            ["stats", stats["hits"], stats["misses"]],
+            ["auth_token", auth["token_hits"], auth["token_misses"]],
+            ["auth_user", auth["user_hits"], auth["user_misses"]],
+            ["category", categories["hits"], categories["misses"]],
+        ]
+        return data
+
+
+registry = MetricsRegistry()
+
+
+def check_query_budget(scope: RequestScope, method: str, route: str):
+    """按 QUERY_BUDGET_MODE 检查请求的查询预算"""
+    if QUERY_BUDGET_MODE == "off":
+        return
+    violations = scope.budget_violations()
+    if not violations:
+        return
+    message = f"{method} {route}: " + "；".join(violations)
+    if QUERY_BUDGET_MODE == "raise":
+        raise QueryBudgetExceeded(message)
+    logger.warning(f"⚠️ 查询预算超出 | {message}")
+
+
+def route_template(scope: dict) -> str:
+    """请求匹配到的路由模板（如 /api/v1/records/{record_id}）"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ROUTE
+
+
+# 多进程快照
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"metrics_{pid}.json")
+
+
+def flush_snapshot():
+    """把本进程的快照写入 METRICS_DIR（原子替换）"""
+    if not METRICS_DIR:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(tmp, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect_snapshots() -> List[dict]:
+    """本进程的最新快照 + 其它进程写入的快照"""
+    own = registry.snapshot()
+    if not METRICS_DIR:
+        return [own]
+    flush_snapshot()
+    snapshots = [own]
+    for name in os.listdir(METRICS_DIR):
+        if not (name.startswith("metrics_") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if data.get("pid") != own["pid"]:
+            snapshots.append(data)
+    return snapshots
+
+
+class _Flusher:
+    """后台线程定期写快照"""
+
+    def __init__(self):
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if not METRICS_DIR or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(METRICS_FLUSH_SECONDS):
+            try:
+                flush_snapshot()
+            except OSError:
+                pass
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        try:
+            flush_snapshot()
+        except OSError:
+            pass
+
+
+flusher = _Flusher()
+
+
+# 文本格式输出
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_number(value: float) -> str:
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _histogram_lines(name: str, buckets: Tuple[float, ...], histogram: Histogram, **labels) -> Iterable[str]:
+    cumulative = 0
+    for bound, count in zip(buckets, histogram.counts):
+        cumulative += count
+        yield f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}"
+    cumulative += histogram.counts[-1]
+    yield f"{name}_bucket{_labels(**labels, le='+Inf')} {cumulative}"
+    yield f"{name}_sum{_labels(**labels)} {_format_number(histogram.sum)}"
+    yield f"{name}_count{_labels(**labels)} {histogram.count}"
+
+
+def render(snapshots: List[dict], pool_size: Optional[int] = None) -> str:
+    """合并快照并输出 Prometheus 文本格式"""
+    requests: Dict[tuple, int] = {}
+    latency: Dict[tuple, Histogram] = {}
+    db_queries: Dict[str, int] = {}
+    db_latency: Dict[str, Histogram] = {}
+    caches: Dict[str, List[int]] = {}
+    compression: Dict[tuple, list] = {}
+    in_flight = 0
+    checked_out = 0
+    checkouts = 0
+    connects = 0
+    own_pid = os.getpid()
+
+    for data in snapshots:
+        for method, route, status, value in data["requests"]:
+            key = (method, route, status)
+            requests[key] = requests.get(key, 0) + value
+        for method, route, dump in data["latency"]:
+            latency.setdefault((method, route), Histogram(LATENCY_BUCKETS)).merge(dump)
+        for route, value in data["db_queries"]:
+            db_queries[route] = db_queries.get(route, 0) + value
+        for route, dump in data["db_latency"]:
+            db_latency.setdefault(route, Histogram(DB_BUCKETS)).merge(dump)
+        for name, hits, misses in data["caches"]:
+            entry = caches.setdefault(name, [0, 0])
+            entry[0] += hits
+            entry[1] += misses
+        for route, encoding, *values in data.get("compression", ()):
+            entry = compression.setdefault((route, encoding), [0, 0, 0, 0.0])
+            for i, value in enumerate(values):
+                entry[i] += value
+        out, back, connected = data["pool"]
+        checkouts += out
+        connects += connected
+        # 仪表值只统计存活进程
+        if data["pid"] == own_pid or _pid_alive(data["pid"]):
+            in_flight += data["in_flight"]
+            checked_out += out - back
+
+    lines = [
+        "# HELP http_requests_total HTTP requests by route template and status.",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route, status), value in sorted(requests.items()):
+        lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {value}")
+
+    lines += [
+        "# HELP http_request_duration_seconds HTTP request latency by route template.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route), histogram in sorted(latency.items()):
+        lines.extend(_histogram_lines("http_request_duration_seconds", LATENCY_BUCKETS, histogram, method=method, route=route))
+
+    lines += [
+        "# HELP http_requests_in_flight HTTP requests currently being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {in_flight}",
+        "# HELP db_queries_total SQL statements executed, by route template.",
+        "# TYPE db_queries_total counter",
+    ]
+    for route, value in sorted(db_queries.items()):
+        lines.append(f"db_queries_total{_labels(route=route)} {value}")
+
+    lines += [
+        "# HELP db_query_duration_seconds SQL statement latency, by route template.",
+        "# TYPE db_query_duration_seconds histogram",
+    ]
+    for route, histogram in sorted(db_latency.items()):
+        lines.extend(_histogram_lines("db_query_duration_seconds", DB_BUCKETS, histogram, route=route))
+
+    lines += [
+        "# HELP db_pool_checked_out Connections currently checked out of the pool.",
+        "# TYPE db_pool_checked_out gauge",
+        f"db_pool_checked_out {checked_out}",
+        "# HELP db_pool_checkouts_total Pool checkouts.",
+        "# TYPE db_pool_checkouts_total counter",
+        f"db_pool_checkouts_total {checkouts}",
+        "# HELP db_pool_connections_created_total New DBAPI connections opened.",
+        "# TYPE db_pool_connections_created_total counter",
+        f"db_pool_connections_created_total {connects}",
+    ]
+    if pool_size is not None:
+        lines += [
+            "# HELP db_pool_size Configured pool size per process.",
+            "# TYPE db_pool_size gauge",
+            f"db_pool_size {pool_size}",
+        ]
+
+    for name, index, help_text in (
+        ("http_response_compressed_total", 0, "Compressed responses."),
+        ("http_response_compression_input_bytes_total", 1, "Response bytes before compression."),
+        ("http_response_compression_output_bytes_total", 2, "Response bytes after compression."),
+        ("http_response_compression_seconds_total", 3, "Time spent compressing responses."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (route, encoding), entry in sorted(compression.items()):
+            lines.append(f"{name}{_labels(route=route, encoding=encoding)} {_format_number(entry[index])}")
+
+    lines += [
+        "# HELP cache_hits_total Cache hits.",
+        "# TYPE cache_hits_total counter",
+    ]
+    for name, (hits, _) in sorted(caches.items()):
+        lines.append(f"cache_hits_total{_labels(cache=name)} {hits}")
+    lines += [
+        "# HELP cache_misses_total Cache misses.",
+        "# TYPE cache_misses_total counter",
+    ]
+    for name, (_, misses) in sorted(caches.items()):
+        lines.append(f"cache_misses_total{_labels(cache=name)} {misses}")
+
+    return "\n".join(lines) + "\n"
+
+
+def install_engine_hooks(engine):
+    """在引擎上注册SQL计时和连接池事件"""
+    from sqlalchemy import event
+
+    # 开始时间记在本次执行的上下文上：语句失败时不会在连接上遗留计时状态
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        registry.query_executed(statement, time.perf_counter() - context._metrics_started)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        # 执行失败的语句同样计入
+        started = getattr(exception_context.execution_context, "_metrics_started", None)
+        if started is not None:
+            registry.query_executed(exception_context.statement, time.perf_counter() - started)
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        registry.pool_event("checkout")
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_connection, connection_record):
+        registry.pool_event("checkin")
+
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, connection_record):
+        registry.pool_event("connect")
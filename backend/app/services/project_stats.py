@@ -0,0 +1,101 @@
+"""
+项目统计服务
+
+项目支出从每日汇总表（含 project_id 维度）读取：列表页所有项目的合计
+一次 GROUP BY project_id 查询取回；单个项目的分类/月度明细由同一汇总表
+按 日期/类型/分类 分组的一次查询在内存中推导。
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Iterable
+
+from sqlalchemy.orm import Session
+
+from app.models import DailyRollup, Project
+from app.services.rollup_query import rollup_query
+from app.services.categories import get_user_categories
+from app.schemas.project import (
+    ProjectStats,
+    ProjectCategoryBreakdown,
+    ProjectMonthBreakdown,
+    ProjectBreakdownResponse,
+)
+
+
+def project_totals(db: Session, user_id: int, project_ids: Iterable[int]) -> Dict[int, Decimal]:
+    """各项目的记账金额合计（收入和支出合计，与项目统计口径一致）"""
+    project_ids = set(project_ids)
+    if not project_ids:
+        return {}
+    rows = rollup_query(db, user_id, DailyRollup.project_id).filter(
+        DailyRollup.project_id.in_(project_ids)
+    ).all()
+    return {r.project_id: r.total for r in rows}
+
+
+def build_project_stats(project: Project, total_spent) -> ProjectStats:
+    """由合计金额计算预算使用率和人均费用"""
+    total_spent = total_spent or 0
+
+    budget_usage_rate = 0
+    if project.budget and project.budget > 0:
+        budget_usage_rate = round((total_spent / project.budget) * 100, 2)
+
+    per_person_cost = 0
+    if project.member_count and project.member_count > 0:
+        per_person_cost = round(total_spent / project.member_count, 2)
+
+    return ProjectStats(
+        total_spent=float(total_spent),
+        budget_usage_rate=budget_usage_rate,
+        per_person_cost=per_person_cost
+    )
+
+
+def project_breakdown(db: Session, project: Project) -> ProjectBreakdownResponse:
+    """项目统计及按分类、按月份的明细"""
+    rows = rollup_query(
+        db, project.user_id, DailyRollup.date, DailyRollup.type, DailyRollup.category_id,
+        project_id=project.id
+    ).all()
+
+    total = Decimal(0)
+    by_category = {}
+    by_month = defaultdict(lambda: {"income": Decimal(0), "expense": Decimal(0), "count": 0})
+    for r in rows:
+        total += r.total
+        entry = by_category.setdefault((r.category_id, r.type), [Decimal(0), 0])
+        entry[0] += r.total
+        entry[1] += r.count
+        month = by_month[r.date.strftime("%Y-%m")]
+        month[r.type] += r.total
+        month["count"] += r.count
+
+    categories = get_user_categories(db, project.user_id)
+    category_items = []
+    for (category_id, record_type), (amount, count) in by_category.items():
+        cat = categories.get(category_id)
+        category_items.append(ProjectCategoryBreakdown(
+            category_id=category_id,
+            category_name=cat.name if cat else None,
+            icon=cat.icon if cat else None,
+            type=record_type,
+            amount=float(amount),
+            count=count
+        ))
+    category_items.sort(key=lambda x: x.amount, reverse=True)
+
+    return ProjectBreakdownResponse(
+        project_id=project.id,
+        stats=build_project_stats(project, total),
+        by_category=category_items,
+        by_month=[
+            ProjectMonthBreakdown(
+                month=month,
+                income=float(values["income"]),
+                expense=float(values["expense"]),
+                count=values["count"]
+            )
+            for month, values in sorted(by_month.items())
+        ]
+    )
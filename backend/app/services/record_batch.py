@@ -0,0 +1,194 @@
+"""
+批量记账服务
+
+离线客户端重新联网后一次提交多条记录：分类/项目归属各用一次 IN 查询校验，
+合法记录以单条 executemany 插入，每日汇总按汇总键合并后累加。
+每条记录单独返回结果，某条不合法不影响其余记录；事务由调用方提交。
+"""
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Set
+
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import Session
+
+from app.models import Category, LedgerRecord, Project, RecordIdempotencyKey
+from app.services import rollup
+from app.schemas.record import (
+    RecordBatchCreateItem,
+    RecordBatchUpdateItem,
+    BatchItemResult,
+    RecordBatchResponse,
+)
+
+
+def visible_category_ids(db: Session, user_id: int, ids: Iterable[int]) -> Set[int]:
+    """用户可用（系统或自建）的分类ID"""
+    ids = set(ids)
+    if not ids:
+        return set()
+    rows = db.query(Category.id).filter(
+        Category.id.in_(ids),
+        or_(Category.user_id.is_(None), Category.user_id == user_id)
+    ).all()
+    return {r.id for r in rows}
+
+
+def owned_project_ids(db: Session, user_id: int, ids: Iterable[int]) -> Set[int]:
+    """属于用户的项目ID"""
+    ids = {i for i in ids if i}
+    if not ids:
+        return set()
+    rows = db.query(Project.id).filter(
+        Project.id.in_(ids),
+        Project.user_id == user_id
+    ).all()
+    return {r.id for r in rows}
+
+
+def _response(results: List[BatchItemResult], ok_status: Set[str]) -> RecordBatchResponse:
+    succeeded = sum(1 for r in results if r.status in ok_status)
+    return RecordBatchResponse(
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
+
+def create_records(db: Session, user_id: int, items: List[RecordBatchCreateItem]) -> RecordBatchResponse:
+    """批量创建记录
+
+    已使用过的 client_id（包括同一批次内重复的）返回 duplicate 和已有记录ID，不会重复插入。
+    """
+    results: List[BatchItemResult] = [None] * len(items)
+
+    # 已提交过的幂等键
+    client_ids = {item.client_id for item in items if item.client_id}
+    existing: Dict[str, int] = {}
+    if client_ids:
+        existing = {
+            r.key: r.record_id
+            for r in db.query(RecordIdempotencyKey.key, RecordIdempotencyKey.record_id).filter(
+                RecordIdempotencyKey.user_id == user_id,
+                RecordIdempotencyKey.key.in_(client_ids)
+            ).all()
+        }
+
+    category_ids = visible_category_ids(db, user_id, (item.category_id for item in items))
+    project_ids = owned_project_ids(db, user_id, (item.project_id for item in items))
+
+    pending = []  # (index, 插入行)
+    first_index: Dict[str, int] = {}  # 本批次内 client_id 首次出现的位置
+    repeated = []  # 本批次内重复的 (index, client_id)
+    for index, item in enumerate(items):
+        if item.client_id in existing:
+            results[index] = BatchItemResult(
+                index=index, status="duplicate", id=existing[item.client_id], client_id=item.client_id
+            )
+            continue
+        if item.client_id in first_index:
+            repeated.append((index, item.client_id))
+            continue
+        if item.category_id not in category_ids:
+            results[index] = BatchItemResult(
+                index=index, status="invalid", client_id=item.client_id, detail="分类不存在"
+            )
+            continue
+        if item.project_id and item.project_id not in project_ids:
+            results[index] = BatchItemResult(
+                index=index, status="invalid", client_id=item.client_id, detail="项目不存在"
+            )
+            continue
+
+        if item.client_id:
+            first_index[item.client_id] = index
+        pending.append((index, {"user_id": user_id, **item.model_dump(exclude={"client_id"})}))
+
+    if pending:
+        rows = [row for _, row in pending]
+        new_ids = db.execute(
+            insert(LedgerRecord).returning(LedgerRecord.id, sort_by_parameter_order=True),
+            rows
+        ).scalars().all()
+        rollup.add_records(db, [SimpleNamespace(**row) for row in rows])
+
+        keys = []
+        for (index, row), record_id in zip(pending, new_ids):
+            client_id = items[index].client_id
+            results[index] = BatchItemResult(
+                index=index, status="created", id=record_id, client_id=client_id
+            )
+            if client_id:
+                keys.append({"user_id": user_id, "key": client_id, "record_id": record_id})
+        if keys:
+            db.execute(insert(RecordIdempotencyKey), keys)
+
+    for index, client_id in repeated:
+        first = results[first_index[client_id]]
+        results[index] = BatchItemResult(
+            index=index, status="duplicate", id=first.id, client_id=client_id
+        )
+
+    return _response(results, {"created", "duplicate"})
+
+
+def update_records(db: Session, user_id: int, items: List[RecordBatchUpdateItem]) -> RecordBatchResponse:
+    """批量更新记录，只修改每条请求中显式给出的字段"""
+    ids = {item.id for item in items}
+    records = {
+        r.id: r for r in db.query(LedgerRecord).filter(
+            LedgerRecord.id.in_(ids),
+            LedgerRecord.user_id == user_id
+        ).all()
+    }
+    category_ids = visible_category_ids(db, user_id, (item.category_id for item in items if item.category_id))
+    project_ids = owned_project_ids(db, user_id, (item.project_id for item in items))
+
+    results = []
+    for index, item in enumerate(items):
+        db_record = records.get(item.id)
+        if db_record is None:
+            results.append(BatchItemResult(index=index, status="not_found", id=item.id, detail="记录不存在"))
+            continue
+        if item.category_id and item.category_id not in category_ids:
+            results.append(BatchItemResult(index=index, status="invalid", id=item.id, detail="分类不存在"))
+            continue
+        if item.project_id and item.project_id not in project_ids:
+            results.append(BatchItemResult(index=index, status="invalid", id=item.id, detail="项目不存在"))
+            continue
+
+        old_snapshot = rollup.snapshot_record(db_record)
+        for key, value in item.model_dump(exclude_unset=True, exclude={"id"}).items():
+            setattr(db_record, key, value)
+        rollup.remove_record(db, old_snapshot)
+        rollup.add_record(db, db_record)
+        results.append(BatchItemResult(index=index, status="updated", id=item.id))
+
+    return _response(results, {"updated"})
+
+
+def delete_records(db: Session, user_id: int, ids: List[int]) -> RecordBatchResponse:
+    """批量删除记录"""
+    records = {
+        r.id: r for r in db.query(LedgerRecord).filter(
+            LedgerRecord.id.in_(set(ids)),
+            LedgerRecord.user_id == user_id
+        ).all()
+    }
+
+    results = []
+    deleted = set()
+    for index, record_id in enumerate(ids):
+        db_record = records.get(record_id)
+        if db_record is None or record_id in deleted:
+            results.append(BatchItemResult(index=index, status="not_found", id=record_id, detail="记录不存在"))
+            continue
+        rollup.remove_record(db, rollup.snapshot_record(db_record))
+        deleted.add(record_id)
+        results.append(BatchItemResult(index=index, status="deleted", id=record_id))
+
+    if deleted:
+        db.query(LedgerRecord).filter(
+            LedgerRecord.id.in_(deleted)
+        ).delete(synchronize_session=False)
+
+    return _response(results, {"deleted"})
@@ -0,0 +1,174 @@
+"""
+每日汇总服务
+
+daily_rollups 与 ledger_records 在同一事务内同步维护，
+统计接口只需扫描按天聚合后的数据，成本为 O(天数) 而非 O(记录数)。
+支出变化同时累加到受影响预算的 budget_states，记录数和存储估算累加到 user_usage。
+"""
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+from app.models import LedgerRecord, DailyRollup
+from app.models.daily_rollup import ROLLUP_KEY_ELEMENTS
+from app.services import usage, budget_state
+
+
+def _rollup_key(record) -> dict:
+    """记录对应的汇总键"""
+    return {
+        "user_id": record.user_id,
+        "date": record.record_date,
+        "type": record.type,
+        "category_id": record.category_id,
+        "project_id": record.project_id,
+    }
+
+
+def apply_record(db: Session, key: dict, amount, count: int = 1):
+    """将一条记录的增量（count=1 新增 / count=-1 删除）累加到汇总表
+
+    key 由 snapshot_record 生成；调用方负责提交事务。
+    """
+    apply_delta(db, key, Decimal(str(amount)) * count, count)
+
+
+def _key_filter(key: dict) -> tuple:
+    """汇总键对应的过滤条件（project_id 为空时用 IS NULL）"""
+    project = (
+        DailyRollup.project_id.is_(None) if key["project_id"] is None
+        else DailyRollup.project_id == key["project_id"]
+    )
+    return (
+        DailyRollup.user_id == key["user_id"],
+        DailyRollup.date == key["date"],
+        DailyRollup.type == key["type"],
+        DailyRollup.category_id == key["category_id"],
+        project,
+    )
+
+
+def apply_delta(db: Session, key: dict, delta: Decimal, count: int):
+    """将金额增量和记录数增量累加到 key 对应的汇总行（支出同时累加到预算状态）
+
+    在数据库中原子累加：新增用 INSERT ... ON CONFLICT DO UPDATE（唯一索引 ix_daily_rollups_key），
+    删除用 UPDATE ... SET x = x + :delta（增量为负），记录数归零的行随后删除；并发写入同一汇总行不会丢失更新。
+    """
+    if key["type"] == "expense":
+        budget_state.apply_expense(db, key["user_id"], key["date"], key["category_id"], delta)
+
+    if count > 0:
+        stmt = insert(DailyRollup).values(**key, amount=delta, record_count=count)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=ROLLUP_KEY_ELEMENTS,
+            set_={
+                "amount": DailyRollup.amount + stmt.excluded.amount,
+                "record_count": DailyRollup.record_count + stmt.excluded.record_count,
+            },
+        ))
+        return
+
+    filters = _key_filter(key)
+    db.query(DailyRollup).filter(*filters).update({
+        DailyRollup.amount: DailyRollup.amount + delta,
+        DailyRollup.record_count: DailyRollup.record_count + count,
+    }, synchronize_session=False)
+    db.query(DailyRollup).filter(*filters, DailyRollup.record_count <= 0).delete(synchronize_session=False)
+
+
+def snapshot_record(record) -> tuple:
+    """记录当前的汇总键、金额和估算存储字节数（用于更新/删除前保存旧值）"""
+    return _rollup_key(record), record.amount, usage.record_size(record.remark)
+
+
+def add_record(db: Session, record):
+    """新增记录后更新汇总"""
+    key, amount, size = snapshot_record(record)
+    apply_record(db, key, amount, 1)
+    usage.apply_usage(db, key["user_id"], 1, size)
+
+
+def remove_record(db: Session, snapshot: tuple):
+    """删除记录后更新汇总"""
+    key, amount, size = snapshot
+    apply_record(db, key, amount, -1)
+    usage.apply_usage(db, key["user_id"], -1, -size)
+
+
+def add_records(db: Session, records):
+    """批量新增记录后更新汇总，相同汇总键的记录合并为一次累加
+
+    records 可以是模型对象，也可以是带有同名属性的行。
+    """
+    deltas = {}
+    counters = {}  # 用户ID → [记录数, 字节数]
+    for record in records:
+        key = _rollup_key(record)
+        ident = tuple(key.values())
+        entry = deltas.setdefault(ident, [key, Decimal(0), 0])
+        entry[1] += Decimal(str(record.amount))
+        entry[2] += 1
+        counter = counters.setdefault(record.user_id, [0, 0])
+        counter[0] += 1
+        counter[1] += usage.record_size(record.remark)
+    for key, delta, count in deltas.values():
+        apply_delta(db, key, delta, count)
+    for user_id, (count, size) in counters.items():
+        usage.apply_usage(db, user_id, count, size)
+
+
+def rebuild_rollups(db: Session, user_id: Optional[int] = None):
+    """根据原始记录重建汇总、用量计数和预算状态（全部用户或指定用户），调用方负责提交事务"""
+    delete_query = db.query(DailyRollup)
+    if user_id is not None:
+        delete_query = delete_query.filter(DailyRollup.user_id == user_id)
+    delete_query.delete(synchronize_session=False)
+
+    query = db.query(
+        LedgerRecord.user_id,
+        LedgerRecord.record_date,
+        LedgerRecord.type,
+        LedgerRecord.category_id,
+        LedgerRecord.project_id,
+        func.sum(LedgerRecord.amount).label("amount"),
+        func.count(LedgerRecord.id).label("record_count"),
+    )
+    if user_id is not None:
+        query = query.filter(LedgerRecord.user_id == user_id)
+
+    rows = query.group_by(
+        LedgerRecord.user_id,
+        LedgerRecord.record_date,
+        LedgerRecord.type,
+        LedgerRecord.category_id,
+        LedgerRecord.project_id,
+    ).all()
+
+    db.bulk_insert_mappings(DailyRollup, [
+        {
+            "user_id": r.user_id,
+            "date": r.record_date,
+            "type": r.type,
+            "category_id": r.category_id,
+            "project_id": r.project_id,
+            "amount": r.amount,
+            "record_count": r.record_count,
+        }
+        for r in rows
+    ])
+
+    usage.rebuild_usage(db, user_id)
+    budget_state.refresh_states(db, user_id)
+
+
+def backfill_rollups(db: Session):
+    """汇总表为空而已有记录时（升级后首次启动）全量回填"""
+    if db.query(DailyRollup.id).first() is not None:
+        return
+    if db.query(LedgerRecord.id).first() is None:
+        return
+    rebuild_rollups(db)
+    db.commit()
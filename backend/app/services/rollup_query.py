@@ -0,0 +1,47 @@
+"""
+每日汇总查询
+
+统计、仪表盘和预算评估读取每日汇总表的公共查询。
+与维护汇总的写入路径（app.services.rollup）分开：预算状态服务依赖本模块读取支出，
+而写入路径又要更新预算状态，放在同一模块会形成循环依赖。
+"""
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models import DailyRollup
+
+
+def rollup_query(
+    db: Session,
+    user_id: int,
+    *columns,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    record_type: Optional[str] = None,
+    project_id: Optional[int] = None,
+):
+    """按用户和日期范围查询汇总表，columns 为要分组的汇总列
+
+    返回的每行额外包含 total（金额合计）和 count（记录数）。
+    """
+    query = db.query(
+        *columns,
+        func.sum(DailyRollup.amount).label("total"),
+        func.sum(DailyRollup.record_count).label("count"),
+    ).filter(DailyRollup.user_id == user_id)
+
+    if start_date:
+        query = query.filter(DailyRollup.date >= start_date)
+    if end_date:
+        query = query.filter(DailyRollup.date <= end_date)
+    if record_type:
+        query = query.filter(DailyRollup.type == record_type)
+    if project_id is not None:
+        query = query.filter(DailyRollup.project_id == project_id)
+
+    if columns:
+        query = query.group_by(*columns)
+    return query
@@ -0,0 +1,80 @@
+"""
+用户用量计数服务
+
+user_usage 与 ledger_records 在同一事务内维护（经由每日汇总服务的写入路径），
+管理端的用户列表和用量报表直接读取计数，无需按用户统计记录表。
+计数以 UPDATE ... SET x = x + :delta 原子累加。
+"""
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import LargeBinary, cast, func, insert
+from sqlalchemy.orm import Session
+
+from app.models import LedgerRecord, UserUsage
+
+
+# 一条记录定长字段和索引项的估算字节数，备注按 UTF-8 实际长度另计
+RECORD_BASE_BYTES = 96
+
+
+def record_size(remark: Optional[str]) -> int:
+    """一条记录的估算存储字节数"""
+    return RECORD_BASE_BYTES + (len(remark.encode("utf-8")) if remark else 0)
+
+
+def apply_usage(db: Session, user_id: int, record_delta: int, bytes_delta: int):
+    """累加用户的记录数和存储增量，并刷新最后活跃时间"""
+    now = datetime.utcnow()
+    updated = db.query(UserUsage).filter(UserUsage.user_id == user_id).update({
+        UserUsage.record_count: UserUsage.record_count + record_delta,
+        UserUsage.storage_bytes: UserUsage.storage_bytes + bytes_delta,
+        UserUsage.last_active_at: now,
+    }, synchronize_session=False)
+    if not updated:
+        db.execute(insert(UserUsage).values(
+            user_id=user_id,
+            record_count=max(record_delta, 0),
+            storage_bytes=max(bytes_delta, 0),
+            last_active_at=now,
+        ))
+
+
+def rebuild_usage(db: Session, user_id: Optional[int] = None):
+    """根据原始记录重建用量计数（全部用户或指定用户），调用方负责提交事务"""
+    delete_query = db.query(UserUsage)
+    if user_id is not None:
+        delete_query = delete_query.filter(UserUsage.user_id == user_id)
+    delete_query.delete(synchronize_session=False)
+
+    remark_bytes = func.coalesce(func.length(cast(LedgerRecord.remark, LargeBinary)), 0)
+    query = db.query(
+        LedgerRecord.user_id,
+        func.count(LedgerRecord.id).label("record_count"),
+        func.sum(RECORD_BASE_BYTES + remark_bytes).label("storage_bytes"),
+        func.max(func.coalesce(LedgerRecord.updated_at, LedgerRecord.created_at)).label("last_active_at"),
+    )
+    if user_id is not None:
+        query = query.filter(LedgerRecord.user_id == user_id)
+    rows = query.group_by(LedgerRecord.user_id).all()
+
+    if rows:
+        db.execute(insert(UserUsage), [
+            {
+                "user_id": r.user_id,
+                "record_count": r.record_count,
+                "storage_bytes": r.storage_bytes,
+                "last_active_at": r.last_active_at,
+            }
+            for r in rows
+        ])
+
+
+def backfill_usage(db: Session):
+    """计数表为空而已有记录时（升级后首次启动）全量回填"""
+    if db.query(UserUsage.user_id).first() is not None:
+        return
+    if db.query(LedgerRecord.id).first() is None:
+        return
+    rebuild_usage(db)
+    db.commit()
@@ -0,0 +1,167 @@
+"""
+开发脚本公共工具
+
+提供临时数据库、示例数据和进程内 ASGI 请求，供查询计划检查和性能基准脚本使用。
+注意：use_temp_database() 必须在导入 app 之前调用。
+"""
+import os
+import sys
+import json
+import asyncio
+import random
+import tempfile
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 添加app目录到Python路径
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def use_temp_database(prefix: str = "ledger_") -> str:
+    """将 DATABASE_URL 指向一个新的临时SQLite文件，返回文件路径"""
+    fd, path = tempfile.mkstemp(prefix=prefix, suffix=".db")
+    os.close(fd)
+    os.remove(path)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ.setdefault("DEBUG", "false")
+    return path
+
+
+def seed_sample_data(db, users: int = 2, records_per_user: int = 500, seed: int = 42) -> List[int]:
+    """生成示例分类、用户、项目、预算和记账记录，返回用户ID列表"""
+    from app.models import User, Category, Project, Budget, LedgerRecord
+    from app.services import rollup
+
+    rnd = random.Random(seed)
+
+    # 系统分类
+    expense_ids, income_ids = [], []
+    for name, ctype, children in [
+        ("餐饮", "expense", ["早餐", "午餐", "晚餐"]),
+        ("交通", "expense", ["地铁", "打车"]),
+        ("购物", "expense", ["日用品", "服装"]),
+        ("收入", "income", ["工资", "奖金"]),
+    ]:
+        parent = Category(name=name, icon="📌", type=ctype, is_system=True)
+        db.add(parent)
+        db.flush()
+        ids = expense_ids if ctype == "expense" else income_ids
+        ids.append(parent.id)
+        for child in children:
+            cat = Category(name=child, icon="📌", type=ctype, is_system=True, parent_id=parent.id)
+            db.add(cat)
+            db.flush()
+            ids.append(cat.id)
+
+    today = date.today()
+    user_ids = []
+    for i in range(users):
+        user = User(username=f"bench_user_{i}", password_hash="!", is_admin=(i == 0))
+        db.add(user)
+        db.flush()
+        user_ids.append(user.id)
+
+        project = Project(user_id=user.id, name="示例项目", budget=5000, member_count=2)
+        db.add(project)
+        db.flush()
+
+        db.add(Budget(user_id=user.id, name="总预算", amount=3000))
+        db.add(Budget(user_id=user.id, name="餐饮", amount=800, category_id=expense_ids[0]))
+        db.add(Budget(user_id=user.id, name="年度", amount=30000, period="yearly"))
+
+        rows = []
+        for _ in range(records_per_user):
+            record_type = "income" if rnd.random() < 0.2 else "expense"
+            rows.append({
+                "user_id": user.id,
+                "category_id": rnd.choice(income_ids if record_type == "income" else expense_ids),
+                "amount": round(rnd.uniform(1, 500), 2),
+                "type": record_type,
+                "remark": "示例",
+                "project_id": project.id if rnd.random() < 0.2 else None,
+                "record_date": today - timedelta(days=rnd.randint(0, 730)),
+            })
+        db.bulk_insert_mappings(LedgerRecord, rows)
+
+    rollup.rebuild_rollups(db)
+    db.commit()
+    return user_ids
+
+
+def auth_headers(user_id: int, username: str = "bench", is_admin: bool = False) -> Dict[str, str]:
+    """生成带JWT的请求头"""
+    from app.auth.token import create_access_token
+
+    token = create_access_token({"sub": user_id, "username": username, "is_admin": is_admin})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def asgi_request(
+    app,
+    method: str,
+    path: str,
+    headers: Optional[Dict[str, str]] = None,
+    json_body=None,
+    on_body: Optional[Callable[[bytes], None]] = None,
+) -> Tuple[int, Dict[str, str], bytes]:
+    """在进程内直接调用ASGI应用（不经过网络和HTTP客户端库）
+
+    传入 on_body 时响应体分块交给回调处理而不在内存中累积，返回的 body 为空。
+    """
+    path, _, query_string = path.partition("?")
+    body = json.dumps(json_body).encode("utf-8") if json_body is not None else b""
+    raw_headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in (headers or {}).items()]
+    if json_body is not None:
+        raw_headers.append((b"content-type", b"application/json"))
+    raw_headers.append((b"content-length", str(len(body)).encode("latin-1")))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method.upper(),
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "root_path": "",
+        "query_string": query_string.encode("latin-1"),
+        "headers": raw_headers,
+        "client": ("127.0.0.1", 12345),
+        "server": ("testserver", 80),
+    }
+
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # 客户端保持连接：流式响应会持续监听断开事件
+        await asyncio.Event().wait()
+
+    status_code = 500
+    response_headers = {}
+    chunks = []
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            response_headers.update(
+                (k.decode("latin-1"), v.decode("latin-1")) for k, v in message.get("headers", [])
+            )
+        elif message["type"] == "http.response.body":
+            if on_body is not None:
+                on_body(message.get("body", b""))
+            else:
+                chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # ServerErrorMiddleware 发送500响应后会重新抛出异常
+        if not chunks:
+            status_code = 500
+    return status_code, response_headers, b"".join(chunks)
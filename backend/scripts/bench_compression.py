@@ -0,0 +1,99 @@
+"""
+响应压缩基准
+
+在临时数据库上取大体积接口（年度统计、全年每日统计、记账列表、CSV/JSONL 导出）的原始响应，
+比较不同 gzip 级别（安装了 brotli 时另加 br 质量）的压缩后大小和每次压缩耗时，
+用于选择 GZIP_LEVEL / BROTLI_QUALITY；并校验经过 CompressionMiddleware 的响应解压后与原始响应一致。
+
+用法:
+    python scripts/bench_compression.py [--records 20000] [--repeat 20]
+"""
+import io
+import os
+import time
+import gzip
+import zlib
+import asyncio
+import argparse
+from contextlib import redirect_stdout
+
+from bench_common import use_temp_database, seed_sample_data, auth_headers, asgi_request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+GZIP_LEVELS = (1, 3, 5, 6, 9)
+BROTLI_QUALITIES = (1, 4, 6, 11)
+
+
+def gzip_compress(data: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def timed(func, repeat: int) -> float:
+    """平均每次耗时（毫秒）"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - started) / repeat * 1000, result
+
+
+async def main(args):
+    from app.main import app
+    from app.database import engine, Base, SessionLocal
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user_id = seed_sample_data(db, users=1, records_per_user=args.records)[0]
+    db.close()
+    headers = auth_headers(user_id, "bench_user_0", is_admin=True)
+
+    year = time.localtime().tm_year
+    paths = [
+        f"/api/v1/statistics/yearly?year={year}",
+        f"/api/v1/statistics/daily?year={year}",
+        "/api/v1/records?page_size=100",
+        "/api/v1/records/export?format=csv",
+        "/api/v1/records/export?format=jsonl",
+    ]
+
+    codecs = [(f"gzip-{level}", lambda data, level=level: gzip_compress(data, level)) for level in GZIP_LEVELS]
+    if brotli is not None:
+        codecs += [(f"br-{q}", lambda data, q=q: brotli.compress(data, quality=q)) for q in BROTLI_QUALITIES]
+
+    print(f"记录数: {args.records}  重复: {args.repeat}  brotli: {'已安装' if brotli else '未安装'}")
+    for path in paths:
+        with redirect_stdout(io.StringIO()):
+            status, _, raw = await asgi_request(app, "GET", path, {**headers, "Accept-Encoding": "identity"})
+            _, response_headers, body = await asgi_request(app, "GET", path, {**headers, "Accept-Encoding": "gzip"})
+        if status != 200:
+            raise RuntimeError(f"{path} 返回 {status}: {raw[:200]!r}")
+        if response_headers.get("content-encoding") != "gzip" or gzip.decompress(body) != raw:
+            raise RuntimeError(f"{path} 压缩响应与原始响应不一致")
+
+        print(f"\n{path}  原始 {len(raw)} B  经中间件 {len(body)} B")
+        print(f"{'编码':<10}{'大小(B)':>10}{'压缩率':>9}{'耗时(ms)':>10}{'MB/s':>9}")
+        for name, func in codecs:
+            ms, compressed = timed(lambda: func(raw), args.repeat)
+            print(
+                f"{name:<10}{len(compressed):>10}{len(compressed) / len(raw):>9.1%}"
+                f"{ms:>10.2f}{len(raw) / 1e6 / (ms / 1000):>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="响应压缩基准")
+    parser.add_argument("--records", type=int, default=20000, help="示例记录数")
+    parser.add_argument("--repeat", type=int, default=20, help="每种编码的重复次数")
+    args = parser.parse_args()
+
+    db_path = use_temp_database("bench_compression_")
+    try:
+        asyncio.run(main(args))
+    finally:
+        if os.path.exists(db_path):
+            os.remove(db_path)
@@ -0,0 +1,162 @@
+"""
+数据库配置档性能基准
+
+分别以各配置档（DB_PROFILE）启动子进程，在临时数据库上测量：
+- 写入：逐条 ORM 插入并提交（与 POST /records 相同的提交粒度）
+- 读取：按日期范围分组汇总的统计查询
+- 并发：1个写线程 + N个读线程同时运行固定时长
+
+用法:
+    python scripts/bench_database.py [--records 2000] [--reads 500] [--seconds 3] [--readers 4]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import subprocess
+from datetime import date, timedelta
+
+
+def run_worker(args):
+    """在当前进程中按环境变量指定的配置档执行基准测试"""
+    from bench_common import use_temp_database
+
+    db_path = use_temp_database("bench_db_")
+
+    from sqlalchemy import func
+    from app.database import engine, Base, SessionLocal, DB_PROFILE
+    from app.models import LedgerRecord
+    from app.services import rollup
+    from bench_common import seed_sample_data
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user_id = seed_sample_data(db, users=1, records_per_user=args.records)[0]
+    db.close()
+
+    def insert_one(db, i):
+        record = LedgerRecord(
+            user_id=user_id, category_id=2, amount=10 + i % 100, type="expense",
+            record_date=date.today() - timedelta(days=i % 365),
+        )
+        db.add(record)
+        db.flush()
+        rollup.add_record(db, record)
+        db.commit()
+
+    def read_one(db):
+        start = date.today() - timedelta(days=365)
+        db.query(
+            LedgerRecord.record_date,
+            LedgerRecord.type,
+            func.sum(LedgerRecord.amount)
+        ).filter(
+            LedgerRecord.user_id == user_id,
+            LedgerRecord.record_date >= start
+        ).group_by(LedgerRecord.record_date, LedgerRecord.type).all()
+
+    # 顺序写入
+    db = SessionLocal()
+    start = time.perf_counter()
+    for i in range(args.records):
+        insert_one(db, i)
+    write_rate = args.records / (time.perf_counter() - start)
+
+    # 顺序读取
+    start = time.perf_counter()
+    for _ in range(args.reads):
+        read_one(db)
+    read_rate = args.reads / (time.perf_counter() - start)
+    db.close()
+
+    # 并发读写
+    stop = threading.Event()
+    counts = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def writer():
+        db = SessionLocal()
+        i = 0
+        while not stop.is_set():
+            try:
+                insert_one(db, i)
+                with lock:
+                    counts["writes"] += 1
+            except Exception:
+                db.rollback()
+                with lock:
+                    counts["errors"] += 1
+            i += 1
+        db.close()
+
+    def reader():
+        db = SessionLocal()
+        while not stop.is_set():
+            try:
+                read_one(db)
+                db.rollback()  # 结束读事务，下一次读取看到最新数据
+                with lock:
+                    counts["reads"] += 1
+            except Exception:
+                with lock:
+                    counts["errors"] += 1
+        db.close()
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(args.readers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    print(json.dumps({
+        "profile": DB_PROFILE,
+        "write_per_sec": round(write_rate, 1),
+        "read_per_sec": round(read_rate, 1),
+        "mixed_writes_per_sec": round(counts["writes"] / args.seconds, 1),
+        "mixed_reads_per_sec": round(counts["reads"] / args.seconds, 1),
+        "mixed_errors": counts["errors"],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较各数据库配置档的读写吞吐")
+    parser.add_argument("--records", type=int, default=2000, help="顺序写入条数（同时作为初始数据量）")
+    parser.add_argument("--reads", type=int, default=500, help="顺序读取次数")
+    parser.add_argument("--seconds", type=float, default=3, help="并发读写测试时长")
+    parser.add_argument("--readers", type=int, default=4, help="并发读线程数")
+    parser.add_argument("--profiles", default="development,production", help="要比较的配置档")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    results = []
+    for profile in args.profiles.split(","):
+        env = dict(os.environ, DB_PROFILE=profile, SQL_ECHO="false")
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker",
+             "--records", str(args.records), "--reads", str(args.reads),
+             "--seconds", str(args.seconds), "--readers", str(args.readers)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    columns = ["profile", "write_per_sec", "read_per_sec", "mixed_writes_per_sec", "mixed_reads_per_sec", "mixed_errors"]
+    print(" | ".join(f"{c:>20}" for c in columns))
+    for r in results:
+        print(" | ".join(f"{r[c]:>20}" for c in columns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+事件循环阻塞基准
+
+在临时数据库上同时发起耗时报表请求和 /health 探测请求，比较两种处理方式：
+- blocking：async def 路由内直接调用同步查询（旧写法，查询期间阻塞事件循环）
+- threadpool：def 路由，由 FastAPI 放入线程池执行（当前写法）
+
+报表内容为跳过缓存的年度统计，外加一次对明细表的按月分组扫描，模拟未命中汇总表的慢查询。
+输出探测请求的 p50/p95/最大延迟以及报表吞吐。
+
+用法:
+    python scripts/bench_event_loop.py [--records 20000] [--seconds 3] [--concurrency 4]
+"""
+import io
+import os
+import time
+import asyncio
+import argparse
+import statistics as stats
+from contextlib import redirect_stdout
+from datetime import date
+
+from bench_common import use_temp_database, seed_sample_data, auth_headers, asgi_request
+
+
+def percentile(values, pct):
+    """简单百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def build_app():
+    """在应用上挂载两个仅供基准使用的报表路由"""
+    from fastapi import Depends
+    from sqlalchemy import func
+    from sqlalchemy.orm import Session
+
+    from app.main import app
+    from app.database import get_db
+    from app.models import User, LedgerRecord
+    from app.auth.dependencies import get_current_user
+    from app.routers.statistics import get_yearly_stats
+
+    # 跳过结果缓存，确保每次都真正查询
+    yearly = get_yearly_stats.__wrapped__
+
+    def heavy_report(db: Session, current_user: User) -> dict:
+        year = date.today().year
+        report = yearly(year=year, current_user=current_user, db=db)
+        months = db.query(
+            func.strftime("%Y-%m", LedgerRecord.record_date),
+            LedgerRecord.type,
+            func.sum(LedgerRecord.amount),
+            func.count(LedgerRecord.id)
+        ).filter(
+            LedgerRecord.user_id == current_user.id
+        ).group_by(
+            func.strftime("%Y-%m", LedgerRecord.record_date), LedgerRecord.type
+        ).all()
+        return {"year": report["year"], "months": len(months)}
+
+    @app.get("/bench/blocking")
+    async def blocking_report(
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+    ):
+        return heavy_report(db, current_user)
+
+    @app.get("/bench/threadpool")
+    def threadpool_report(
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+    ):
+        return heavy_report(db, current_user)
+
+    return app
+
+
+async def run_mode(app, path: str, headers: dict, seconds: float, concurrency: int) -> dict:
+    """并发请求报表的同时每10ms探测一次 /health"""
+    deadline = time.perf_counter() + seconds
+    reports = 0
+    probe_latencies = []
+
+    async def report_worker():
+        nonlocal reports
+        while time.perf_counter() < deadline:
+            status, _, body = await asgi_request(app, "GET", path, headers)
+            if status != 200:
+                raise RuntimeError(f"{path} 返回 {status}: {body[:200]!r}")
+            reports += 1
+
+    async def probe_worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await asgi_request(app, "GET", "/health")
+            probe_latencies.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    await asyncio.gather(probe_worker(), *(report_worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "reports_per_sec": reports / elapsed,
+        "probes": len(probe_latencies),
+        "p50": stats.median(probe_latencies) if probe_latencies else 0.0,
+        "p95": percentile(probe_latencies, 95),
+        "max": max(probe_latencies, default=0.0),
+    }
+
+
+async def main(args):
+    from app.database import engine, Base, SessionLocal
+    import app.models  # noqa: F401  注册全部模型
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user_id = seed_sample_data(db, users=1, records_per_user=args.records)[0]
+    db.close()
+
+    app = build_app()
+    headers = auth_headers(user_id, "bench_user_0", is_admin=True)
+
+    # 预热
+    with redirect_stdout(io.StringIO()):
+        for path in ("/bench/blocking", "/bench/threadpool", "/health"):
+            await asgi_request(app, "GET", path, headers)
+
+    print(f"记录数: {args.records}  并发报表: {args.concurrency}  时长: {args.seconds}s")
+    print(f"{'模式':<12}{'报表/s':>10}{'探测数':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'max(ms)':>10}")
+    for mode in ("blocking", "threadpool"):
+        # 屏蔽请求日志输出，避免打印影响计时
+        with redirect_stdout(io.StringIO()):
+            result = await run_mode(app, f"/bench/{mode}", headers, args.seconds, args.concurrency)
+        print(
+            f"{mode:<12}{result['reports_per_sec']:>10.1f}{result['probes']:>8}"
+            f"{result['p50']:>10.2f}{result['p95']:>10.2f}{result['max']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="事件循环阻塞基准")
+    parser.add_argument("--records", type=int, default=20000, help="示例记录数")
+    parser.add_argument("--seconds", type=float, default=3, help="每种模式运行时长（秒）")
+    parser.add_argument("--concurrency", type=int, default=4, help="并发报表请求数")
+    args = parser.parse_args()
+
+    db_path = use_temp_database("bench_loop_")
+    try:
+        asyncio.run(main(args))
+    finally:
+        if os.path.exists(db_path):
+            os.remove(db_path)
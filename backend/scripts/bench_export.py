@@ -0,0 +1,156 @@
+"""
+流式导出内存基准
+
+在临时数据库中生成指定数量的记账记录（默认100万条），再在独立子进程中
+通过 GET /api/v1/records/export 完整导出一次（响应体只计数不保存），报告：
+- 导出行数、字节数、耗时和每秒行数
+- 导出前后的峰值 RSS，以及导出带来的增量
+
+峰值 RSS 增量超过 --max-rss-mb 时退出码为 1。
+
+用法:
+    python scripts/bench_export.py [--rows 1000000] [--format csv|jsonl] [--max-rss-mb 64]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import subprocess
+from datetime import date, timedelta
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值 RSS（MB）"""
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return usage / 1024 / 1024 if sys.platform == "darwin" else usage / 1024
+
+
+def seed(rows: int) -> int:
+    """生成示例数据，记录分块插入以免占用过多内存，返回用户ID"""
+    from sqlalchemy import insert
+    from app.database import engine, Base, SessionLocal
+    from app.models import LedgerRecord, Category, Project
+    from bench_common import seed_sample_data
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user_id = seed_sample_data(db, users=1, records_per_user=0)[0]
+    category_ids = [c.id for c in db.query(Category.id).filter(Category.type == "expense").all()]
+    project_id = db.query(Project.id).filter(Project.user_id == user_id).scalar()
+
+    rnd = random.Random(42)
+    today = date.today()
+    chunk = 50000
+    for offset in range(0, rows, chunk):
+        db.execute(insert(LedgerRecord), [
+            {
+                "user_id": user_id,
+                "category_id": rnd.choice(category_ids),
+                "amount": round(rnd.uniform(1, 500), 2),
+                "type": "expense",
+                "remark": "示例记录",
+                "project_id": project_id if rnd.random() < 0.2 else None,
+                "record_date": today - timedelta(days=rnd.randint(0, 3650)),
+            }
+            for _ in range(min(chunk, rows - offset))
+        ])
+        db.commit()
+    db.close()
+    return user_id
+
+
+def run_worker(args):
+    """在子进程中执行一次完整导出并输出JSON结果"""
+    from bench_common import auth_headers, asgi_request
+    from app.main import app
+
+    headers = auth_headers(args.user_id)
+    received = {"bytes": 0, "lines": 0}
+
+    def on_body(chunk: bytes):
+        received["bytes"] += len(chunk)
+        received["lines"] += chunk.count(b"\n")
+
+    async def main():
+        # 预热（路由、依赖、SQL编译缓存）后再记录基线
+        await asgi_request(app, "GET", "/api/v1/records/export?end_date=2000-01-01", headers)
+        baseline = peak_rss_mb()
+        started = time.perf_counter()
+        status, _, _ = await asgi_request(
+            app, "GET", f"/api/v1/records/export?format={args.format}", headers, on_body=on_body
+        )
+        elapsed = time.perf_counter() - started
+        return status, baseline, elapsed
+
+    status, baseline, elapsed = asyncio.run(main())
+    rows = received["lines"] - (1 if args.format == "csv" else 0)
+    print(json.dumps({
+        "status": status,
+        "rows": rows,
+        "bytes": received["bytes"],
+        "seconds": elapsed,
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": peak_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式导出内存基准")
+    parser.add_argument("--rows", type=int, default=1000000, help="记录数")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv", help="导出格式")
+    parser.add_argument("--max-rss-mb", type=float, default=64, help="允许的峰值RSS增量（MB）")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--user-id", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    from bench_common import use_temp_database
+
+    db_path = use_temp_database("bench_export_")
+    try:
+        print(f"生成 {args.rows} 条记录...")
+        started = time.perf_counter()
+        user_id = seed(args.rows)
+        print(f"生成完成，用时 {time.perf_counter() - started:.1f}s")
+
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker",
+             "--user-id", str(user_id), "--format", args.format],
+            env=dict(os.environ, SQL_ECHO="false"),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+    finally:
+        if os.path.exists(db_path):
+            os.remove(db_path)
+
+    delta = result["peak_rss_mb"] - result["baseline_rss_mb"]
+    print(f"状态码: {result['status']}")
+    print(f"导出行数: {result['rows']}  大小: {result['bytes'] / 1024 / 1024:.1f}MB")
+    print(f"耗时: {result['seconds']:.2f}s  ({result['rows'] / result['seconds']:.0f} 行/s)")
+    print(
+        f"峰值RSS: 导出前 {result['baseline_rss_mb']:.1f}MB → 导出后 {result['peak_rss_mb']:.1f}MB"
+        f"（增量 {delta:.1f}MB，上限 {args.max_rss_mb:.0f}MB）"
+    )
+
+    if result["status"] != 200 or result["rows"] != args.rows:
+        print("❌ 导出结果不完整")
+        sys.exit(1)
+    if delta > args.max_rss_mb:
+        print("❌ 导出内存增量超出上限")
+        sys.exit(1)
+    print("✅ 导出内存占用稳定")
+
+
+if __name__ == "__main__":
+    main()
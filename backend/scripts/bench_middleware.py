@@ -0,0 +1,147 @@
+"""
+中间件基准
+
+在临时数据库上比较两种请求中间件的吞吐：
+- legacy：@app.middleware("http") 函数（BaseHTTPMiddleware）+ 每个请求同步 print 日志（旧写法）
+- asgi：纯 ASGI 的 TimingMiddleware + 队列写出 JSON 日志（当前写法）
+
+两种模式的SQL统计和请求指标相同，日志都写到 /dev/null。
+输出 /health 和记账列表接口的每秒请求数及 p50/p95 延迟。
+
+用法:
+    python scripts/bench_middleware.py [--records 2000] [--seconds 3] [--concurrency 8]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics as stats
+from datetime import datetime
+
+from bench_common import use_temp_database, seed_sample_data, auth_headers, asgi_request
+
+
+def percentile(values, pct):
+    """简单百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def legacy_middleware(request, call_next):
+    """旧的请求日志中间件（保留用于对比）"""
+    from app.services import metrics
+
+    start_time = time.time()
+    started = time.perf_counter()
+    scope = metrics.RequestScope()
+    metrics.current_scope.set(scope)
+    metrics.registry.request_started()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        process_time = time.time() - start_time
+        response.headers["X-Process-Time"] = f"{process_time:.4f}"
+        response.headers["X-DB-Queries"] = str(scope.queries)
+        response.headers["X-DB-Time"] = f"{scope.seconds:.4f}"
+        print(
+            f"{datetime.now().isoformat()} | "
+            f"{request.method} {request.url.path} | "
+            f"{response.status_code} | "
+            f"{process_time:.4f}s | "
+            f"db_queries={scope.queries} db_time={scope.seconds:.4f}s"
+        )
+        return response
+    finally:
+        metrics.registry.request_finished(
+            request.method, metrics.route_template(request.scope), status_code,
+            time.perf_counter() - started, scope
+        )
+
+
+def use_middleware(app, mode: str):
+    """替换应用的请求日志中间件并重建中间件栈"""
+    from starlette.middleware import Middleware
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from app.middleware import TimingMiddleware
+
+    others = [m for m in app.user_middleware if m.cls not in (TimingMiddleware, BaseHTTPMiddleware)]
+    if mode == "legacy":
+        timing = Middleware(BaseHTTPMiddleware, dispatch=legacy_middleware)
+    else:
+        timing = Middleware(TimingMiddleware)
+    # 与 main.py 相同：日志中间件在 CORS 之内
+    app.user_middleware = others + [timing]
+    app.middleware_stack = None
+
+
+async def run_mode(app, path: str, headers: dict, seconds: float, concurrency: int) -> dict:
+    """并发请求 path，统计吞吐和延迟"""
+    deadline = time.perf_counter() + seconds
+    latencies = []
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status, _, body = await asgi_request(app, "GET", path, headers)
+            if status != 200:
+                raise RuntimeError(f"{path} 返回 {status}: {body[:200]!r}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50": stats.median(latencies) if latencies else 0.0,
+        "p95": percentile(latencies, 95),
+    }
+
+
+async def main(args, out):
+    from app.main import app
+    from app.database import engine, Base, SessionLocal
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user_id = seed_sample_data(db, users=1, records_per_user=args.records)[0]
+    db.close()
+    headers = auth_headers(user_id, "bench_user_0", is_admin=True)
+
+    paths = ("/health", "/api/v1/records?page_size=20")
+    print(f"记录数: {args.records}  并发: {args.concurrency}  时长: {args.seconds}s", file=out)
+    print(f"{'模式':<8}{'接口':<30}{'请求/s':>10}{'p50(ms)':>10}{'p95(ms)':>10}", file=out)
+    for mode in ("legacy", "asgi"):
+        use_middleware(app, mode)
+        for path in paths:
+            # 预热
+            await asgi_request(app, "GET", path, headers)
+            result = await run_mode(app, path, headers, args.seconds, args.concurrency)
+            print(
+                f"{mode:<8}{path:<30}{result['rps']:>10.1f}{result['p50']:>10.2f}{result['p95']:>10.2f}",
+                file=out
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="中间件基准")
+    parser.add_argument("--records", type=int, default=2000, help="示例记录数")
+    parser.add_argument("--seconds", type=float, default=3, help="每个接口每种模式的运行时长（秒）")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发请求数")
+    args = parser.parse_args()
+
+    db_path = use_temp_database("bench_middleware_")
+    # 两种模式的日志都写到 /dev/null（需在导入 app 之前替换，JSON 日志处理器绑定当时的 stdout）
+    out = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        asyncio.run(main(args, out))
+    finally:
+        sys.stdout = out
+        if os.path.exists(db_path):
+            os.remove(db_path)
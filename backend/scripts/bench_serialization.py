@@ -0,0 +1,91 @@
+"""
+响应序列化基准
+
+在临时数据库上取热点接口的响应数据，比较两种序列化方式的耗时：
+- model：按响应模型构建 Pydantic 对象，再按 JSON 模式导出并用标准库 json 编码
+  （FastAPI 处理 response_model 的路径：构建模型 → 校验 → 序列化 → JSONResponse）
+- fast：直接用 FastJSONResponse 编码 dict（orjson 已安装时用 orjson，否则标准库 json）
+
+用法:
+    python scripts/bench_serialization.py [--records 5000] [--repeat 200]
+"""
+import os
+import io
+import json
+import time
+import asyncio
+import argparse
+from contextlib import redirect_stdout
+
+from bench_common import use_temp_database, seed_sample_data, auth_headers, asgi_request
+
+
+def timed(func, repeat: int) -> float:
+    """平均每次耗时（微秒）"""
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+async def main(args):
+    from pydantic import TypeAdapter
+    from fastapi.responses import JSONResponse
+    from app.main import app
+    from app.database import engine, Base, SessionLocal
+    from app.responses import FastJSONResponse, json_backend
+    from app.schemas.record import RecordListResponse
+    from app.schemas.statistics import DailyStatsResponse
+    from app.schemas.budget import BudgetListResponse
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user_id = seed_sample_data(db, users=1, records_per_user=args.records)[0]
+    db.close()
+    headers = auth_headers(user_id, "bench_user_0", is_admin=True)
+
+    year = time.localtime().tm_year
+    endpoints = [
+        ("/api/v1/statistics/daily?year=%d" % year, DailyStatsResponse),
+        ("/api/v1/records?page_size=100", RecordListResponse),
+        ("/api/v1/budgets", BudgetListResponse),
+    ]
+
+    print(f"记录数: {args.records}  重复: {args.repeat}  fast 编码: {json_backend()}")
+    print(f"{'接口':<40}{'大小(B)':>10}{'model(µs)':>12}{'fast(µs)':>12}{'加速':>8}")
+    for path, model in endpoints:
+        with redirect_stdout(io.StringIO()):
+            status, _, body = await asgi_request(app, "GET", path, headers)
+        if status != 200:
+            raise RuntimeError(f"{path} 返回 {status}: {body[:200]!r}")
+        data = json.loads(body)
+        adapter = TypeAdapter(model)
+
+        def model_path():
+            value = adapter.validate_python(data)
+            return JSONResponse(adapter.dump_python(value, mode="json")).body
+
+        def fast_path():
+            return FastJSONResponse(data).body
+
+        if json.loads(model_path()) != json.loads(fast_path()):
+            raise RuntimeError(f"{path} 两种方式输出不一致")
+
+        model_us = timed(model_path, args.repeat)
+        fast_us = timed(fast_path, args.repeat)
+        print(f"{path:<40}{len(body):>10}{model_us:>12.1f}{fast_us:>12.1f}{model_us / fast_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="响应序列化基准")
+    parser.add_argument("--records", type=int, default=5000, help="示例记录数")
+    parser.add_argument("--repeat", type=int, default=200, help="每种方式的重复次数")
+    args = parser.parse_args()
+
+    db_path = use_temp_database("bench_serialization_")
+    try:
+        asyncio.run(main(args))
+    finally:
+        if os.path.exists(db_path):
+            os.remove(db_path)
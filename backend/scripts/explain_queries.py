@@ -0,0 +1,139 @@
+"""
+查询计划检查脚本
+
+在临时数据库中生成示例数据，依次调用各路由，记录路由实际执行的SQL，
+再对每条语句执行 EXPLAIN QUERY PLAN。若被检查的表出现全表扫描（SCAN 且未使用索引），
+则打印问题语句并以非零状态退出，可用于CI。
+
+用法:
+    python scripts/explain_queries.py [--tables ledger_records,daily_rollups] [-v]
+"""
+import os
+import re
+import sys
+import asyncio
+import argparse
+from datetime import date
+
+from bench_common import use_temp_database, seed_sample_data, auth_headers, asgi_request
+
+DB_PATH = use_temp_database("explain_")
+
+from sqlalchemy import event
+
+from app.database import engine, Base, SessionLocal
+from app.main import app
+
+
+DEFAULT_TABLES = ["ledger_records", "daily_rollups", "budgets", "projects"]
+
+# SCAN 表名 [AS 别名]，后面没有 USING ... INDEX 即为全表扫描
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+
+def route_calls(user_id: int, project_id: int, record_id: int) -> list:
+    """需要检查的路由调用 (method, path, json)
+
+    日期参数按今天计算，与示例数据（今天之前两年内）的时间范围一致。
+    """
+    today = date.today()
+    year = today.year
+    year_start = today.replace(month=1, day=1).isoformat()
+    return [
+        ("GET", "/api/v1/records?page=2&page_size=20", None),
+        ("GET", "/api/v1/records?type=expense&include_total=false", None),
+        ("GET", f"/api/v1/records?project_id={project_id}", None),
+        ("GET", f"/api/v1/records/summary?start_date={year_start}", None),
+        ("GET", f"/api/v1/records/export?format=jsonl&start_date={year_start}", None),
+        ("GET", "/api/v1/statistics/overview", None),
+        ("GET", f"/api/v1/statistics/daily?year={year}", None),
+        ("GET", f"/api/v1/statistics/monthly?year={year}", None),
+        ("GET", "/api/v1/statistics/category?record_type=expense", None),
+        ("GET", "/api/v1/statistics/trend?days=90", None),
+        ("GET", "/api/v1/statistics/dashboard", None),
+        ("GET", f"/api/v1/statistics/yearly?year={year}", None),
+        ("GET", f"/api/v1/statistics/compare/months?month1=1&year1={year}&month2=2&year2={year}", None),
+        ("GET", "/api/v1/statistics/compare/categories", None),
+        ("GET", "/api/v1/projects", None),
+        ("GET", f"/api/v1/projects/{project_id}", None),
+        ("GET", f"/api/v1/projects/{project_id}/stats", None),
+        ("GET", "/api/v1/budgets", None),
+        ("GET", "/api/v1/budgets/summary/current", None),
+        ("GET", "/api/v1/categories/tree", None),
+        ("GET", "/api/v1/admin/users", None),
+        ("GET", "/api/v1/invitations", None),
+        ("POST", "/api/v1/records", {"amount": 12.5, "type": "expense", "category_id": 2}),
+        ("POST", "/api/v1/records/batch", {"records": [
+            {"amount": 8, "type": "expense", "category_id": 2, "client_id": "explain-1"},
+            {"amount": 9, "type": "expense", "category_id": 3, "project_id": project_id},
+        ]}),
+        ("PUT", f"/api/v1/records/{record_id}", {"amount": 20}),
+        ("DELETE", f"/api/v1/records/{record_id}", None),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检查路由SQL是否出现全表扫描")
+    parser.add_argument("--tables", default=",".join(DEFAULT_TABLES), help="需要检查的表，逗号分隔")
+    parser.add_argument("-v", "--verbose", action="store_true", help="打印所有语句的查询计划")
+    args = parser.parse_args()
+    watched = set(t.strip() for t in args.tables.split(",") if t.strip())
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user_ids = seed_sample_data(db, users=3, records_per_user=300)
+    from app.models import Project, LedgerRecord
+    project_id = db.query(Project.id).filter(Project.user_id == user_ids[0]).scalar()
+    record_id = db.query(LedgerRecord.id).filter(LedgerRecord.user_id == user_ids[0]).first()[0]
+    db.close()
+
+    statements = {}
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.setdefault(statement, (parameters, current_route[0]))
+
+    current_route = [None]
+    event.listen(engine, "before_cursor_execute", capture)
+
+    headers = auth_headers(user_ids[0], is_admin=True)
+
+    async def run():
+        for method, path, body in route_calls(user_ids[0], project_id, record_id):
+            current_route[0] = f"{method} {path}"
+            status_code, _, _ = await asgi_request(app, method, path, headers, body)
+            if status_code >= 500:
+                print(f"⚠️ {method} {path} 返回 {status_code}")
+
+    asyncio.run(run())
+    event.remove(engine, "before_cursor_execute", capture)
+
+    problems = []
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for statement, (parameters, route) in statements.items():
+            plan = [row[-1] for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()]
+            scans = [
+                line for line in plan
+                if FULL_SCAN.match(line) and FULL_SCAN.match(line).group(1) in watched
+            ]
+            if scans:
+                problems.append((route, statement, plan))
+            if args.verbose:
+                print(f"\n[{route}]\n{statement.strip()}\n  " + "\n  ".join(plan))
+    finally:
+        raw.close()
+        os.remove(DB_PATH)
+
+    print(f"\n检查了 {len(statements)} 条语句，关注表: {', '.join(sorted(watched))}")
+    if problems:
+        print(f"❌ {len(problems)} 条语句出现全表扫描:")
+        for route, statement, plan in problems:
+            print(f"\n[{route}]\n{' '.join(statement.split())}\n  " + "\n  ".join(plan))
+        sys.exit(1)
+    print("✅ 未发现全表扫描")
+
+
+if __name__ == "__main__":
+    main()
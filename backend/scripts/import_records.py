@@ -0,0 +1,59 @@
+"""
+记账导入脚本
+
+从CSV文件为指定用户批量导入记账记录（与 POST /api/v1/records/import 使用相同的解析与去重逻辑）。
+
+用法:
+    python scripts/import_records.py <用户名> <文件.csv> [--encoding utf-8-sig] [--chunk-size 1000]
+"""
+import sys
+import os
+import argparse
+
+# 添加app目录到Python路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import engine, Base, SessionLocal
+from app.models import User
+from app.services.importer import import_csv, ImportFormatError, IMPORT_CHUNK_SIZE
+from app.services.cache import bump_data_version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="从CSV导入记账记录")
+    parser.add_argument("username", help="导入到的用户名")
+    parser.add_argument("path", help="CSV文件路径")
+    parser.add_argument("--encoding", default="utf-8-sig", help="文件编码（默认UTF-8，可用gb18030）")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="每个事务插入的行数")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == args.username).first()
+        if not user:
+            print(f"❌ 用户不存在: {args.username}")
+            sys.exit(1)
+
+        print(f"🚀 开始导入 {args.path} → {user.username}")
+        with open(args.path, encoding=args.encoding, newline="") as stream:
+            result = import_csv(db, user.id, stream, chunk_size=args.chunk_size)
+    except ImportFormatError as e:
+        print(f"❌ 文件格式错误: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+    if result.imported:
+        # 运行中的服务按数据版本判断 ETag，导入后客户端需重新获取
+        bump_data_version(user.id)
+
+    print(f"✅ 共 {result.total_rows} 行：导入 {result.imported}，重复跳过 {result.duplicates}，失败 {result.failed}")
+    for error in result.errors:
+        print(f"   第 {error.line} 行: {error.detail}")
+    if result.failed > len(result.errors):
+        print(f"   ……另有 {result.failed - len(result.errors)} 行失败未列出")
+    print(f"⏱️ 用时 {result.seconds:.2f}s（{result.rows_per_second:.0f} 行/s）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+测试公共夹具
+
+所有测试共用一个临时SQLite数据库（必须在导入 app 之前设置 DATABASE_URL），
+示例数据由 support.seed_sample_data 生成（固定日期）；会修改数据的测试使用 make_user 新建独立用户。
+"""
+import os
+import asyncio
+import itertools
+
+import pytest
+
+from support import use_temp_database, seed_sample_data, auth_headers, asgi_request
+
+DB_PATH = use_temp_database("ledger_test_")
+
+from app.main import app  # noqa: E402
+from app.database import engine, Base, SessionLocal  # noqa: E402
+from app.models import User  # noqa: E402
+
+
+_usernames = itertools.count()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    Base.metadata.create_all(bind=engine)
+    yield
+    engine.dispose()
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+
+
+@pytest.fixture(scope="session")
+def sample_user_ids(database):
+    """示例数据（系统分类、2个用户、各800条记账），整个测试会话只生成一次"""
+    db = SessionLocal()
+    try:
+        return seed_sample_data(db, users=2, records_per_user=800)
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def db(database):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def make_user(database, sample_user_ids):
+    """新建一个没有数据的用户，返回 (用户ID, 请求头)"""
+    def make():
+        db = SessionLocal()
+        try:
+            user = User(username=f"test_user_{next(_usernames)}", password_hash="!")
+            db.add(user)
+            db.commit()
+            return user.id, auth_headers(user.id, user.username)
+        finally:
+            db.close()
+
+    return make
+
+
+@pytest.fixture
+def api():
+    """同步调用应用：api(method, path, headers=None, json_body=None) -> (状态码, 响应头, 响应体)"""
+    def call(method: str, path: str, headers=None, json_body=None, raise_server_exceptions: bool = True):
+        return asyncio.run(asgi_request(
+            app, method, path, headers, json_body, raise_server_exceptions=raise_server_exceptions
+        ))
+
+    return call
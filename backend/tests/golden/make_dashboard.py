@@ -0,0 +1,74 @@
+"""
+生成仪表盘基准响应（tests/golden/dashboard.json）
+
+在重构前的代码上运行（基线提交 181dc9d，导出到任意目录）：
+
+    git archive 181dc9d backend | tar -x -C /tmp/baseline
+    python tests/golden/make_dashboard.py /tmp/baseline/backend
+
+用 support.seed_sample_data 生成与测试相同的示例数据，冻结"今天"后
+调用基线的 GET /statistics/dashboard，按 "用户序号/日期/days" 保存完整响应体。
+基线还没有每日汇总表，生成数据时跳过汇总重建；
+基线 app/schemas/auth.py 缺少 List 导入（无法启动），导入前补上。
+"""
+import os
+import sys
+import json
+import types
+import asyncio
+import datetime
+
+TESTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GOLDEN_DAYS = ["2024-01-01", "2024-02-29", "2024-03-01", "2024-06-30", "2024-12-31", "2025-01-01", "2025-12-31"]
+
+
+def main(baseline_dir: str, output: str):
+    sys.path[:0] = [baseline_dir, TESTS_DIR]
+    from support import use_temp_database, seed_sample_data, auth_headers, asgi_request
+
+    use_temp_database("golden_")
+    import typing
+    import builtins
+    builtins.List = typing.List  # 基线 schemas/auth.py 缺少 List 导入
+    import app.services
+    sys.modules["app.services.rollup"] = types.SimpleNamespace(rebuild_rollups=lambda db: None)
+    from app.main import app
+    from app.database import engine, Base, SessionLocal
+    import app.routers.statistics as statistics
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user_ids = seed_sample_data(db)
+    finally:
+        db.close()
+
+    result = {}
+    for today in GOLDEN_DAYS:
+        frozen = datetime.date.fromisoformat(today)
+
+        class FrozenDate(datetime.date):
+            @classmethod
+            def today(cls):
+                return frozen
+
+        statistics.date = FrozenDate
+        for i, user_id in enumerate(user_ids):
+            headers = auth_headers(user_id, f"sample_user_{i}")
+            for days in (1, 7, 30):
+                status, _, body = asyncio.run(
+                    asgi_request(app, "GET", f"/api/v1/statistics/dashboard?days={days}", headers)
+                )
+                assert status == 200, body
+                result[f"{i}/{today}/{days}"] = json.loads(body)
+
+    lines = [
+        f"{json.dumps(key)}: {json.dumps(value, ensure_ascii=False, separators=(',', ':'))}"
+        for key, value in result.items()
+    ]
+    with open(output, "w", encoding="utf-8") as f:
+        f.write("{\n" + ",\n".join(lines) + "\n}\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.json"))
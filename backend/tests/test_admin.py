@@ -0,0 +1,66 @@
+"""
+删除用户：关闭事件流，复用同一ID的新用户不会拿到被删用户的缓存统计和 ETag；
+预算一并删除，零点切换周期时不会为已删除的用户重建预算状态
+"""
+import json
+import asyncio
+from datetime import date
+
+from app.main import app
+from app.models import User, Category, Budget, BudgetState
+from app.services import budget_state
+from support import auth_headers, asgi_request
+
+
+def test_delete_user_clears_cached_state(api, db, make_user, sample_user_ids):
+    admin_headers = auth_headers(sample_user_ids[0], "sample_user_0", is_admin=True)
+    user_id, headers = make_user()
+    category_id = db.query(Category.id).filter(Category.is_system == True, Category.type == "expense").first().id
+    record = {"category_id": category_id, "amount": 88.0, "type": "expense", "record_date": str(date.today())}
+    assert api("POST", "/api/v1/records", headers, record)[0] == 200
+
+    status, response_headers, body = api("GET", "/api/v1/statistics/overview", headers)
+    assert status == 200 and json.loads(body)["today_expense"] == 88.0
+    etag = response_headers["etag"]
+
+    async def delete_while_streaming():
+        stream = asyncio.create_task(asgi_request(app, "GET", "/api/v1/events", headers, on_body=lambda chunk: None))
+        await asyncio.sleep(0.1)
+        status, _, _ = await asgi_request(app, "DELETE", f"/api/v1/admin/users/{user_id}", admin_headers)
+        # 被删用户的事件流随之结束
+        await asyncio.wait_for(stream, 5)
+        return status
+
+    assert asyncio.run(delete_while_streaming()) == 200
+
+    # SQLite 复用最大的行ID
+    user = User(username="reused_id", password_hash="!")
+    db.add(user)
+    db.commit()
+    assert user.id == user_id
+    headers = auth_headers(user.id, user.username)
+
+    status, _, body = api("GET", "/api/v1/statistics/overview", {**headers, "If-None-Match": etag})
+    assert status == 200
+    assert json.loads(body)["today_expense"] == 0
+
+
+def test_rollover_skips_deleted_users(api, db, make_user, sample_user_ids):
+    admin_headers = auth_headers(sample_user_ids[0], "sample_user_0", is_admin=True)
+    user_id, headers = make_user()
+    status, _, _ = api("POST", "/api/v1/budgets", headers, {"name": "总预算", "amount": 1000, "period": "monthly"})
+    assert status == 200
+    assert db.query(BudgetState).filter(BudgetState.user_id == user_id).count() == 1
+
+    assert api("DELETE", f"/api/v1/admin/users/{user_id}", admin_headers)[0] == 200
+    assert db.query(Budget).filter(Budget.user_id == user_id).count() == 0
+
+    # 删除前遗留下来的、用户已不存在的预算同样不会被切换周期
+    orphan = Budget(user_id=user_id + 1000, name="遗留预算", amount=100)
+    db.add(orphan)
+    db.commit()
+    assert orphan.user_id not in budget_state.stale_user_ids(db)
+
+    budget_state.rollover_expired()
+    db.expire_all()
+    assert db.query(BudgetState).filter(BudgetState.user_id.in_((user_id, orphan.user_id))).count() == 0
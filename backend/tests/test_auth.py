@@ -0,0 +1,138 @@
+"""
+登录：bcrypt 排队期间不占用请求线程，排队已满时返回 503；数据库查询不在事件循环中执行
+"""
+import asyncio
+import threading
+
+import bcrypt
+import pytest
+from sqlalchemy import event
+
+from app.main import app
+from app.auth import password
+from app.auth.password import PasswordPool, BCRYPT_ROUNDS
+from app.database import engine
+from app.models import User, SystemConfig
+from support import asgi_request
+
+
+async def wait_until(condition, timeout: float = 5):
+    """轮询等待条件成立，超时则测试失败"""
+    async def poll():
+        while not condition():
+            await asyncio.sleep(0.01)
+
+    await asyncio.wait_for(poll(), timeout)
+
+
+@pytest.fixture
+def login_user(db, make_user):
+    """可登录的用户（密码校验由测试替换，哈希只需成本因子与配置一致）"""
+    user_id, headers = make_user()
+    user = db.get(User, user_id)
+    user.password_hash = f"$2b${BCRYPT_ROUNDS:02d}$" + "x" * 53
+    db.commit()
+    return user.username, headers
+
+
+@pytest.fixture
+def blocked_pool(monkeypatch):
+    """单线程密码池，校验阻塞到 release 被设置"""
+    release = threading.Event()
+
+    def verify(plain, hashed):
+        release.wait(10)
+        return True
+
+    pool = PasswordPool(workers=1, queue_limit=40)
+    monkeypatch.setattr(password, "password_pool", pool)
+    monkeypatch.setattr(password, "_verify", verify)
+    yield pool, release
+    release.set()
+    pool.shutdown()
+
+
+def test_queued_logins_do_not_starve_sync_routes(login_user, blocked_pool):
+    username, headers = login_user
+    pool, release = blocked_pool
+    body = {"username": username, "password": "secret"}
+
+    async def scenario():
+        # 超过 AnyIO 默认线程数（40）的登录同时排队
+        logins = [
+            asyncio.create_task(asgi_request(app, "POST", "/api/v1/auth/login", json_body=body))
+            for _ in range(41)
+        ]
+        await wait_until(lambda: pool.submitted == 41)
+
+        # 同步接口仍然可以拿到线程
+        status, _, _ = await asyncio.wait_for(asgi_request(app, "GET", "/api/v1/records", headers), 5)
+        release.set()
+        return status, await asyncio.gather(*logins)
+
+    status, logins = asyncio.run(scenario())
+    assert status == 200
+    assert [s for s, _, _ in logins] == [200] * 41
+
+
+def test_login_rejected_when_pool_queue_full(login_user, blocked_pool, monkeypatch):
+    username, _ = login_user
+    _, release = blocked_pool
+    pool = PasswordPool(workers=1, queue_limit=1)
+    monkeypatch.setattr(password, "password_pool", pool)
+    body = {"username": username, "password": "secret"}
+
+    async def scenario():
+        logins = [
+            asyncio.create_task(asgi_request(app, "POST", "/api/v1/auth/login", json_body=body))
+            for _ in range(2)
+        ]
+        await wait_until(lambda: pool.submitted == 2)
+        status, headers, _ = await asgi_request(app, "POST", "/api/v1/auth/login", json_body=body)
+        release.set()
+        return status, headers, await asyncio.gather(*logins)
+
+    status, headers, logins = asyncio.run(scenario())
+    pool.shutdown()
+    assert status == 503
+    assert headers["retry-after"] == "1"
+    assert [s for s, _, _ in logins] == [200, 200]
+
+
+@pytest.fixture
+def default_invitation_code(db):
+    """默认邀请码"""
+    config = db.query(SystemConfig).filter(SystemConfig.config_key == "default_invitation_code").first()
+    if config is None:
+        config = SystemConfig(config_key="default_invitation_code", config_value="TEST-INVITE")
+        db.add(config)
+        db.commit()
+    return config.config_value
+
+
+def test_register_and_login_query_outside_event_loop(db, default_invitation_code):
+    body = {"username": "off_loop_user", "password": "secret123", "invitation_code": default_invitation_code}
+    threads = []
+
+    def record_thread(*args):
+        threads.append(threading.get_ident())
+
+    async def request(path):
+        event.listen(engine, "before_cursor_execute", record_thread)
+        try:
+            status, _, _ = await asgi_request(app, "POST", path, json_body=body)
+        finally:
+            event.remove(engine, "before_cursor_execute", record_thread)
+        assert status == 200
+
+    asyncio.run(request("/api/v1/auth/register"))
+    # 旧成本因子的哈希：登录时重新加密并保存
+    user = db.query(User).filter(User.username == body["username"]).one()
+    user.password_hash = bcrypt.hashpw(b"secret123", bcrypt.gensalt(rounds=4)).decode()
+    db.commit()
+    asyncio.run(request("/api/v1/auth/login"))
+
+    # asyncio.run 在当前线程运行事件循环
+    assert threads and threading.get_ident() not in threads
+    db.refresh(user)
+    assert not password.needs_rehash(user.password_hash)
@@ -0,0 +1,131 @@
+"""
+预算评估：批量计算（spent_amounts / evaluate_budgets）与逐个预算查询记账表的结果一致；
+并发记账时预算状态的已支出原子累加
+"""
+import random
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from app.database import SessionLocal
+from app.models import Budget, BudgetState, Category, LedgerRecord
+from app.services import rollup, budget_state
+from app.services.budget_eval import get_period_range, spent_amounts, evaluate_budgets
+
+
+def per_budget_spent(db, budget, start, end) -> float:
+    """重构前的算法：每个预算单独汇总记账表"""
+    query = db.query(func.sum(LedgerRecord.amount)).filter(
+        LedgerRecord.user_id == budget.user_id,
+        LedgerRecord.record_date >= start,
+        LedgerRecord.record_date <= end,
+        LedgerRecord.type == "expense"
+    )
+    if budget.category_id:
+        query = query.filter(LedgerRecord.category_id == budget.category_id)
+    return float(query.scalar() or 0)
+
+
+def add_records(db, user_id, category_ids, today, count=300, seed=7):
+    """本月前后两个月内的随机收支（含未来日期和收入，不应计入支出）"""
+    rnd = random.Random(seed)
+    for _ in range(count):
+        record = LedgerRecord(
+            user_id=user_id,
+            category_id=rnd.choice(category_ids),
+            amount=round(rnd.uniform(0.01, 800), 2),
+            type="income" if rnd.random() < 0.15 else "expense",
+            record_date=today + timedelta(days=rnd.randint(-70, 20)),
+        )
+        db.add(record)
+        db.flush()
+        rollup.add_record(db, record)
+    db.commit()
+
+
+def test_batched_spent_matches_per_budget_queries(db, make_user, sample_user_ids):
+    today = date.today()
+    parent = db.query(Category).filter(Category.is_system == True, Category.type == "expense",
+                                       Category.parent_id.is_(None)).first()
+    child = db.query(Category).filter(Category.parent_id == parent.id).first()
+    other = db.query(Category).filter(Category.is_system == True, Category.type == "expense",
+                                      Category.id.notin_((parent.id, child.id))).first()
+    category_ids = [parent.id, child.id, other.id]
+
+    users = [make_user()[0] for _ in range(2)]
+    budgets = []
+    for user_id in users:
+        add_records(db, user_id, category_ids, today, seed=user_id)
+        budgets += [
+            Budget(user_id=user_id, name="总预算", amount=3000),
+            Budget(user_id=user_id, name="父分类", amount=800, category_id=parent.id),
+            Budget(user_id=user_id, name="子分类", amount=300, category_id=child.id),
+            Budget(user_id=user_id, name="年度", amount=30000, period="yearly"),
+            Budget(user_id=user_id, name="年度分类", amount=9000, period="yearly", category_id=other.id),
+            # 自定义周期：相同窗口、相互重叠的窗口、未设置起止日期
+            Budget(user_id=user_id, name="自定义A", amount=1000, period="custom",
+                   start_date=today - timedelta(days=40), end_date=today - timedelta(days=5)),
+            Budget(user_id=user_id, name="自定义A分类", amount=500, period="custom", category_id=child.id,
+                   start_date=today - timedelta(days=40), end_date=today - timedelta(days=5)),
+            Budget(user_id=user_id, name="自定义B", amount=1000, period="custom", category_id=other.id,
+                   start_date=today - timedelta(days=10), end_date=today + timedelta(days=3)),
+            Budget(user_id=user_id, name="自定义无日期", amount=1000, period="custom"),
+            Budget(user_id=user_id, name="无支出", amount=100, period="custom",
+                   start_date=today + timedelta(days=30), end_date=today + timedelta(days=40)),
+        ]
+    db.add_all(budgets)
+    db.commit()
+
+    items = [(budget, *get_period_range(budget.period, budget)) for budget in budgets]
+    expected = [per_budget_spent(db, budget, start, end) for budget, start, end in items]
+    assert any(expected) and 0 in expected
+
+    assert [float(spent) for spent in spent_amounts(db, items)] == expected
+
+    statuses = evaluate_budgets(db, items)
+    assert [s.budget_id for s in statuses] == [b.id for b in budgets]
+    assert [s.spent for s in statuses] == expected
+    names = {c.id: c.name for c in db.query(Category).filter(Category.id.in_(category_ids))}
+    assert [s.category_name for s in statuses] == [names.get(b.category_id) for b in budgets]
+
+
+def test_concurrent_expenses_accumulate_budget_state(db, make_user):
+    user_id, _ = make_user()
+    category_id = db.query(Category.id).filter(Category.is_system == True, Category.type == "expense").first().id
+    budget = Budget(user_id=user_id, name="总预算", amount=100)
+    db.add(budget)
+    db.flush()
+    budget_state.refresh_states(db, user_id)
+    db.commit()
+
+    threads, per_thread = 8, 20
+    start = threading.Barrier(threads)
+    errors = []
+
+    def write():
+        start.wait()
+        for i in range(per_thread):
+            # 本月内的不同日期，都计入同一个月度总预算
+            key = {"user_id": user_id, "date": date.today().replace(day=1) + timedelta(days=i),
+                   "type": "expense", "category_id": category_id, "project_id": None}
+            session = SessionLocal()
+            try:
+                rollup.apply_record(session, key, Decimal("0.75"), 1)
+                session.commit()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                session.close()
+
+    workers = [threading.Thread(target=write) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    state = db.query(BudgetState).filter(BudgetState.budget_id == budget.id).one()
+    assert state.spent == Decimal("0.75") * threads * per_thread
+    assert (state.usage_rate, state.alert_level) == (120.0, "critical")
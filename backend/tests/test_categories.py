@@ -0,0 +1,84 @@
+"""
+分类缓存：按持久化数据版本失效，其它进程（另一个 worker、命令行）修改分类后立即生效
+"""
+import json
+from datetime import date
+
+from app.database import SessionLocal
+from app.models import Category
+from app.services.cache import bump_data_version
+
+
+def add_category(name: str, user_id=None, parent_id=None) -> int:
+    """直接写库新增分类（与分类接口一样提交后递增数据版本）"""
+    db = SessionLocal()
+    try:
+        category = Category(name=name, user_id=user_id, parent_id=parent_id, type="expense", is_system=user_id is None)
+        db.add(category)
+        db.commit()
+        category_id = category.id
+    finally:
+        db.close()
+    bump_data_version(user_id)
+    return category_id
+
+
+def rename_elsewhere(category_id: int, name: str, user_id=None):
+    """模拟其它进程修改分类：只写库并递增数据版本，不触碰本进程的分类缓存"""
+    db = SessionLocal()
+    try:
+        db.query(Category).filter(Category.id == category_id).update({Category.name: name})
+        db.commit()
+    finally:
+        db.close()
+    bump_data_version(user_id)
+
+
+def tree_names(api, headers):
+    status, _, body = api("GET", "/api/v1/categories/tree?type=expense", headers)
+    assert status == 200
+    return {c["name"] for parent in json.loads(body) for c in [parent, *parent["children"]]}
+
+
+def category_stat_names(api, headers):
+    status, _, body = api("GET", "/api/v1/statistics/category?record_type=expense", headers)
+    assert status == 200
+    return {c["category_name"] for c in json.loads(body)["categories"]}
+
+
+def dashboard_names(api, headers):
+    status, _, body = api("GET", "/api/v1/statistics/dashboard", headers)
+    assert status == 200
+    return {r["category_name"] for r in json.loads(body)["recent_records"]}
+
+
+def test_private_category_rename_visible_in_tree_and_statistics(api, db, make_user):
+    user_id, headers = make_user()
+    parent_id = db.query(Category.id).filter(Category.is_system == True, Category.type == "expense").first().id
+    category_id = add_category("咖啡", user_id, parent_id)
+    record = {"category_id": category_id, "amount": 12.0, "type": "expense", "record_date": str(date.today())}
+    assert api("POST", "/api/v1/records", headers, record)[0] == 200
+
+    assert "咖啡" in tree_names(api, headers)
+    assert category_stat_names(api, headers) == {"咖啡"}
+    assert dashboard_names(api, headers) == {"咖啡"}
+
+    rename_elsewhere(category_id, "奶茶", user_id)
+
+    assert "奶茶" in tree_names(api, headers)
+    # 统计响应按数据版本缓存，其中的分类名称同样是新的
+    assert category_stat_names(api, headers) == {"奶茶"}
+    assert dashboard_names(api, headers) == {"奶茶"}
+
+
+def test_system_category_rename_visible_to_all_users(api, make_user):
+    _, headers = make_user()
+    _, other_headers = make_user()
+    category_id = add_category("宠物")
+    assert "宠物" in tree_names(api, headers)
+    assert "宠物" in tree_names(api, other_headers)
+
+    rename_elsewhere(category_id, "宠物用品")
+
+    assert "宠物用品" in tree_names(api, headers)
+    assert "宠物用品" in tree_names(api, other_headers)
@@ -0,0 +1,32 @@
+"""
+响应压缩：br / gzip 解压后与原始响应一致（普通响应和流式导出）
+"""
+import gzip
+
+import brotli
+import pytest
+
+from support import auth_headers
+
+DECODERS = {"br": brotli.decompress, "gzip": gzip.decompress}
+
+
+@pytest.mark.parametrize("path", ["/api/v1/records?page_size=100", "/api/v1/records/export?format=csv"])
+@pytest.mark.parametrize("encoding", ["br", "gzip"])
+def test_compressed_response_matches_identity(api, sample_user_ids, path, encoding):
+    headers = auth_headers(sample_user_ids[0], "sample_user_0")
+    status, _, raw = api("GET", path, {**headers, "Accept-Encoding": "identity"})
+    assert status == 200
+
+    status, response_headers, body = api("GET", path, {**headers, "Accept-Encoding": f"{encoding}, deflate"})
+    assert status == 200
+    assert response_headers["content-encoding"] == encoding
+    assert response_headers["vary"] == "Accept-Encoding"
+    assert DECODERS[encoding](body) == raw
+    assert len(body) < len(raw)
+
+
+def test_br_preferred_when_both_accepted(api, sample_user_ids):
+    headers = auth_headers(sample_user_ids[0], "sample_user_0")
+    _, response_headers, _ = api("GET", "/api/v1/records?page_size=100", {**headers, "Accept-Encoding": "gzip, br"})
+    assert response_headers["content-encoding"] == "br"
@@ -0,0 +1,45 @@
+"""
+仪表盘：单次分组扫描的响应与重构前的接口完全一致
+
+tests/golden/dashboard.json 由基线代码的 GET /statistics/dashboard 在同一份示例数据上生成
+（见 tests/golden/make_dashboard.py），按 "用户序号/日期/days" 保存完整响应体；
+这里冻结"今天"后请求当前接口，逐字段（含浮点数）比较整个响应。
+"""
+import os
+import json
+import datetime
+
+import pytest
+
+from app.services import cache, dashboard
+from support import auth_headers
+
+
+with open(os.path.join(os.path.dirname(__file__), "golden", "dashboard.json"), encoding="utf-8") as f:
+    GOLDEN = json.load(f)
+
+
+@pytest.fixture
+def freeze_today(monkeypatch):
+    """把仪表盘和缓存键使用的 date.today() 固定为指定日期"""
+    def freeze(today: datetime.date):
+        class FrozenDate(datetime.date):
+            @classmethod
+            def today(cls):
+                return today
+
+        monkeypatch.setattr(dashboard, "date", FrozenDate)
+        monkeypatch.setattr(cache, "date", FrozenDate)
+
+    return freeze
+
+
+@pytest.mark.parametrize("key", sorted(GOLDEN))
+def test_dashboard_matches_baseline_response(api, sample_user_ids, freeze_today, key):
+    user_index, today, days = key.split("/")
+    freeze_today(datetime.date.fromisoformat(today))
+    headers = auth_headers(sample_user_ids[int(user_index)], f"sample_user_{user_index}")
+
+    status, _, body = api("GET", f"/api/v1/statistics/dashboard?days={days}", headers)
+    assert status == 200
+    assert json.loads(body) == GOLDEN[key]
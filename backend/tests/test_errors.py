@@ -0,0 +1,33 @@
+"""
+未处理的异常：返回统一格式的500响应，计时头和访问日志照常记录
+"""
+import json
+
+import pytest
+
+from app.main import app
+
+
+@pytest.fixture
+def failing_route():
+    def boom():
+        raise RuntimeError("boom")
+
+    app.add_api_route("/__test__/boom", boom)
+    yield "/__test__/boom"
+    app.router.routes.pop()
+
+
+def test_unhandled_exception_returns_json_error(api, failing_route):
+    # ServerErrorMiddleware 发送500响应后仍会重新抛出异常
+    with pytest.raises(RuntimeError, match="boom"):
+        api("GET", failing_route)
+
+    status, headers, body = api("GET", failing_route, raise_server_exceptions=False)
+
+    assert status == 500
+    assert headers["content-type"] == "application/json"
+    assert json.loads(body) == {
+        "success": False,
+        "error": {"code": 500, "message": "服务器内部错误，请稍后重试"}
+    }
@@ -0,0 +1,57 @@
+"""
+条件 GET：ETag 与统计缓存使用同一个持久化数据版本
+"""
+import json
+from datetime import date
+
+from app.database import SessionLocal
+from app.models import Category, LedgerRecord, DataVersion
+from app.services import rollup
+
+
+def add_expense_elsewhere(user_id: int, category_id: int, amount: float):
+    """模拟其它进程（另一个 worker 或命令行导入）写入并递增 data_versions"""
+    db = SessionLocal()
+    try:
+        record = LedgerRecord(
+            user_id=user_id, category_id=category_id, amount=amount, type="expense", record_date=date.today()
+        )
+        db.add(record)
+        db.flush()
+        rollup.add_record(db, record)
+        db.query(DataVersion).filter(DataVersion.scope_id == user_id).update(
+            {DataVersion.version: DataVersion.version + 1}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_out_of_process_write_changes_body_and_etag(api, db, make_user):
+    user_id, headers = make_user()
+    category_id = db.query(Category.id).filter(Category.is_system == True, Category.type == "expense").first().id
+    record = {"category_id": category_id, "amount": 20.0, "type": "expense", "record_date": str(date.today())}
+    assert api("POST", "/api/v1/records", headers, record)[0] == 200
+
+    status, response_headers, body = api("GET", "/api/v1/statistics/overview", headers)
+    assert status == 200 and json.loads(body)["today_expense"] == 20.0
+    etag = response_headers["etag"]
+    # 数据未变：304，只执行一次版本查询
+    status, response_headers, _ = api("GET", "/api/v1/statistics/overview", {**headers, "If-None-Match": etag})
+    assert status == 304 and response_headers["x-db-queries"] == "1"
+
+    add_expense_elsewhere(user_id, category_id, 1000.0)
+
+    status, response_headers, body = api("GET", "/api/v1/statistics/overview", {**headers, "If-None-Match": etag})
+    assert status == 200
+    assert response_headers["etag"] != etag
+    assert json.loads(body)["today_expense"] == 1020.0
+
+
+def test_cached_handler_reuses_request_version(api, make_user):
+    _, headers = make_user()
+    api("GET", "/api/v1/statistics/overview", headers)
+    # 缓存命中：ETag 依赖读取的版本直接用于缓存校验，不再查询
+    status, response_headers, _ = api("GET", "/api/v1/statistics/overview", headers)
+    assert status == 200
+    assert response_headers["x-db-queries"] == "1"
@@ -0,0 +1,129 @@
+"""
+事件流：浏览器用票据（?ticket=）订阅并收到记录变化事件
+"""
+import json
+import time
+import asyncio
+from datetime import date
+
+import pytest
+
+from app.main import app
+from app.services.events import event_broker
+from app.auth.token import (
+    create_stream_ticket, decode_stream_ticket, create_access_token, decode_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+)
+from app.models import Category
+from support import asgi_request
+
+
+def test_stream_with_ticket_receives_record_created(api, db, make_user):
+    user_id, headers = make_user()
+    category_id = db.query(Category.id).filter(Category.is_system == True, Category.type == "expense").first().id
+
+    status, _, body = api("POST", "/api/v1/events/ticket", headers)
+    assert status == 200
+    ticket = json.loads(body)["ticket"]
+
+    async def scenario():
+        received = bytearray()
+        stream = asyncio.create_task(
+            asgi_request(app, "GET", f"/api/v1/events?ticket={ticket}", on_body=received.extend)
+        )
+
+        async def wait_for(text: bytes):
+            while text not in received:
+                if stream.done():
+                    raise AssertionError(f"事件流已结束: {stream.result()[:2]}")
+                await asyncio.sleep(0.01)
+
+        try:
+            await asyncio.wait_for(wait_for(b"event: ready"), 5)
+            record = {"category_id": category_id, "amount": 9.5, "type": "expense", "record_date": str(date.today())}
+            status, _, body = await asgi_request(app, "POST", "/api/v1/records", headers, record)
+            assert status == 200
+            await asyncio.wait_for(wait_for(b"event: record.created"), 5)
+            return json.loads(body)["id"], received.decode("utf-8")
+        finally:
+            stream.cancel()
+
+    record_id, received = asyncio.run(scenario())
+    event = received[received.index("event: record.created"):].split("\n\n")[0]
+    data = json.loads(event.split("data: ", 1)[1])
+    assert data["ids"] == [record_id]
+
+
+def test_ticket_is_not_an_access_token(api, make_user):
+    _, headers = make_user()
+    ticket = json.loads(api("POST", "/api/v1/events/ticket", headers)[2])["ticket"]
+
+    status, _, _ = api("GET", "/api/v1/records", {"Authorization": f"Bearer {ticket}"})
+    assert status == 401
+
+
+def test_stream_requires_credentials(api):
+    assert api("GET", "/api/v1/events")[0] == 401
+    assert api("GET", "/api/v1/events?ticket=invalid")[0] == 401
+
+
+@pytest.fixture
+def non_utc_timezone(monkeypatch):
+    """服务器本地时区为 UTC+8"""
+    monkeypatch.setenv("TZ", "Asia/Shanghai")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_tokens_valid_in_non_utc_timezone(non_utc_timezone):
+    assert time.timezone != 0
+    assert decode_stream_ticket(create_stream_ticket(7)) == 7
+
+    token_data = decode_access_token(create_access_token({"sub": 7, "username": "u"}))
+    assert token_data is not None
+    assert abs(token_data.expires_at - time.time() - ACCESS_TOKEN_EXPIRE_MINUTES * 60) < 60
+
+
+@pytest.mark.parametrize("fail_on", ["http.response.start", "http.response.body"])
+def test_failed_send_releases_subscription(make_user, fail_on):
+    user_id, headers = make_user()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": "/api/v1/events", "raw_path": b"/api/v1/events", "root_path": "", "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 12345), "server": ("testserver", 80),
+    }
+
+    async def receive():
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == fail_on:
+            raise OSError("connection reset")
+
+    async def scenario():
+        with pytest.raises(Exception):
+            await app(scope, receive, send)
+        # 未关闭的生成器由事件循环的 asyncgen 钩子关闭
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert event_broker.stats()["connections"] == 0
+
+    # 名额没有被占用：仍可建立满额的连接
+    async def reconnect():
+        streams = [
+            asyncio.create_task(asgi_request(app, "GET", "/api/v1/events", headers, on_body=lambda chunk: None))
+            for _ in range(event_broker.max_connections_per_user)
+        ]
+        await asyncio.sleep(0.1)
+        try:
+            assert event_broker.stats()["connections"] == event_broker.max_connections_per_user
+            status, _, _ = await asgi_request(app, "GET", "/api/v1/events", headers)
+            return status
+        finally:
+            for stream in streams:
+                stream.cancel()
+
+    assert asyncio.run(reconnect()) == 429
@@ -0,0 +1,44 @@
+"""
+SQL计时：执行失败的语句同样计入，且不在连接上遗留计时状态
+"""
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.database import engine
+from app.services import metrics
+
+
+def test_failed_statements_are_timed_without_leaking_state(database):
+    scope = metrics.RequestScope()
+    token = metrics.current_scope.set(scope)
+    try:
+        with engine.connect() as conn:
+            conn.exec_driver_sql("SELECT 1")
+            info = repr(conn.info)
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.exec_driver_sql("SELECT * FROM missing_table")
+            conn.exec_driver_sql("SELECT 1")
+            assert repr(conn.info) == info
+    finally:
+        metrics.current_scope.reset(token)
+
+    assert scope.queries == 5
+    assert scope.statements["SELECT * FROM missing_table"] == 3
+    assert 0 <= scope.seconds < 1
+
+
+def test_metrics_endpoint_requires_token(api, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", None)
+    status, _, _ = api("GET", "/metrics")
+    assert status == 404
+
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "scrape-secret")
+    for headers in (None, {"Authorization": "Bearer wrong"}, {"Authorization": "Basic scrape-secret"}):
+        status, response_headers, _ = api("GET", "/metrics", headers)
+        assert status == 401
+        assert response_headers["www-authenticate"] == "Bearer"
+
+    status, _, body = api("GET", "/metrics", {"Authorization": "Bearer scrape-secret"})
+    assert status == 200
+    assert b"http_requests_total" in body
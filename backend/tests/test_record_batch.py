@@ -0,0 +1,71 @@
+"""
+批量创建：client_id 幂等，并发重试撞上唯一索引时返回已创建的记录
+"""
+import json
+
+import pytest
+
+from app.database import SessionLocal
+from app.models import Category, LedgerRecord
+from app.schemas.record import RecordBatchCreateItem
+from app.services import record_batch
+
+
+@pytest.fixture
+def expense_category_id(db, sample_user_ids):
+    return db.query(Category.id).filter(Category.is_system == True, Category.type == "expense").first().id
+
+
+def batch_body(category_id, *client_ids):
+    return {"records": [
+        {
+            "category_id": category_id,
+            "amount": 12.5,
+            "type": "expense",
+            "record_date": "2026-01-02",
+            "client_id": client_id,
+        }
+        for client_id in client_ids
+    ]}
+
+
+def test_retry_returns_duplicate(api, make_user, expense_category_id):
+    _, headers = make_user()
+    body = batch_body(expense_category_id, "offline-1", "offline-1")
+
+    status, _, first = api("POST", "/api/v1/records/batch", headers, body)
+    assert status == 200
+    first = json.loads(first)
+    assert [r["status"] for r in first["results"]] == ["created", "duplicate"]
+
+    status, _, second = api("POST", "/api/v1/records/batch", headers, body)
+    assert status == 200
+    assert [(r["status"], r["id"]) for r in json.loads(second)["results"]] == [
+        ("duplicate", first["results"][0]["id"])
+    ] * 2
+
+
+def test_concurrent_retry_collision_is_idempotent(api, db, make_user, expense_category_id, monkeypatch):
+    user_id, headers = make_user()
+    winner = {}
+    lookup = record_batch.owned_project_ids
+
+    def commit_concurrent_request(session, uid, ids):
+        """在请求查完已有幂等键之后，另一请求抢先提交了同一 client_id"""
+        if not winner:
+            winner["id"] = None
+            other = SessionLocal()
+            item = RecordBatchCreateItem(**batch_body(expense_category_id, "offline-2")["records"][0])
+            winner["id"] = record_batch.create_records(other, uid, [item]).results[0].id
+            other.commit()
+            other.close()
+        return lookup(session, uid, ids)
+
+    monkeypatch.setattr(record_batch, "owned_project_ids", commit_concurrent_request)
+    status, _, body = api("POST", "/api/v1/records/batch", headers, batch_body(expense_category_id, "offline-2", "offline-3"))
+
+    assert status == 200
+    results = json.loads(body)["results"]
+    assert (results[0]["status"], results[0]["id"]) == ("duplicate", winner["id"])
+    assert results[1]["status"] == "created"
+    assert db.query(LedgerRecord).filter(LedgerRecord.user_id == user_id).count() == 2
@@ -0,0 +1,65 @@
+"""
+每日汇总：并发写入同一汇总键时原子累加，不产生重复行、不丢失更新
+"""
+import threading
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.models import Category, DailyRollup
+from app.services import rollup
+
+
+def test_concurrent_writes_to_same_key(db, make_user):
+    user_id, _ = make_user()
+    category_id = db.query(Category.id).filter(Category.is_system == True, Category.type == "expense").first().id
+    key = {"user_id": user_id, "date": date(2026, 3, 1), "type": "expense", "category_id": category_id, "project_id": None}
+    threads, per_thread = 8, 25
+    start = threading.Barrier(threads)
+    errors = []
+
+    def write():
+        start.wait()
+        for _ in range(per_thread):
+            session = SessionLocal()
+            try:
+                rollup.apply_record(session, key, Decimal("1.25"), 1)
+                session.commit()
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                session.close()
+
+    workers = [threading.Thread(target=write) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    rows = db.query(DailyRollup).filter(DailyRollup.user_id == user_id).all()
+    assert len(rows) == 1
+    assert rows[0].record_count == threads * per_thread
+    assert rows[0].amount == Decimal("1.25") * threads * per_thread
+
+    # 删除到记录数归零后汇总行一并删除
+    for _ in range(threads * per_thread):
+        rollup.apply_record(db, key, Decimal("1.25"), -1)
+    db.commit()
+    assert db.query(DailyRollup).filter(DailyRollup.user_id == user_id).count() == 0
+
+
+def test_rollup_key_is_unique(db, make_user):
+    user_id, _ = make_user()
+    row = {"user_id": user_id, "date": date(2026, 3, 1), "type": "income", "category_id": 1,
+           "project_id": None, "amount": 1, "record_count": 1}
+    db.add(DailyRollup(**row))
+    db.flush()
+    # project_id 为空的键同样唯一
+    db.add(DailyRollup(**row))
+    with pytest.raises(IntegrityError):
+        db.flush()
+    db.rollback()
@@ -173,6 +173,8 @@ setup_env() {
 
 # 数据库配置
 DATABASE_URL=sqlite:///./data/ledger.db
+DB_PROFILE=production
+SQL_ECHO=false
 
 # JWT 配置（生产环境请修改）
 SECRET_KEY=your-super-secret-key-change-in-production
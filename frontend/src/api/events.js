@@ -0,0 +1,57 @@
+import request from './request'
+
+const API_BASE_URL = '/api/v1'
+const EVENT_TYPES = [
+  'ready',
+  'record.created',
+  'record.updated',
+  'record.deleted',
+  'budget.alert',
+  'stats.invalidated',
+  'resync'
+]
+
+export function getEventTicket() {
+  return request.post('/events/ticket')
+}
+
+// 订阅事件流：EventSource 不能设置 Authorization 头，用短期票据认证；
+// 连接断开后重新获取票据再连接（票据过期后 EventSource 自带的重连会失败）
+export function openEventStream(handlers = {}, retryDelay = 3000) {
+  let source = null
+  let timer = null
+  let closed = false
+
+  const connect = async () => {
+    try {
+      const { ticket } = await getEventTicket()
+      if (closed) return
+      source = new EventSource(`${API_BASE_URL}/events?ticket=${encodeURIComponent(ticket)}`)
+      EVENT_TYPES.forEach((type) => {
+        if (handlers[type]) {
+          source.addEventListener(type, (event) => handlers[type](JSON.parse(event.data)))
+        }
+      })
+      source.onerror = () => {
+        source.close()
+        reconnect()
+      }
+    } catch (error) {
+      reconnect()
+    }
+  }
+
+  const reconnect = () => {
+    if (!closed) {
+      timer = setTimeout(connect, retryDelay)
+    }
+  }
+
+  connect()
+
+  return () => {
+    closed = true
+    clearTimeout(timer)
+    if (source) source.close()
+  }
+}